@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+Local HTTP API for submitting and monitoring germanization jobs.
+
+Endpoints (JSON unless noted):
+
+    GET    /health                      service status
+    GET    /jobs                        all jobs, newest first
+    POST   /jobs                        submit {"video_url": ..., options...}
+    POST   /jobs/upload?filename=NAME   submit an uploaded video (raw request body), options as query params
+    GET    /jobs/<id>                   job status and progress
+    POST   /jobs/<id>/cancel            cancel a queued or running job (also DELETE /jobs/<id>)
+    GET    /jobs/<id>/logs              job log as text; ?offset=N to resume, ?follow=1 to stream until done
+    GET    /jobs/<id>/artifacts         output files of a completed job
+    GET    /jobs/<id>/profile           per-stage hotspots as text; ?format=svg for the flame graph,
+                                        ?format=collapsed for collapsed stacks (needs --profile)
+    GET    /files/<path>                download an output file (supports range requests)
+    GET    /metrics                     Prometheus metrics
+
+Usage:
+
+    python api_server.py [--host HOST] [--port PORT] [--workers N] [--distributed] [--profile]
+"""
+import os
+import re
+import sys
+import hmac
+import json
+import time
+import uuid
+import argparse
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+from dotenv import load_dotenv
+
+# Load .env before config so its settings can be overridden from the environment
+load_dotenv(Path(__file__).parent / '.env')
+
+from src.file_server import CHUNK_SIZE, RangeRequestHandler
+from src.jobs import JobManager, COMPLETED, job_log_path
+from src.job_store import JobStore
+from src.pipeline import run_pipeline
+from src.utils import setup_logging, get_video_id
+from src import metrics
+from src import config
+
+# Runner options accepted from clients, with their types
+JOB_OPTIONS = {
+    'audio_quality': str,
+    'subtitles': bool,
+    'original_subtitles': bool,
+    'keep_original_audio': bool,
+    'mix_mode': str,
+    'progressive': bool,
+}
+MIX_MODES = ('duck', 'replace')
+
+# Largest accepted JSON request body
+MAX_JSON_BYTES = 1024 * 1024
+
+# Seconds between log file polls while following a job's log
+LOG_POLL_INTERVAL = 0.5
+
+_JOB_PATH = re.compile(r'^/jobs/([0-9a-f]+)(/cancel|/logs|/artifacts|/profile)?$')
+
+# Profile report files by ?format= value, with their content types
+PROFILE_FORMATS = {
+    'text': ('hotspots.txt', 'text/plain; charset=utf-8'),
+    'svg': ('flamegraph.svg', 'image/svg+xml'),
+    'collapsed': ('all.collapsed', 'text/plain; charset=utf-8'),
+}
+
+class ApiError(Exception):
+    """Request error reported to the client with an HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def parse_options(values: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate and convert job options from a JSON body or query string.
+
+    Args:
+        values (Dict[str, Any]): Raw option values (query string values are strings)
+
+    Returns:
+        Dict[str, Any]: Runner keyword arguments
+
+    Raises:
+        ApiError: If an option has an invalid value
+    """
+    options = {}
+    for name, kind in JOB_OPTIONS.items():
+        if name not in values:
+            continue
+        value = values[name]
+        if kind is bool and isinstance(value, str):
+            value = value.lower() in ('1', 'true', 'yes', 'on')
+        elif not isinstance(value, kind):
+            raise ApiError(400, f"Option '{name}' must be a {kind.__name__}")
+        options[name] = kind(value)
+
+    if options.get('mix_mode', MIX_MODES[0]) not in MIX_MODES:
+        raise ApiError(400, f"Option 'mix_mode' must be one of: {', '.join(MIX_MODES)}")
+    if not str(options.get('audio_quality', '192')).isdigit():
+        raise ApiError(400, "Option 'audio_quality' must be a bitrate in kbps")
+    return options
+
+class JobApiHandler(RangeRequestHandler):
+    """
+    HTTP handler for the job API; output files are served by RangeRequestHandler.
+    """
+
+    manager: JobManager = None
+    api_key: Optional[str] = None
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_HEAD(self):
+        if self._authorized():
+            RangeRequestHandler.do_HEAD(self)
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _authorized(self) -> bool:
+        """Check the bearer token if the service requires one."""
+        if not config.API_TOKEN:
+            return True
+        header = self.headers.get('Authorization', '')
+        if hmac.compare_digest(header.encode('utf-8'), f"Bearer {config.API_TOKEN}".encode('utf-8')):
+            return True
+        self._send_json(401, {'error': "Missing or invalid API token"})
+        return False
+
+    def _handle(self, method: str):
+        if not self._authorized():
+            return
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if method == 'GET' and url.path.startswith('/files/'):
+                self._serve(send_body=True)
+            elif method == 'GET' and url.path == '/metrics':
+                metrics.send_metrics(self)
+            elif method == 'GET' and url.path == '/health':
+                self._send_json(200, {'status': 'ok', 'jobs': len(self.manager.list())})
+            elif method == 'GET' and url.path == '/jobs':
+                self._send_json(200, {'jobs': [job.to_dict() for job in self.manager.list()]})
+            elif method == 'POST' and url.path == '/jobs':
+                self._submit_url()
+            elif method == 'POST' and url.path == '/jobs/upload':
+                self._submit_upload(query)
+            else:
+                self._handle_job(method, url.path, query)
+        except ApiError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _handle_job(self, method: str, path: str, query: Dict[str, str]):
+        match = _JOB_PATH.match(path)
+        if not match:
+            raise ApiError(404, "Not found")
+        job = self.manager.get(match.group(1))
+        if job is None:
+            raise ApiError(404, "Unknown job")
+        action = match.group(2)
+
+        if (method, action) in (('POST', '/cancel'), ('DELETE', None)):
+            cancelled = self.manager.cancel(job.id)
+            self._send_json(202 if cancelled else 409, job.to_dict())
+        elif method == 'GET' and action is None:
+            self._send_json(200, job.to_dict())
+        elif method == 'GET' and action == '/logs':
+            try:
+                offset = int(query.get('offset', '0') or 0)
+            except ValueError:
+                offset = -1
+            if offset < 0:
+                raise ApiError(400, "'offset' must be a non-negative integer")
+            self._send_logs(job, offset, query.get('follow') in ('1', 'true'))
+        elif method == 'GET' and action == '/artifacts':
+            self._send_artifacts(job)
+        elif method == 'GET' and action == '/profile':
+            self._send_profile(job, query.get('format', 'text'))
+        else:
+            raise ApiError(405, "Method not allowed")
+
+    def _submit(self, video_url: str, options: Dict[str, Any], api_key: Optional[str]):
+        api_key = api_key or self.api_key
+        if not api_key:
+            raise ApiError(400, "No AssemblyAI API key configured; pass 'api_key' or set ASSEMBLYAI_API_KEY")
+        self.manager.prune()
+        job = self.manager.submit(video_url=video_url, api_key=api_key, **options)
+        self.send_response(202)
+        body = json.dumps(job.to_dict()).encode('utf-8')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Location', f"/jobs/{job.id}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _submit_url(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_JSON_BYTES:
+            raise ApiError(413, "Request body too large")
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            raise ApiError(400, "Request body must be JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "Request body must be a JSON object")
+
+        video_url = str(body.get('video_url', ''))
+        try:
+            # Only YouTube URLs are accepted here; local files must be uploaded
+            get_video_id(video_url)
+        except ValueError:
+            raise ApiError(400, "Invalid YouTube URL")
+        self._submit(video_url, parse_options(body), body.get('api_key'))
+
+    def _submit_upload(self, query: Dict[str, str]):
+        options = parse_options(query)
+        length = self.headers.get('Content-Length')
+        if length is None:
+            raise ApiError(411, "Content-Length required")
+        length = int(length)
+        if length <= 0:
+            raise ApiError(400, "Empty upload")
+        if length > config.API_MAX_UPLOAD_MB * 1024 * 1024:
+            raise ApiError(413, f"Uploads are limited to {config.API_MAX_UPLOAD_MB} MB")
+
+        filename = re.sub(r'[^\w.\-]', '_', os.path.basename(query.get('filename', 'upload.mp4'))) or 'upload.mp4'
+        config.INPUT_DIR.mkdir(parents=True, exist_ok=True)
+        path = config.INPUT_DIR / f"upload_{uuid.uuid4().hex[:8]}_{filename}"
+
+        # Stream the body to disk so large videos never sit in memory
+        try:
+            with open(path, 'wb') as f:
+                remaining = length
+                while remaining > 0:
+                    chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ApiError(400, "Upload ended early")
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            metrics.BYTES_PROCESSED.inc(length, kind='upload')
+        except Exception:
+            path.unlink(missing_ok=True)
+            raise
+        self._submit(str(path), options, self.headers.get('X-AssemblyAI-Key'))
+
+    def _send_logs(self, job, offset: int, follow: bool):
+        log_path = job_log_path(job.id, self.manager.log_dir or config.JOB_LOG_DIR)
+
+        def read_from(position: int) -> bytes:
+            if not log_path.exists():
+                return b''
+            with open(log_path, 'rb') as f:
+                f.seek(position)
+                return f.read()
+
+        if not follow:
+            data = read_from(offset)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('X-Log-Offset', str(offset + len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        # Stream new lines with chunked encoding until the job has finished
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        while True:
+            done = job.done
+            data = read_from(offset)
+            if data:
+                offset += len(data)
+                self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+                self.wfile.flush()
+            if done:
+                break
+            time.sleep(LOG_POLL_INTERVAL)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_artifacts(self, job):
+        if job.status != COMPLETED or not job.result:
+            raise ApiError(409, f"Job is {job.status}")
+        root = Path(self.root).resolve()
+        directory = Path(job.result).resolve().parent
+        artifacts = []
+        if directory.is_dir():
+            for path in sorted(directory.iterdir()):
+                if path.is_file():
+                    relative = path.relative_to(root).as_posix()
+                    artifacts.append({'name': path.name, 'size': path.stat().st_size, 'url': f"/files/{relative}"})
+        self._send_json(200, {'id': job.id, 'result': job.result, 'artifacts': artifacts})
+
+    def _send_profile(self, job, report_format: str):
+        if report_format not in PROFILE_FORMATS:
+            raise ApiError(400, f"Unknown profile format: {report_format}")
+        directory = self.manager.profile_path(job.id)
+        if directory is None:
+            raise ApiError(404, "No profile for this job; start the service with --profile")
+        filename, content_type = PROFILE_FORMATS[report_format]
+        try:
+            body = (directory / filename).read_bytes()
+        except FileNotFoundError:
+            raise ApiError(404, f"The profile report has no {filename}")
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def create_api_server(manager: JobManager, host: str = config.API_HOST, port: int = config.API_PORT,
+                      api_key: Optional[str] = None) -> ThreadingHTTPServer:
+    """
+    Create (but do not start) the job API server.
+
+    Args:
+        manager (JobManager): Job manager that runs submitted jobs
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free port)
+        api_key (Optional[str]): AssemblyAI key used when a request does not supply one
+
+    Returns:
+        ThreadingHTTPServer: The server; call serve_forever() to run it
+    """
+    handler = type('BoundJobApiHandler', (JobApiHandler,), {
+        'manager': manager,
+        'api_key': api_key,
+        'root': config.OUTPUT_DIR,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def warm_up():
+    """Import the pipeline stages and load the TTS model so the first job starts warm."""
+    from src.pipeline import import_stages
+    from src.tts_generation import preload_tts_model
+    import_stages()
+    preload_tts_model()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python api_server.py', description="Run the job API service")
+    parser.add_argument('--host', default=config.API_HOST, help=f"Interface to bind (default: {config.API_HOST})")
+    parser.add_argument('--port', type=int, default=config.API_PORT, help=f"Port to bind (default: {config.API_PORT})")
+    parser.add_argument('--workers', type=int, default=config.JOB_WORKERS,
+                        help=f"Jobs that run concurrently (default: {config.JOB_WORKERS})")
+    parser.add_argument('--distributed', action='store_true',
+                        help="Hand jobs to worker nodes through WORK_QUEUE_PATH instead of running them here")
+    parser.add_argument('--profile', action='store_true',
+                        help=f"Sample each job with the profiler and keep its report in {config.PROFILE_DIR}")
+    parser.add_argument('--no-warm-up', action='store_true', help="Don't preload pipeline modules and models")
+    args = parser.parse_args(argv)
+
+    config.ensure_directories()
+    logger = setup_logging(str(config.LOG_FILE))
+
+    runner = run_pipeline
+    if args.distributed:
+        if not config.WORK_QUEUE_PATH:
+            parser.error("--distributed needs WORK_QUEUE_PATH")
+        from src.distributed import get_work_queue, make_queue_runner
+        runner = make_queue_runner(get_work_queue())
+
+    manager = JobManager(runner=runner, max_workers=args.workers, store=JobStore(config.JOB_DB_PATH),
+                         log_dir=config.JOB_LOG_DIR, profile_dir=config.PROFILE_DIR if args.profile else None)
+    server = create_api_server(manager, args.host, args.port, api_key=os.getenv('ASSEMBLYAI_API_KEY'))
+    if not args.no_warm_up and not args.distributed:
+        threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+    logger.info(f"Job API listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Shared jobs too: detaching one subscriber would leave them running through shutdown
+        manager.cancel_all()
+        manager.shutdown(wait=True)
+        manager.store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
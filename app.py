@@ -7,11 +7,12 @@ import time
 # Load environment variables
 load_dotenv()
 
-from src.audio_processing import download_audio
-from src.transcription import transcribe_audio
-from src.tts_generation import generate_tts
-from src.video_sync import sync_audio_with_video
-from src.utils import setup_logging, clean_filename, get_video_id, translate_segments
+from src.file_server import start_file_server, file_url
+from src.jobs import Job, JobManager, QUEUED, COMPLETED, FAILED, CANCELLED
+from src.pipeline import STAGES
+from src.tts_generation import model_manager
+from src.utils import get_video_id
+from src.progress import format_time
 from src import config
 
 # Set page configuration
@@ -290,6 +291,85 @@ def create_progress_step(icon: str, title: str, details: str, status: str = "wai
     </div>
     """
 
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Create the background job pool once per server process, shared by all sessions"""
+    return JobManager()
+
+@st.cache_resource
+def get_model_manager():
+    """Share the TTS model manager (and its loaded models) across sessions and reruns"""
+    return model_manager
+
+@st.cache_resource
+def get_file_server():
+    """Start the output file server once per server process"""
+    return start_file_server()
+
+# Icon and titles shown for each pipeline stage: (icon, active title, completed title)
+STAGE_STEPS = {
+    'download': ("📥", "Downloading Video Audio", "Audio Download Complete"),
+    'transcribe': ("🎯", "Transcribing Audio", "Transcription Complete"),
+    'translate': ("🔄", "Translating to German", "Translation Complete"),
+    'tts': ("🗣️", "Generating German Speech", "German Speech Generated"),
+    'sync': ("🎵", "Syncing Audio with Video", "Audio Syncing Complete"),
+}
+
+def render_job(job: Job):
+    """Render the progress, result or error of a background job"""
+    st.progress(job.progress)
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        steps_html = ""
+        for stage, _ in STAGES:
+            icon, active_title, completed_title = STAGE_STEPS[stage]
+            if stage in job.completed_stages:
+                steps_html += create_progress_step("✅", completed_title, "", "completed")
+            elif stage == job.stage and job.status == FAILED:
+                steps_html += create_progress_step("❌", active_title, job.message, "error")
+            elif stage == job.stage:
+                steps_html += create_progress_step(icon, active_title, job.message, "active")
+        if job.status == QUEUED:
+            steps_html += create_progress_step("⏳", "Queued", job.message, "waiting")
+        st.markdown(steps_html, unsafe_allow_html=True)
+    with col2:
+        st.metric("Progress", f"{int(job.progress * 100)}%")
+        if job.eta is not None and not job.done:
+            st.metric("Time left", f"~{format_time(job.eta)}")
+    
+    if job.status == COMPLETED:
+        # Success message with animation
+        st.success("✨ Processing complete! Your video is ready to download.")
+        
+        # Stream the output from the range-request file server instead of loading it into memory
+        get_file_server()
+        st.video(file_url(job.result))
+        st.link_button(
+            label="📥 Download Your Germanized Video",
+            url=file_url(job.result, download=f"germanized_{get_video_id(job.params['video_url'])}.mp4")
+        )
+    elif job.status == FAILED:
+        # Error message with details
+        error_message = f"""
+        <div class="status-message error">
+            <div style="flex-grow: 1">
+                <strong>❌ Error occurred</strong><br>
+                <small>{job.error}</small>
+            </div>
+        </div>
+        """
+        st.markdown(error_message, unsafe_allow_html=True)
+    elif job.status == CANCELLED:
+        st.warning("✖️ Processing was cancelled.")
+    else:
+        if st.button("✖️ Cancel", key=f"cancel_{job.id}"):
+            get_job_manager().cancel(job.id)
+        
+        # Poll the job again shortly; the work itself runs on the worker pool
+        time.sleep(config.JOB_POLL_INTERVAL)
+        st.rerun()
+
 def main():
     # Header with animation
     st.markdown("<h1 class='main-title'>🎥 YouTube Germanizer</h1>", unsafe_allow_html=True)
@@ -339,7 +419,9 @@ def main():
         help="Paste your YouTube video URL here"
     )
     
-    # Process button with loading state
+    job_manager = get_job_manager()
+    
+    # Process button submits a background job instead of running it here
     if st.button("🚀 Start Germanizing", type="primary"):
         if not api_key:
             st.error("⚠️ Please enter your AssemblyAI API Key in the sidebar")
@@ -350,187 +432,28 @@ def main():
             return
         
         try:
-            # Create progress containers
-            progress_placeholder = st.empty()
-            status_placeholder = st.empty()
-            progress_bar = st.progress(0)
-            
-            # Initialize progress steps
-            steps_placeholder = st.container()
-            with steps_placeholder:
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    # Step 1: Download
-                    status_placeholder.markdown(
-                        create_progress_step(
-                            "📥",
-                            "Downloading Video Audio",
-                            "Extracting high-quality audio from YouTube video...",
-                            "active"
-                        ),
-                        unsafe_allow_html=True
-                    )
-                with col2:
-                    st.metric("Progress", "0%")
-                
-            video_id = get_video_id(video_url)
-            audio_path = download_audio(video_url, config.TEMP_DIR)
-            progress_bar.progress(20)
-            
-            # Update status and show completed step 1
-            with steps_placeholder:
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    status_placeholder.markdown(
-                        create_progress_step(
-                            "✅",
-                            "Audio Download Complete",
-                            f"Successfully extracted audio from video ID: {video_id}",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "🎯",
-                            "Transcribing Audio",
-                            "Converting speech to text with speaker detection...",
-                            "active"
-                        ),
-                        unsafe_allow_html=True
-                    )
-                with col2:
-                    st.metric("Progress", "20%")
-            
-            # Step 2: Transcribe
-            transcript = transcribe_audio(audio_path, api_key)
-            progress_bar.progress(40)
-            
-            # Update status and show completed step 2
-            with steps_placeholder:
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    status_placeholder.markdown(
-                        create_progress_step(
-                            "✅",
-                            "Audio Download Complete",
-                            f"Successfully extracted audio from video ID: {video_id}",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "✅",
-                            "Transcription Complete",
-                            f"Processed {len(transcript)} segments of speech",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "🗣️",
-                            "Generating German Speech",
-                            "Creating natural-sounding German audio...",
-                            "active"
-                        ),
-                        unsafe_allow_html=True
-                    )
-                with col2:
-                    st.metric("Progress", "40%")
-            
-            # Step 3: Generate TTS
-            tts_output = generate_tts(transcript, config.TTS_DIR)
-            progress_bar.progress(60)
-            
-            # Update status and show completed step 3
-            with steps_placeholder:
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    status_placeholder.markdown(
-                        create_progress_step(
-                            "✅",
-                            "Audio Download Complete",
-                            f"Successfully extracted audio from video ID: {video_id}",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "✅",
-                            "Transcription Complete",
-                            f"Processed {len(transcript)} segments of speech",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "✅",
-                            "German Speech Generated",
-                            "Created natural German voice audio",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "🎵",
-                            "Syncing Audio with Video",
-                            "Matching speech timing with video...",
-                            "active"
-                        ),
-                        unsafe_allow_html=True
-                    )
-                with col2:
-                    st.metric("Progress", "60%")
-            
-            # Step 4: Sync audio
-            output_path = sync_audio_with_video(video_url, tts_output, config.OUTPUT_DIR)
-            progress_bar.progress(100)
-            
-            # Show all completed steps
-            with steps_placeholder:
-                col1, col2 = st.columns([3, 1])
-                with col1:
-                    status_placeholder.markdown(
-                        create_progress_step(
-                            "✅",
-                            "Audio Download Complete",
-                            f"Successfully extracted audio from video ID: {video_id}",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "✅",
-                            "Transcription Complete",
-                            f"Processed {len(transcript)} segments of speech",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "✅",
-                            "German Speech Generated",
-                            "Created natural German voice audio",
-                            "completed"
-                        ) +
-                        create_progress_step(
-                            "✅",
-                            "Audio Syncing Complete",
-                            "Successfully merged German audio with video",
-                            "completed"
-                        ),
-                        unsafe_allow_html=True
-                    )
-                with col2:
-                    st.metric("Progress", "100%")
-            
-            # Success message with animation
-            st.success("✨ Processing complete! Your video is ready to download.")
-            
-            # Attractive download button with animation
-            with open(output_path, 'rb') as file:
-                st.download_button(
-                    label="📥 Download Your Germanized Video",
-                    data=file,
-                    file_name=f"germanized_{video_id}.mp4",
-                    mime="video/mp4"
-                )
-            
-        except Exception as e:
-            # Error message with details
-            error_message = f"""
-            <div class="status-message error">
-                <div style="flex-grow: 1">
-                    <strong>❌ Error occurred</strong><br>
-                    <small>{str(e)}</small>
-                </div>
-            </div>
-            """
-            st.markdown(error_message, unsafe_allow_html=True)
+            get_video_id(video_url)
+        except ValueError as e:
+            st.error(f"⚠️ {str(e)}")
             return
+        
+        # Warm up the shared TTS model while the earlier stages run
+        get_model_manager().preload(config.TTS_MODEL_NAME)
+        
+        job = job_manager.submit(
+            video_url=video_url,
+            api_key=api_key,
+            audio_quality=audio_quality
+        )
+        # Keep the job ID in the session and the URL so reruns and reconnects find it
+        st.session_state['job_id'] = job.id
+        st.query_params['job'] = job.id
+    
+    job_id = st.session_state.get('job_id') or st.query_params.get('job')
+    job = job_manager.get(job_id) if job_id else None
+    if job is not None:
+        st.session_state['job_id'] = job.id
+        render_job(job)
     
     # Instructions with better organization
     with st.expander("ℹ️ How to use YouTube Germanizer"):
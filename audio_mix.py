@@ -0,0 +1,526 @@
+import os
+import wave
+import struct
+import logging
+import subprocess
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.cancellation import CancellationToken, check_cancelled
+from src.segments import SegmentTable
+from src import config
+
+# Resolution of the ducking gain envelope; it is interpolated to audio rate per chunk
+ENVELOPE_RATE = 200
+
+# Largest sample data a RIFF header can describe; longer soundtracks (about 6.7 hours at 44.1 kHz stereo) become RF64
+RIFF_MAX_DATA = 0xFFFFFFFF - 72
+# Header of a SoundtrackWriter file: RIFF, a JUNK chunk that RF64 turns into ds64, fmt and the data chunk header
+_JUNK_SIZE = 28
+_DATA_OFFSET = 12 + 8 + _JUNK_SIZE + 8 + 16 + 8
+
+class SoundtrackWriter:
+    """
+    Writes 16-bit PCM to a WAV file that may grow past 4 GB.
+
+    The header reserves room for an RF64 ds64 chunk (EBU Tech 3306) in a JUNK
+    chunk. If the data outgrows RIFF_MAX_DATA, close() rewrites the header as
+    RF64; otherwise the file is a plain WAV that every reader accepts. FFmpeg
+    and read_wav_header() read both.
+    """
+
+    def __init__(self, path: str, channels: int, sample_rate: int):
+        """
+        Create the file and write a provisional header.
+
+        Args:
+            path (str): Output path
+            channels (int): Number of channels
+            sample_rate (int): Sample rate in Hz
+        """
+        self.path = path
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self.data_bytes = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        rf64 = self.data_bytes > RIFF_MAX_DATA
+        block_align = self.channels * 2
+        header = b'RF64' if rf64 else b'RIFF'
+        header += struct.pack('<L', 0xFFFFFFFF if rf64 else _DATA_OFFSET - 8 + self.data_bytes) + b'WAVE'
+        if rf64:
+            header += b'ds64' + struct.pack('<LQQQL', _JUNK_SIZE, _DATA_OFFSET - 8 + self.data_bytes,
+                                            self.data_bytes, self.data_bytes // block_align, 0)
+        else:
+            header += b'JUNK' + struct.pack('<L', _JUNK_SIZE) + bytes(_JUNK_SIZE)
+        header += b'fmt ' + struct.pack('<LHHLLHH', 16, 1, self.channels, self.sample_rate,
+                                        self.sample_rate * block_align, block_align, 16)
+        header += b'data' + struct.pack('<L', 0xFFFFFFFF if rf64 else self.data_bytes)
+        self._file.seek(0)
+        self._file.write(header)
+
+    def writeframes(self, data: bytes):
+        """Append interleaved 16-bit little-endian frames."""
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(data)
+        self.data_bytes += len(data)
+
+    def close(self):
+        """Write the final sizes and close the file."""
+        if self._file.closed:
+            return
+        try:
+            self._write_header()
+        finally:
+            self._file.close()
+
+    def __enter__(self) -> 'SoundtrackWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+def read_wav_header(path: str) -> Tuple[int, int, int, int, int]:
+    """
+    Read the format and data location of a PCM WAV or RF64 file.
+
+    Args:
+        path (str): Path of the file
+
+    Returns:
+        Tuple[int, int, int, int, int]: (channels, sample rate, bytes per sample, frames, data offset)
+
+    Raises:
+        ValueError: If the file is not a PCM WAV/RF64 file
+    """
+    with open(path, 'rb') as f:
+        header = f.read(12)
+        if header[:4] not in (b'RIFF', b'RF64') or header[8:12] != b'WAVE':
+            raise ValueError(f"Not a WAV file: {path}")
+        ds64_data_size, channels = None, None
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"No data chunk in {path}")
+            chunk_id, size = chunk[:4], struct.unpack('<L', chunk[4:])[0]
+            if chunk_id == b'ds64':
+                ds64_data_size = struct.unpack('<QQ', f.read(16))[1]
+                f.seek(size - 16, os.SEEK_CUR)
+            elif chunk_id == b'fmt ':
+                channels, sample_rate, _, block_align, bits = struct.unpack('<HLLHH', f.read(16)[2:])
+                f.seek(size - 16, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if channels is None:
+                    raise ValueError(f"No format chunk before the data in {path}")
+                data_offset = f.tell()
+                if size == 0xFFFFFFFF and ds64_data_size is not None:
+                    size = ds64_data_size
+                # A file still being written (or cut short) holds less than its header says
+                size = min(size, os.path.getsize(path) - data_offset)
+                return channels, sample_rate, bits // 8, size // block_align, data_offset
+            else:
+                f.seek(size + size % 2, os.SEEK_CUR)
+
+def decode_audio_stream(path: str, sample_rate: int, channels: int, chunk_frames: int,
+                        cancel_token: Optional[CancellationToken] = None, start: float = 0.0,
+                        duration: Optional[float] = None,
+                        input_args: Optional[List[str]] = None) -> Iterator[np.ndarray]:
+    """
+    Decode a media file's audio with FFmpeg and yield it in fixed-size chunks.
+    
+    Args:
+        path (str): Path to an audio or video file
+        sample_rate (int): Output sample rate in Hz
+        channels (int): Output channel count
+        chunk_frames (int): Frames per yielded chunk
+        cancel_token (Optional[CancellationToken]): Token that kills FFmpeg on cancel
+        start (float): Position in seconds to start decoding at
+        duration (Optional[float]): Seconds to decode (None: to the end)
+        input_args (Optional[List[str]]): Extra FFmpeg input options (e.g. to follow a growing file)
+    
+    Yields:
+        np.ndarray: Float32 audio of shape (frames, channels)
+    """
+    cmd = ['ffmpeg', '-v', 'error']
+    if start > 0:
+        cmd += ['-ss', f"{start:.6f}"]
+    cmd += list(input_args or []) + ['-i', path, '-vn']
+    if duration is not None:
+        cmd += ['-t', f"{duration:.6f}"]
+    cmd += ['-f', 'f32le', '-ac', str(channels), '-ar', str(sample_rate), '-']
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    if cancel_token is not None:
+        cancel_token.register_process(process)
+    chunk_bytes = chunk_frames * channels * 4
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            if not data:
+                break
+            usable = len(data) - len(data) % (channels * 4)
+            yield np.frombuffer(data[:usable], dtype='<f4').reshape(-1, channels)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+        if cancel_token is not None:
+            cancel_token.unregister_process(process)
+        check_cancelled(cancel_token)
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """
+    Resample 1-D audio with linear interpolation.
+    
+    Args:
+        samples (np.ndarray): Float audio
+        source_rate (int): Sample rate of the input
+        target_rate (int): Desired sample rate
+    
+    Returns:
+        np.ndarray: Resampled float32 audio
+    """
+    if source_rate == target_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+    length = int(round(len(samples) * target_rate / source_rate))
+    positions = np.arange(length) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+def load_segment_audio(path: str, sample_rate: int) -> np.ndarray:
+    """
+    Load a TTS segment as mono float32 audio at the mix sample rate.
+    
+    Args:
+        path (str): Path to the segment audio (16-bit WAV is read directly, other formats via FFmpeg)
+        sample_rate (int): Mix sample rate in Hz
+    
+    Returns:
+        np.ndarray: Mono float32 audio
+    """
+    if path.lower().endswith('.wav'):
+        with wave.open(path, 'rb') as wav_file:
+            if wav_file.getsampwidth() == 2:
+                channels = wav_file.getnchannels()
+                pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype='<i2')
+                samples = pcm.reshape(-1, channels).mean(axis=1) / 32768.0
+                return resample(samples, wav_file.getframerate(), sample_rate)
+    
+    chunks = list(decode_audio_stream(path, sample_rate, 1, sample_rate * 60))
+    return np.concatenate(chunks)[:, 0] if chunks else np.zeros(0, dtype=np.float32)
+
+def segment_duration_ms(segment: Dict) -> float:
+    """
+    Get the duration of a segment's synthesized audio, falling back to its transcript timing.
+    
+    Args:
+        segment (Dict): TTS segment with 'audio_path', 'start' and 'end'
+    
+    Returns:
+        float: Duration in milliseconds
+    """
+    path = segment['audio_path']
+    if path.lower().endswith('.wav') and os.path.exists(path):
+        with wave.open(path, 'rb') as wav_file:
+            return wav_file.getnframes() * 1000.0 / wav_file.getframerate()
+    return float(segment['end'] - segment['start'])
+
+def build_ducking_envelope(intervals_ms: List[Tuple[float, float]], duration_ms: float,
+                           duck_db: float = config.DUCK_DB, attack_ms: float = config.DUCK_ATTACK_MS,
+                           release_ms: float = config.DUCK_RELEASE_MS, rate: int = ENVELOPE_RATE) -> np.ndarray:
+    """
+    Build a background gain envelope that dips while the dub is speaking.
+    
+    The gain ramps down linearly over attack_ms before each speech interval and
+    back up over release_ms after it. Everything is computed with whole-array
+    operations: interval coverage via a cumulative sum, distances to the
+    nearest speech via running max/min of sample indices.
+    
+    Args:
+        intervals_ms (List[Tuple[float, float]]): (start, end) speech intervals in milliseconds
+        duration_ms (float): Length of the soundtrack in milliseconds
+        duck_db (float): Background gain while speech is active, in dB (negative)
+        attack_ms (float): Fade-down time before speech in milliseconds
+        release_ms (float): Fade-up time after speech in milliseconds
+        rate (int): Envelope sample rate in Hz
+    
+    Returns:
+        np.ndarray: Linear gain per envelope sample (float32)
+    """
+    n = int(np.ceil(duration_ms * rate / 1000.0)) + 1
+    if not intervals_ms:
+        return np.ones(n, dtype=np.float32)
+    
+    bounds = np.asarray(intervals_ms, dtype=np.float64) * rate / 1000.0
+    starts = np.clip(np.floor(bounds[:, 0]).astype(np.int64), 0, n)
+    ends = np.clip(np.ceil(bounds[:, 1]).astype(np.int64), 0, n)
+    
+    # Coverage count of overlapping intervals
+    delta = np.zeros(n + 1, dtype=np.int32)
+    np.add.at(delta, starts, 1)
+    np.add.at(delta, ends, -1)
+    active = np.cumsum(delta[:-1]) > 0
+    
+    # Distance (in envelope samples) since the last and until the next active sample
+    index = np.arange(n, dtype=np.float64)
+    last_active = np.maximum.accumulate(np.where(active, index, -np.inf))
+    next_active = np.minimum.accumulate(np.where(active, index, np.inf)[::-1])[::-1]
+    since = index - last_active
+    until = next_active - index
+    
+    release = max(release_ms * rate / 1000.0, 1.0)
+    attack = max(attack_ms * rate / 1000.0, 1.0)
+    ramp = np.minimum(np.clip(since / release, 0.0, 1.0), np.clip(until / attack, 0.0, 1.0))
+    
+    duck_gain = 10.0 ** (duck_db / 20.0)
+    return (duck_gain + (1.0 - duck_gain) * ramp).astype(np.float32)
+
+def _write_chunk(wav_file, mix: np.ndarray):
+    pcm = (np.clip(mix, -1.0, 1.0) * 32767).astype('<i2')
+    wav_file.writeframes(pcm.tobytes())
+
+def mix_soundtrack(tts_segments: List[Dict], output_path: str, duration: float,
+                   background_path: Optional[str] = None, duck_db: float = config.DUCK_DB,
+                   attack_ms: float = config.DUCK_ATTACK_MS, release_ms: float = config.DUCK_RELEASE_MS,
+                   background_gain_db: float = config.BACKGROUND_GAIN_DB,
+                   sample_rate: int = config.MIX_SAMPLE_RATE,
+                   cancel_token: Optional[CancellationToken] = None) -> str:
+    """
+    Place TTS segments on a timeline and optionally mix them over the ducked original audio.
+    
+    The background is decoded once and processed in fixed-size chunks, so
+    memory use does not grow with the length of the video.
+    
+    Args:
+        tts_segments (List[Dict]): Segments (or a SegmentTable) with 'audio_path' and 'start' in milliseconds
+        output_path (str): Path of the 16-bit stereo WAV to write (RF64 beyond 4 GB)
+        duration (float): Length of the soundtrack in seconds
+        background_path (Optional[str]): Media file whose audio is kept under the dub (None: dub only)
+        duck_db (float): Background gain while the dub is speaking, in dB
+        attack_ms (float): Fade-down time before speech in milliseconds
+        release_ms (float): Fade-up time after speech in milliseconds
+        background_gain_db (float): Overall background gain in dB
+        sample_rate (int): Mix sample rate in Hz
+        cancel_token (Optional[CancellationToken]): Token checked between chunks
+    
+    Returns:
+        str: Path to the mixed soundtrack
+    """
+    logger = logging.getLogger('yt_germanizer')
+    channels = 2
+    chunk_frames = sample_rate * config.MIX_CHUNK_SECONDS
+    total_frames = int(round(duration * sample_rate))
+    
+    segments = SegmentTable.coerce(tts_segments).sorted_by_start()
+    starts = np.round(segments.start * (sample_rate / 1000.0)).astype(np.int64).tolist()
+    
+    envelope = None
+    if background_path:
+        intervals = [(segment['start'], segment['start'] + segment_duration_ms(segment)) for segment in segments]
+        envelope = build_ducking_envelope(intervals, duration * 1000.0, duck_db, attack_ms, release_ms)
+        envelope *= 10.0 ** (background_gain_db / 20.0)
+        background = decode_audio_stream(background_path, sample_rate, channels, chunk_frames, cancel_token)
+        logger.info(f"Mixing dub over ducked original audio ({duck_db} dB)")
+    
+    loaded: Dict[int, np.ndarray] = {}
+    next_segment = 0
+    carry = np.zeros((0, channels), dtype=np.float32)
+    
+    wav_file = SoundtrackWriter(output_path, channels, sample_rate)
+    try:
+        for chunk_start in range(0, total_frames, chunk_frames):
+            check_cancelled(cancel_token)
+            chunk_end = min(chunk_start + chunk_frames, total_frames)
+            length = chunk_end - chunk_start
+            
+            if envelope is not None:
+                # Background: fill the chunk from the decoder, then apply the envelope in one multiply
+                parts, have = [carry], len(carry)
+                while have < length:
+                    block = next(background, None)
+                    if block is None:
+                        break
+                    parts.append(block)
+                    have += len(block)
+                data = np.concatenate(parts)
+                chunk, carry = data[:length], data[length:]
+                if len(chunk) < length:
+                    chunk = np.vstack([chunk, np.zeros((length - len(chunk), channels), dtype=np.float32)])
+                times = np.arange(chunk_start, chunk_end) * (ENVELOPE_RATE / sample_rate)
+                gain = np.interp(times, np.arange(len(envelope)), envelope).astype(np.float32)
+                mix = chunk * gain[:, None]
+            else:
+                mix = np.zeros((length, channels), dtype=np.float32)
+            
+            # Load segments that start before the end of this chunk
+            while next_segment < len(segments) and starts[next_segment] < chunk_end:
+                loaded[next_segment] = load_segment_audio(segments[next_segment]['audio_path'], sample_rate)
+                next_segment += 1
+            
+            # Sum in every loaded segment that overlaps this chunk
+            for index in list(loaded):
+                audio = loaded[index]
+                seg_start = starts[index]
+                seg_end = seg_start + len(audio)
+                if seg_end <= chunk_start:
+                    del loaded[index]
+                    continue
+                lo = max(seg_start, chunk_start)
+                hi = min(seg_end, chunk_end)
+                if hi > lo:
+                    mix[lo - chunk_start:hi - chunk_start] += audio[lo - seg_start:hi - seg_start, None]
+            
+            _write_chunk(wav_file, mix)
+    finally:
+        wav_file.close()
+        if envelope is not None:
+            background.close()
+    return output_path
+
+def _prepare_segments(tts_segments: List[Dict], sample_rate: int) -> Tuple[SegmentTable, List[float], np.ndarray, np.ndarray]:
+    """Sort segments and get their audio durations (ms) and start/end frames."""
+    segments = SegmentTable.coerce(tts_segments).sorted_by_start()
+    durations = [segment_duration_ms(segment) for segment in segments]
+    starts = np.round(segments.start * (sample_rate / 1000.0)).astype(np.int64)
+    ends = starts + np.ceil(np.asarray(durations, dtype=np.float64) * (sample_rate / 1000.0)).astype(np.int64)
+    return segments, durations, starts, ends
+
+def _render_chunk(segments: SegmentTable, starts: np.ndarray, ends: np.ndarray, envelope: Optional[np.ndarray],
+                  background_path: Optional[str], chunk_start: int, chunk_end: int, channels: int,
+                  sample_rate: int, cancel_token: Optional[CancellationToken] = None) -> np.ndarray:
+    """Render frames [chunk_start, chunk_end) from scratch, exactly as mix_soundtrack() renders them."""
+    length = chunk_end - chunk_start
+    if envelope is not None:
+        blocks = list(decode_audio_stream(background_path, sample_rate, channels, length, cancel_token,
+                                          start=chunk_start / sample_rate, duration=length / sample_rate))
+        chunk = np.concatenate(blocks)[:length] if blocks else np.zeros((0, channels), dtype=np.float32)
+        if len(chunk) < length:
+            chunk = np.vstack([chunk, np.zeros((length - len(chunk), channels), dtype=np.float32)])
+        times = np.arange(chunk_start, chunk_end) * (ENVELOPE_RATE / sample_rate)
+        gain = np.interp(times, np.arange(len(envelope)), envelope).astype(np.float32)
+        mix = chunk * gain[:, None]
+    else:
+        mix = np.zeros((length, channels), dtype=np.float32)
+    
+    for index in np.nonzero((starts < chunk_end) & (ends > chunk_start))[0].tolist():
+        audio = load_segment_audio(segments[index]['audio_path'], sample_rate)
+        seg_start = int(starts[index])
+        lo = max(seg_start, chunk_start)
+        hi = min(seg_start + len(audio), chunk_end)
+        if hi > lo:
+            mix[lo - chunk_start:hi - chunk_start] += audio[lo - seg_start:hi - seg_start, None]
+    return mix
+
+def _envelope(segments: SegmentTable, durations: List[float], duration_ms: float, duck_db: float,
+              attack_ms: float, release_ms: float, background_gain_db: float) -> np.ndarray:
+    intervals = [(int(start), int(start) + duration) for start, duration in zip(segments.start, durations)]
+    envelope = build_ducking_envelope(intervals, duration_ms, duck_db, attack_ms, release_ms)
+    envelope *= 10.0 ** (background_gain_db / 20.0)
+    return envelope
+
+def patch_soundtrack(tts_segments: List[Dict], soundtrack_path: str, windows_ms: List[Tuple[float, float]],
+                     background_path: Optional[str] = None, duck_db: float = config.DUCK_DB,
+                     attack_ms: float = config.DUCK_ATTACK_MS, release_ms: float = config.DUCK_RELEASE_MS,
+                     background_gain_db: float = config.BACKGROUND_GAIN_DB,
+                     cancel_token: Optional[CancellationToken] = None) -> int:
+    """
+    Re-mix time windows of a soundtrack written by mix_soundtrack() in place.
+    
+    Each window is rendered from scratch exactly as the full mix would render
+    it (background, ducking envelope of all segments, every segment that
+    overlaps the window), so only the windows around edited segments need to
+    be decoded and written. A cancelled or failed call leaves the file partly
+    patched, so callers that must not lose the old mix patch a copy.
+    
+    Args:
+        tts_segments (List[Dict]): All segments (or a SegmentTable) with 'audio_path' and 'start'
+        soundtrack_path (str): 16-bit stereo WAV (or RF64) to patch
+        windows_ms (List[Tuple[float, float]]): (start, end) windows in milliseconds
+        background_path (Optional[str]): Original audio that was mixed under the dub (None: dub only)
+        duck_db (float): Background gain while the dub is speaking, in dB
+        attack_ms (float): Fade-down time before speech in milliseconds
+        release_ms (float): Fade-up time after speech in milliseconds
+        background_gain_db (float): Overall background gain in dB
+        cancel_token (Optional[CancellationToken]): Token checked between chunks
+    
+    Returns:
+        int: Number of frames rewritten
+    """
+    channels, sample_rate, sample_width, total_frames, data_offset = read_wav_header(soundtrack_path)
+    if sample_width != 2:
+        raise ValueError(f"Expected a 16-bit soundtrack: {soundtrack_path}")
+    frame_bytes = channels * 2
+    chunk_frames = sample_rate * config.MIX_CHUNK_SECONDS
+    
+    segments, durations, starts, ends = _prepare_segments(tts_segments, sample_rate)
+    envelope = None
+    if background_path:
+        envelope = _envelope(segments, durations, total_frames * 1000.0 / sample_rate, duck_db, attack_ms,
+                             release_ms, background_gain_db)
+    
+    written = 0
+    with open(soundtrack_path, 'r+b') as out:
+        for window_start, window_end in windows_ms:
+            first = max(int(window_start * sample_rate / 1000.0), 0)
+            last = min(int(np.ceil(window_end * sample_rate / 1000.0)), total_frames)
+            for chunk_start in range(first, last, chunk_frames):
+                check_cancelled(cancel_token)
+                chunk_end = min(chunk_start + chunk_frames, last)
+                mix = _render_chunk(segments, starts, ends, envelope, background_path, chunk_start, chunk_end,
+                                    channels, sample_rate, cancel_token)
+                out.seek(data_offset + chunk_start * frame_bytes)
+                out.write((np.clip(mix, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+                written += chunk_end - chunk_start
+    return written
+
+def mix_window(tts_segments: List[Dict], output_path: str, start: float, end: float,
+               background_path: Optional[str] = None, duck_db: float = config.DUCK_DB,
+               attack_ms: float = config.DUCK_ATTACK_MS, release_ms: float = config.DUCK_RELEASE_MS,
+               background_gain_db: float = config.BACKGROUND_GAIN_DB,
+               sample_rate: int = config.MIX_SAMPLE_RATE,
+               cancel_token: Optional[CancellationToken] = None) -> str:
+    """
+    Mix one time window of the soundtrack into its own WAV file.
+    
+    The samples are the ones mix_soundtrack() would write for the window, as
+    long as tts_segments includes every segment that overlaps the window or
+    starts within attack_ms after it.
+    
+    Args:
+        tts_segments (List[Dict]): Segments (or a SegmentTable) with 'audio_path' and 'start'
+        output_path (str): Path of the 16-bit stereo WAV to write
+        start (float): Window start in seconds
+        end (float): Window end in seconds
+        background_path (Optional[str]): Media file whose audio is kept under the dub (None: dub only)
+        duck_db (float): Background gain while the dub is speaking, in dB
+        attack_ms (float): Fade-down time before speech in milliseconds
+        release_ms (float): Fade-up time after speech in milliseconds
+        background_gain_db (float): Overall background gain in dB
+        sample_rate (int): Mix sample rate in Hz
+        cancel_token (Optional[CancellationToken]): Token checked between chunks
+    
+    Returns:
+        str: Path to the window's audio
+    """
+    channels = 2
+    chunk_frames = sample_rate * config.MIX_CHUNK_SECONDS
+    first, last = int(round(start * sample_rate)), int(round(end * sample_rate))
+    segments, durations, starts, ends = _prepare_segments(tts_segments, sample_rate)
+    envelope = None
+    if background_path:
+        # Long enough for segments starting just after the window to fade the background down
+        envelope = _envelope(segments, durations, end * 1000.0 + attack_ms, duck_db, attack_ms, release_ms,
+                             background_gain_db)
+    
+    with wave.open(output_path, 'wb') as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        for chunk_start in range(first, last, chunk_frames):
+            check_cancelled(cancel_token)
+            chunk_end = min(chunk_start + chunk_frames, last)
+            _write_chunk(wav_file, _render_chunk(segments, starts, ends, envelope, background_path, chunk_start,
+                                                 chunk_end, channels, sample_rate, cancel_token))
+    return output_path
@@ -1,10 +1,20 @@
-from moviepy.editor import AudioFileClip
 import os
 import time
+import hashlib
 import logging
-from typing import Optional
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
 import yt_dlp
 import re
+from src.cancellation import CancellationToken, JobCancelled, check_cancelled, run_process
+from src import metrics
+from src import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: only downloads within this process are serialized
+    fcntl = None
 
 def get_video_id(video_url: str) -> str:
     """
@@ -18,7 +28,7 @@ def get_video_id(video_url: str) -> str:
     """
     # Support both standard and shortened YouTube URLs
     if 'youtu.be' in video_url:
-        return video_url.split('/')[-1]
+        return video_url.split('/')[-1].split('?')[0]
     else:
         pattern = r'(?:v=|\/)([0-9A-Za-z_-]{11}).*'
         match = re.search(pattern, video_url)
@@ -26,7 +36,97 @@ def get_video_id(video_url: str) -> str:
             return match.group(1)
         raise ValueError("Invalid YouTube URL")
 
-def download_audio(video_url: str, output_dir: str, quality: str = '192') -> str:
+def acquisition_profile() -> Dict:
+    """
+    Get the configured acquisition profile (see config.ACQUISITION_PROFILES).
+    
+    Returns:
+        Dict: Formats and extras to fetch
+    """
+    try:
+        return config.ACQUISITION_PROFILES[config.ACQUISITION_PROFILE]
+    except KeyError:
+        raise ValueError(f"Unknown acquisition profile: {config.ACQUISITION_PROFILE} "
+                         f"(choose from {', '.join(config.ACQUISITION_PROFILES)})")
+
+# Partial files have stable names so they can be resumed, so two jobs must not fetch the same source at once
+_partial_locks: Dict[str, threading.Lock] = {}
+_partial_locks_guard = threading.Lock()
+
+@contextmanager
+def partial_download_lock(video_url: str, format_spec: str,
+                          cancel_token: Optional[CancellationToken] = None) -> Iterator[None]:
+    """
+    Serialize downloads of one source stream into PARTIAL_DOWNLOAD_DIR.
+    
+    Partial files are named after the video ID and format, so the lock is keyed
+    on those too: every URL form of a video (watch?v=, youtu.be, extra query
+    parameters) shares one lock. Besides the in-process lock, a file lock in
+    PARTIAL_DOWNLOAD_DIR keeps other processes (distributed workers, a CLI run
+    next to the API server) out. Waiting is cancellable.
+    
+    Args:
+        video_url (str): YouTube video URL
+        format_spec (str): yt-dlp format selector (different formats may download in parallel)
+        cancel_token (Optional[CancellationToken]): Token checked while waiting for the lock
+        
+    Raises:
+        JobCancelled: If the job is cancelled while waiting
+    """
+    try:
+        source = get_video_id(video_url)
+    except ValueError:
+        # Other sites yt-dlp supports: no ID to normalize to
+        source = video_url
+    key = f"{source}:{format_spec}"
+    with _partial_locks_guard:
+        lock = _partial_locks.setdefault(key, threading.Lock())
+    while not lock.acquire(timeout=0.5):
+        check_cancelled(cancel_token)
+    try:
+        config.PARTIAL_DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        lock_path = config.PARTIAL_DOWNLOAD_DIR / f".{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}.lock"
+        with open(lock_path, 'a') as lock_file:
+            while fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    check_cancelled(cancel_token)
+                    time.sleep(0.5)
+            # Closing the file releases the file lock
+            yield
+    finally:
+        lock.release()
+
+def download_options(output_dir: str, cancel_token: Optional[CancellationToken] = None) -> Dict:
+    """
+    yt-dlp options shared by audio and video downloads.
+    
+    Fragmented (DASH/HLS) formats are fetched in parallel. Partial files are
+    kept in PARTIAL_DOWNLOAD_DIR, outside the job workspace, so an interrupted
+    transfer resumes from where it stopped, within the job and on a re-run.
+    
+    Args:
+        output_dir (str): Directory for the finished file
+        cancel_token (Optional[CancellationToken]): Token that aborts the download
+        
+    Returns:
+        Dict: yt-dlp options
+    """
+    return {
+        'paths': {'home': output_dir, 'temp': str(config.PARTIAL_DOWNLOAD_DIR)},
+        'outtmpl': '%(id)s.%(ext)s',
+        'concurrent_fragment_downloads': config.DOWNLOAD_CONCURRENT_FRAGMENTS,
+        'http_chunk_size': config.DOWNLOAD_CHUNK_MB * 1024 * 1024,
+        'continuedl': True,
+        'retries': config.DOWNLOAD_RETRIES,
+        'fragment_retries': config.DOWNLOAD_RETRIES,
+        'progress_hooks': [lambda status: check_cancelled(cancel_token)]  # Abort between fragments on cancel
+    }
+
+def download_audio(video_url: str, output_dir: str, quality: str = '192',
+                   cancel_token: Optional[CancellationToken] = None) -> str:
     """
     Download audio from a YouTube video URL using yt-dlp.
     
@@ -34,6 +134,7 @@ def download_audio(video_url: str, output_dir: str, quality: str = '192') -> str
         video_url (str): YouTube video URL
         output_dir (str): Directory to save the downloaded audio
         quality (str): Audio quality in kbps (default: '192')
+        cancel_token (Optional[CancellationToken]): Token that aborts the download
         
     Returns:
         str: Path to the downloaded audio file
@@ -49,51 +150,120 @@ def download_audio(video_url: str, output_dir: str, quality: str = '192') -> str
     video_id = get_video_id(video_url)
     output_path = os.path.join(output_dir, f"{video_id}.mp3")
     
-    # Configure yt-dlp options for best audio quality
-    ydl_opts = {
-        'format': 'm4a/bestaudio/best',  # Prefer m4a format for better quality
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': quality,
-        }],
-        'outtmpl': os.path.join(output_dir, '%(id)s.%(ext)s'),
+    # Only the audio stream; re-encoding and extras depend on the acquisition profile
+    profile = acquisition_profile()
+    ydl_opts = download_options(output_dir, cancel_token)
+    ydl_opts.update({
+        'format': profile['audio_format'],
         'quiet': False,
         'no_warnings': True,
-        'extract_audio': True,
-        'audio_quality': 0,  # Best audio quality
-        'postprocessor_args': [
-            '-ar', '44100'  # Set audio sample rate
-        ],
-        'writethumbnail': True,  # Download video thumbnail
-        'writesubtitles': True,  # Download subtitles if available
-        'writeautomaticsub': True  # Download auto-generated subtitles if available
-    }
+        'writethumbnail': profile['thumbnail'],  # Download video thumbnail
+        'writesubtitles': profile['captions'],  # Download subtitles if available
+        'writeautomaticsub': profile['captions'],  # Download auto-generated subtitles if available
+    })
+    if profile['transcode_audio']:
+        ydl_opts.update({
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': quality,
+            }],
+            'extract_audio': True,
+            'audio_quality': 0,  # Best audio quality
+            'postprocessor_args': [
+                '-ar', '44100'  # Set audio sample rate
+            ],
+        })
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with partial_download_lock(video_url, ydl_opts['format'], cancel_token), yt_dlp.YoutubeDL(ydl_opts) as ydl:
             # Get video info first
             logger.info("Retrieving video information...")
-            info = ydl.extract_info(video_url, download=False)
+            with metrics.external_call('youtube'):
+                info = ydl.extract_info(video_url, download=False)
             
             # Check if video is available
             if info.get('is_live'):
-                raise ValueError("Live streams are not supported")
+                raise ValueError("Live streams are not supported (use main.py --windowed)")
                 
             # Download the video
             logger.info(f"Downloading audio from video: {info.get('title', video_id)}")
-            ydl.download([video_url])
+            with metrics.external_call('youtube'):
+                ydl.download([video_url])
+            if not profile['transcode_audio']:
+                # Kept in the container of the selected format
+                output_path = ydl.prepare_filename(info)
             
             # Verify the downloaded file exists
             if not os.path.exists(output_path):
                 raise FileNotFoundError(f"Downloaded audio file not found at {output_path}")
             
             logger.info(f"Successfully downloaded audio to {output_path}")
+            metrics.add_file_bytes('audio_download', output_path)
             return output_path
             
+    except JobCancelled:
+        raise
     except yt_dlp.utils.DownloadError as e:
+        check_cancelled(cancel_token)
         logger.error(f"YouTube download error: {str(e)}")
         raise Exception(f"Error downloading video: {str(e)}")
     except Exception as e:
         logger.error(f"Error downloading audio: {str(e)}")
         raise Exception(f"Error downloading audio: {str(e)}")
+
+def extract_audio(video_path: str, output_dir: str, quality: str = '192',
+                  cancel_token: Optional[CancellationToken] = None) -> str:
+    """
+    Extract the audio track of a local video file as MP3 using FFmpeg.
+    
+    Args:
+        video_path (str): Path to the video file
+        output_dir (str): Directory to save the extracted audio
+        quality (str): Audio quality in kbps (default: '192')
+        cancel_token (Optional[CancellationToken]): Token that kills FFmpeg on cancel
+        
+    Returns:
+        str: Path to the extracted audio file
+    """
+    logger = logging.getLogger('yt_germanizer')
+    
+    os.makedirs(output_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    output_path = os.path.join(output_dir, f"{name}.mp3")
+    
+    logger.info(f"Extracting audio from {video_path}...")
+    cmd = [
+        'ffmpeg', '-y', '-i', video_path, '-vn',
+        '-ar', '44100', '-b:a', f'{quality}k', output_path
+    ]
+    process = run_process(cmd, cancel_token)
+    if process.returncode != 0:
+        raise Exception(f"Error extracting audio: {process.stderr.strip()}")
+    
+    logger.info(f"Successfully extracted audio to {output_path}")
+    return output_path
+
+def get_source_duration(video_url: str) -> float:
+    """
+    Get the duration of a YouTube video or local video file without downloading it.
+    
+    Args:
+        video_url (str): YouTube video URL, or path to a local video file
+        
+    Returns:
+        float: Duration in seconds
+    """
+    if os.path.isfile(video_url):
+        from src.media_probe import get_duration
+        return get_duration(video_url)
+    
+    try:
+        with metrics.external_call('youtube'):
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                info = ydl.extract_info(video_url, download=False)
+    except Exception as e:
+        raise Exception(f"Error reading video info: {str(e)}")
+    if not info.get('duration'):
+        raise Exception("Video duration is unknown (live stream?)")
+    return float(info['duration'])
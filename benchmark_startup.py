@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Measure cold-start time of the CLI entry points.
+
+Each scenario runs in a fresh interpreter so import caches from earlier runs
+do not hide slow imports. Usage:
+
+    python benchmark_startup.py [--runs N] [--importtime]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import contextmanager
+from pathlib import Path
+
+PACKAGE_DIR = Path(os.path.abspath(__file__)).parent
+SAMPLE_URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+# Scenario name -> command run from the project root (see project_root)
+SCENARIOS = {
+    'help': [sys.executable, str(PACKAGE_DIR / 'main.py'), '--help'],
+    'validate': [sys.executable, str(PACKAGE_DIR / 'main.py'), '--validate', SAMPLE_URL],
+    'full-run imports': [sys.executable, '-c', 'from src.pipeline import import_stages; import_stages()'],
+}
+
+class ScenarioFailed(Exception):
+    """A scenario exited with an error, so its timing would be meaningless."""
+
+@contextmanager
+def project_root():
+    """
+    Provide a directory from which the package imports as src.
+
+    Modules import each other as src.*. A checkout named src is used as is;
+    any other checkout is linked as src into a temporary directory, so the
+    scenarios import it exactly as they would from an installed tree.
+
+    Yields:
+        Path: Directory to put on PYTHONPATH and run the scenarios from
+    """
+    if PACKAGE_DIR.name == 'src':
+        yield PACKAGE_DIR.parent
+        return
+    root = Path(tempfile.mkdtemp(prefix='benchmark_startup_'))
+    try:
+        (root / 'src').symlink_to(PACKAGE_DIR, target_is_directory=True)
+        yield root
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+def scenario_env(root: Path) -> dict:
+    """Environment for scenarios with the project root on PYTHONPATH."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(root), env.get('PYTHONPATH')]))
+    return env
+
+def time_command(cmd, runs: int, root: Path):
+    """
+    Run a command several times and collect wall-clock durations.
+
+    Args:
+        cmd (list): Command and arguments
+        runs (int): Number of runs
+        root (Path): Project root from project_root()
+
+    Returns:
+        list: Durations in seconds
+    
+    Raises:
+        ScenarioFailed: If a run exits with a non-zero status
+    """
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        process = subprocess.run(cmd, cwd=root, env=scenario_env(root), stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, text=True)
+        durations.append(time.perf_counter() - start)
+        if process.returncode != 0:
+            output = process.stderr.strip() or process.stdout.strip()
+            last_line = (output.splitlines() or [''])[-1]
+            raise ScenarioFailed(f"exit status {process.returncode}: {last_line}")
+    return durations
+
+def slowest_imports(cmd, root: Path, top: int = 10):
+    """
+    Report the imports with the highest cumulative time using -X importtime.
+
+    Args:
+        cmd (list): Python command and arguments
+        root (Path): Project root from project_root()
+        top (int): Number of imports to report
+
+    Returns:
+        list: (cumulative microseconds, module name) tuples, slowest first
+    """
+    cmd = [cmd[0], '-X', 'importtime'] + cmd[1:]
+    process = subprocess.run(cmd, cwd=root, env=scenario_env(root), stdout=subprocess.DEVNULL,
+                             stderr=subprocess.PIPE, text=True)
+    entries = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        entries.append((int(cumulative), name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI cold-start time")
+    parser.add_argument('--runs', type=int, default=5, help="Runs per scenario (default: 5)")
+    parser.add_argument('--importtime', action='store_true', help="Show the slowest imports per scenario")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<20} {'min':>9} {'median':>9} {'max':>9}")
+    failed = 0
+    with project_root() as root:
+        for name, cmd in SCENARIOS.items():
+            try:
+                durations = time_command(cmd, args.runs, root)
+            except ScenarioFailed as e:
+                print(f"{name:<20} FAILED ({str(e)})")
+                failed += 1
+                continue
+            print(f"{name:<20} {min(durations):>8.3f}s {statistics.median(durations):>8.3f}s {max(durations):>8.3f}s")
+            if args.importtime:
+                for cumulative, module in slowest_imports(cmd, root):
+                    print(f"    {cumulative / 1000:>8.1f}ms  {module}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
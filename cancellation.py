@@ -0,0 +1,128 @@
+import subprocess
+import threading
+from typing import List, Optional
+
+class JobCancelled(Exception):
+    """Raised inside a pipeline stage when its job has been cancelled."""
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag shared between a job and its stages.
+
+    Stages call check() at safe points; child processes registered with the
+    token are killed as soon as cancel() is called.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: List[subprocess.Popen] = []
+        self._children: List['CancellationToken'] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether cancellation has been requested."""
+        return self._event.is_set()
+
+    def cancel(self):
+        """Request cancellation and kill any registered child processes."""
+        self._event.set()
+        with self._lock:
+            processes = list(self._processes)
+            children = list(self._children)
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+        for child in children:
+            child.cancel()
+
+    def child(self) -> 'CancellationToken':
+        """
+        Create a token that is cancelled along with this one but can also be cancelled on its own.
+
+        Returns:
+            CancellationToken: The child token
+        """
+        token = CancellationToken()
+        with self._lock:
+            self._children.append(token)
+        if self.cancelled:
+            token.cancel()
+        return token
+
+    def release_child(self, token: 'CancellationToken'):
+        """Stop tracking a child token whose work has finished."""
+        with self._lock:
+            if token in self._children:
+                self._children.remove(token)
+
+    def check(self):
+        """
+        Raise if cancellation has been requested.
+
+        Raises:
+            JobCancelled: If the job has been cancelled
+        """
+        if self._event.is_set():
+            raise JobCancelled("Job was cancelled")
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Sleep for up to timeout seconds, waking early on cancellation.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds
+
+        Returns:
+            bool: True if the job was cancelled
+        """
+        return self._event.wait(timeout)
+
+    def register_process(self, process: subprocess.Popen):
+        """Track a child process so cancel() can kill it."""
+        with self._lock:
+            self._processes.append(process)
+        if self.cancelled and process.poll() is None:
+            process.kill()
+
+    def unregister_process(self, process: subprocess.Popen):
+        """Stop tracking a finished child process."""
+        with self._lock:
+            if process in self._processes:
+                self._processes.remove(process)
+
+def check_cancelled(cancel_token: Optional[CancellationToken]):
+    """
+    Raise JobCancelled if the optional token has been cancelled.
+
+    Args:
+        cancel_token (Optional[CancellationToken]): Token to check, may be None
+    """
+    if cancel_token is not None:
+        cancel_token.check()
+
+def run_process(cmd: List[str], cancel_token: Optional[CancellationToken] = None) -> subprocess.CompletedProcess:
+    """
+    Run a command with captured text output, killing it if the job is cancelled.
+
+    Args:
+        cmd (List[str]): Command and arguments
+        cancel_token (Optional[CancellationToken]): Token that can abort the command
+
+    Returns:
+        subprocess.CompletedProcess: Finished process with stdout and stderr
+
+    Raises:
+        JobCancelled: If the job was cancelled while the command ran
+    """
+    check_cancelled(cancel_token)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if cancel_token is not None:
+        cancel_token.register_process(process)
+    try:
+        stdout, stderr = process.communicate()
+    finally:
+        if cancel_token is not None:
+            cancel_token.unregister_process(process)
+    check_cancelled(cancel_token)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
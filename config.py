@@ -20,13 +20,20 @@ AUDIO_FORMAT = 'mp3'
 VIDEO_FORMAT = 'mp4'
 TEMP_AUDIO_FORMAT = 'm4a'
 
-# Create directories if they don't exist
-for directory in [INPUT_DIR, OUTPUT_DIR, TTS_DIR, TEMP_DIR, LOG_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+def ensure_directories():
+    """Create the data directories if they don't exist (called when a job starts, not at import)."""
+    for directory in [INPUT_DIR, OUTPUT_DIR, TTS_DIR, TEMP_DIR, LOG_DIR, WORKSPACE_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
 
 # File paths
 LOG_FILE = LOG_DIR / 'yt_germanizer.log'
 
+# Logging configuration
+LOG_JSON = os.getenv('LOG_JSON', '0') == '1'  # Write JSON lines with job and segment IDs instead of text
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024)))  # Rotate the log file at this size
+LOG_BACKUP_COUNT = 5  # Rotated log files to keep
+LOG_SEGMENT_INTERVAL = 5.0  # Seconds between per-segment TTS progress messages
+
 # AssemblyAI configuration
 ASSEMBLYAI_LANGUAGE_CODE = 'en'  # Source language code
 ASSEMBLYAI_FEATURES = {
@@ -35,11 +42,24 @@ ASSEMBLYAI_FEATURES = {
     'entity_detection': True
 }
 
+# Voice activity trimming of the ASR input (intros, music beds and dead air are not uploaded)
+VAD_ENABLED = os.getenv('VAD_ENABLED', '1') == '1'  # Transcribe only the parts that may contain speech
+VAD_MIN_GAP_MS = 2000  # Non-speech stretches at least this long are removed
+VAD_PAD_MS = 300  # Audio kept before and after detected speech
+VAD_ENERGY_DB = 10.0  # Speech frames are at least this far above the noise floor
+VAD_SILENCE_DBFS = -50.0  # Frames below this level are never speech
+VAD_SPEECH_BAND_SHARE = 0.5  # Minimum share of a speech frame's energy between 250 Hz and 4 kHz
+VAD_MIN_SAVING = 0.05  # Upload the untrimmed audio if trimming removes less than this share
+VAD_BITRATE = '48k'  # Opus bitrate of the trimmed ASR input
+
 # TTS configuration
 TTS_LANGUAGE = 'de'  # Target language (German)
 TTS_SLOW = False     # Normal speed
 TTS_QUALITY = '192'  # Audio quality in kbps
 TTS_TLD = 'de'      # Top-level domain for German Google TTS
+TTS_MODEL_NAME = 'tts_models/de/thorsten/tacotron2-DDC'  # Default Coqui TTS voice
+TTS_MODEL_MEMORY_BUDGET_MB = int(os.getenv('TTS_MODEL_MEMORY_BUDGET_MB', '4096'))  # RAM budget for loaded voices (0 = unlimited)
+TTS_MODEL_IDLE_TIMEOUT = int(os.getenv('TTS_MODEL_IDLE_TIMEOUT', '900'))  # Unload voices unused for this many seconds (0 = never)
 
 # Audio processing configuration
 AUDIO_BITRATE = '192k'
@@ -50,13 +70,132 @@ AUDIO_CODEC = 'aac'
 VIDEO_BITRATE = '4000k'
 VIDEO_PRESET = 'medium'  # Encoding preset (ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow)
 
+# Soundtrack mix configuration
+MIX_MODE = os.getenv('MIX_MODE', 'duck')  # 'duck': keep original music/effects under the dub, 'replace': dub only
+MIX_SAMPLE_RATE = 44100  # Sample rate of the mixed soundtrack
+MIX_CHUNK_SECONDS = 30  # Audio is mixed in chunks of this length to bound memory
+DUCK_DB = -18.0  # Background gain while the dub is speaking
+DUCK_ATTACK_MS = 150  # Background fade-down time before speech
+DUCK_RELEASE_MS = 400  # Background fade-up time after speech
+BACKGROUND_GAIN_DB = 0.0  # Overall background gain
+
+# Output track configuration
+SUBTITLES_ENABLED = True  # Mux German soft subtitles (mov_text) into the output
+ORIGINAL_SUBTITLES = False  # Also mux the original-language transcript as subtitles
+KEEP_ORIGINAL_AUDIO = False  # Keep the original audio as a second audio track
+SOURCE_LANGUAGE_ISO639_2 = 'eng'  # Language tag for original-language tracks
+
 # Threading configuration
 MAX_WORKERS = os.cpu_count() or 4  # Number of worker threads for parallel processing
 
+# Job queue configuration
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # Number of pipeline jobs that run concurrently
+JOB_RETENTION = 24 * 60 * 60  # Seconds to keep finished jobs before pruning
+JOB_POLL_INTERVAL = 1.0  # Seconds between job status refreshes in the web UI
+JOB_PERSIST_INTERVAL = 2.0  # Least seconds between stored progress updates of a running job
+
+# Job API service configuration
+JOB_DIR = DATA_DIR / 'jobs'
+JOB_DB_PATH = JOB_DIR / 'jobs.db'  # Persistent job history
+JOB_LOG_DIR = JOB_DIR / 'logs'  # One log file per job
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('API_PORT', '8503'))
+API_TOKEN = os.getenv('API_TOKEN')  # If set, requests need 'Authorization: Bearer <token>'
+API_MAX_UPLOAD_MB = int(os.getenv('API_MAX_UPLOAD_MB', '4096'))  # Largest accepted video upload
+
+# Run time estimation (learned from past runs)
+ETA_DB_PATH = JOB_DIR / 'throughput.db'  # Sizes and per-stage durations of finished runs
+ETA_HISTORY = 50  # Recent runs used for predictions
+
+# Progressive output (HLS stream that grows while the job runs)
+PROGRESSIVE_OUTPUT = os.getenv('PROGRESSIVE_OUTPUT', '0') == '1'  # Write an HLS stream (published to <output>/hls/index.m3u8) during TTS
+PROGRESSIVE_FRAGMENT_SECONDS = 6.0  # Target fragment length (fragments start on video keyframes)
+
+# Source acquisition (what is fetched from YouTube and how)
+ACQUISITION_PROFILE = os.getenv('ACQUISITION_PROFILE', 'efficient')  # Key of ACQUISITION_PROFILES
+ACQUISITION_PROFILES = {
+    # Progressive MP4 with its own audio track, source audio re-encoded to MP3, thumbnail and captions
+    'full': {
+        'audio_format': 'm4a/bestaudio/best',
+        'video_format': 'best[ext=mp4]',
+        'video_only': False,
+        'transcode_audio': True,
+        'thumbnail': True,
+        'captions': True,
+    },
+    # Video-only stream; the source audio is kept as downloaded and also serves as the original audio
+    'efficient': {
+        'audio_format': 'bestaudio[ext=m4a]/bestaudio/best',
+        'video_format': 'bestvideo[ext=mp4]/best[ext=mp4]',
+        'video_only': True,
+        'transcode_audio': False,
+        'thumbnail': False,
+        'captions': False,
+    },
+    # Smallest audio stream that still transcribes well (the ducked background is lower quality)
+    'minimal': {
+        'audio_format': 'worstaudio[abr>=48]/worstaudio/bestaudio',
+        'video_format': 'bestvideo[ext=mp4]/best[ext=mp4]',
+        'video_only': True,
+        'transcode_audio': False,
+        'thumbnail': False,
+        'captions': False,
+    },
+}
+DOWNLOAD_CONCURRENT_FRAGMENTS = int(os.getenv('DOWNLOAD_CONCURRENT_FRAGMENTS', '4'))  # Parallel fragment downloads (DASH/HLS formats)
+DOWNLOAD_CHUNK_MB = 10  # HTTP range size; throttled or interrupted transfers restart from the last chunk
+DOWNLOAD_RETRIES = 10  # Retries per file and per fragment before a download fails
+PARTIAL_DOWNLOAD_DIR = TEMP_DIR / 'partial'  # .part files outlive the job workspace so a re-run resumes them
+
+# Windowed dubbing of live streams, growing files and long videos (main.py --windowed)
+WINDOW_SECONDS = float(os.getenv('WINDOW_SECONDS', '30'))  # Target window length (cut at the quietest point near the end)
+WINDOW_CUT_SEARCH_SECONDS = 5.0  # How far before the window end to look for a quiet cut point
+WINDOW_DELAY_SECONDS = float(os.getenv('WINDOW_DELAY_SECONDS', '60'))  # Dubbed audio buffered before the HLS playlist is published
+WINDOW_QUEUE_SIZE = 2  # Decoded windows waiting for processing (bounds memory)
+WINDOW_FOLLOW_TIMEOUT = 10.0  # With --follow, a file that stops growing this long is finished
+
+# Incremental re-render after hand edits (main.py --export-edits / --apply-edits)
+RENDER_STATE_ENABLED = os.getenv('RENDER_STATE_ENABLED', '1') == '1'  # Keep clips and the mixed soundtrack in <output>/render
+
+# Audio fingerprint deduplication (re-uploads and mirrors of already processed audio)
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', '1') == '1'  # Look up every new source in the fingerprint index
+FINGERPRINT_DIR = DATA_DIR / 'fingerprints'  # Fingerprints, transcripts and translations of processed sources
+DEDUP_MIN_COVERAGE = 0.9  # Share of the new audio a match must cover to reuse its transcript and translation
+DEDUP_MIN_VOTES = 40  # Aligned hashes needed to accept a match
+DEDUP_TIME_TOLERANCE_MS = 250  # Segment times may differ this much between matched sources
+DEDUP_MAX_SOURCES = 500  # Sources kept in the index (oldest are forgotten)
+
+# Distributed execution (leave WORK_QUEUE_PATH unset to run everything in-process)
+WORK_QUEUE_PATH = os.getenv('WORK_QUEUE_PATH')  # Shared SQLite queue, e.g. /mnt/shared/queue.db
+SHARED_DIR = Path(os.getenv('SHARED_DIR', str(DATA_DIR / 'shared')))  # Shared filesystem for TTS batch output
+TTS_BATCH_SIZE = int(os.getenv('TTS_BATCH_SIZE', '8'))  # Segments per distributed TTS task
+LEASE_SECONDS = 60  # A task is reassigned if its worker misses heartbeats this long
+HEARTBEAT_INTERVAL = 15  # Seconds between lease renewals
+MAX_TASK_ATTEMPTS = 3  # Leases per task before it is marked failed
+QUEUE_POLL_INTERVAL = 1.0  # Seconds between queue polls when idle
+
+# Profiler configuration (main.py --profile, api_server.py --profile)
+PROFILE_DIR = DATA_DIR / 'profiles'  # One report directory per profiled run
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))  # Seconds between stack samples
+PROFILE_TOP = 20  # Functions listed per stage in hotspots.txt
+
+# Output file server configuration (streams finished videos with range requests)
+FILE_SERVER_HOST = os.getenv('FILE_SERVER_HOST', '127.0.0.1')  # Has no authentication, so local only by default
+FILE_SERVER_ALLOW_PUBLIC = os.getenv('FILE_SERVER_ALLOW_PUBLIC', '0') == '1'  # Required to bind FILE_SERVER_HOST beyond loopback
+FILE_SERVER_PORT = int(os.getenv('FILE_SERVER_PORT', '8502'))
+FILE_SERVER_PUBLIC_URL = os.getenv('FILE_SERVER_PUBLIC_URL', f'http://localhost:{FILE_SERVER_PORT}')
+
 # Retry configuration
 MAX_RETRIES = 3
 RETRY_DELAY = 5  # seconds
 
+# Job workspace configuration
+WORKSPACE_DIR = TEMP_DIR / 'jobs'  # Per-job working directories for downloads
+SCRATCH_DIR = os.getenv('SCRATCH_DIR')  # Optional tmpfs root for TTS clips and mixes (e.g. /dev/shm/yt_germanizer)
+SCRATCH_MIN_FREE_MB = int(os.getenv('SCRATCH_MIN_FREE_MB', '512'))  # Fall back to WORKSPACE_DIR below this much free space
+KEEP_WORKSPACES = os.getenv('KEEP_WORKSPACES', '0') == '1'  # Keep job workspaces after the job for debugging
+DISK_BUDGET_MB = int(os.getenv('DISK_BUDGET_MB', '20480'))  # Evict least recently used inputs/outputs above this (0 = unlimited)
+
 # Cache configuration
 CACHE_DIR = DATA_DIR / 'cache'
 CACHE_EXPIRY = 24 * 60 * 60  # 24 hours in seconds
@@ -0,0 +1,522 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from src.cancellation import CancellationToken, JobCancelled, check_cancelled
+from src import config
+
+# Task kinds
+JOB = 'job'
+TTS_BATCH = 'tts_batch'
+
+# Task states
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    grp TEXT,
+    seq INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, kind, created_at);
+CREATE INDEX IF NOT EXISTS tasks_group ON tasks (grp, seq);
+"""
+
+_COLUMNS = ('id', 'kind', 'grp', 'seq', 'payload', 'status', 'worker', 'lease_expires', 'attempts',
+            'progress', 'message', 'result', 'error', 'created_at', 'updated_at')
+
+_queues: Dict[str, 'LeaseQueue'] = {}
+_queues_lock = threading.Lock()
+
+def get_work_queue(path: Optional[Path] = None) -> 'LeaseQueue':
+    """
+    Get the process-wide queue for a database path, opening it on first use.
+
+    Args:
+        path (Optional[Path]): SQLite database file (default: config.WORK_QUEUE_PATH)
+
+    Returns:
+        LeaseQueue: Shared queue
+    """
+    key = str(path or config.WORK_QUEUE_PATH)
+    with _queues_lock:
+        if key not in _queues:
+            _queues[key] = LeaseQueue(path)
+        return _queues[key]
+
+def default_worker_id() -> str:
+    """Identify this process across nodes (host name and PID)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+class LeaseQueue:
+    """
+    Task queue in a SQLite database that several processes or nodes share.
+
+    Workers lease a task for a limited time and keep it with heartbeats; a
+    task whose lease expires (its worker died or hung) is handed to the next
+    worker that asks, up to MAX_TASK_ATTEMPTS times. The database can live on
+    a shared filesystem, so it uses SQLite's rollback journal rather than WAL.
+    """
+
+    def __init__(self, path: Path = None, lease_seconds: float = config.LEASE_SECONDS,
+                 max_attempts: int = config.MAX_TASK_ATTEMPTS):
+        """
+        Open (and create if needed) the queue database.
+
+        Args:
+            path (Path): SQLite database file (default: config.WORK_QUEUE_PATH, else data/queue.db)
+            lease_seconds (float): How long a lease lasts without a heartbeat
+            max_attempts (int): Leases per task before it is marked failed
+        """
+        self.path = Path(path or config.WORK_QUEUE_PATH or config.DATA_DIR / 'queue.db')
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def _row(self, row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        task = dict(zip(_COLUMNS, row))
+        task['payload'] = json.loads(task['payload'])
+        task['result'] = json.loads(task['result']) if task['result'] else None
+        return task
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        with self._lock:
+            return self._conn.execute(sql, params).rowcount
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], group: Optional[str] = None, seq: int = 0) -> str:
+        """
+        Add a task.
+
+        Args:
+            kind (str): Task kind (JOB or TTS_BATCH)
+            payload (Dict[str, Any]): JSON-serializable task input
+            group (Optional[str]): Group the task belongs to (e.g. the TTS batches of one job)
+            seq (int): Position of the task within its group
+
+        Returns:
+            str: Task ID
+        """
+        task_id = uuid.uuid4().hex
+        now = time.time()
+        self._write(
+            'INSERT INTO tasks (id, kind, grp, seq, payload, status, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (task_id, kind, group, seq, json.dumps(payload), PENDING, now, now)
+        )
+        return task_id
+
+    def lease(self, worker_id: str, kinds: List[str], group: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest available task, including tasks whose lease has expired.
+
+        Args:
+            worker_id (str): Worker taking the lease
+            kinds (List[str]): Task kinds the worker can run
+            group (Optional[str]): Only lease tasks from this group
+
+        Returns:
+            Optional[Dict[str, Any]]: The leased task, or None if nothing is available
+        """
+        now = time.time()
+        marks = ','.join('?' * len(kinds))
+        group_filter = ' AND grp = ?' if group else ''
+        params = tuple(kinds) + ((group,) if group else ())
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Give up on tasks whose workers keep dying
+                self._conn.execute(
+                    f"UPDATE tasks SET status = ?, error = ?, updated_at = ? "
+                    f"WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                    (FAILED, "Lease expired too many times", now, LEASED, now, self.max_attempts)
+                )
+                row = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM tasks "
+                    f"WHERE kind IN ({marks}){group_filter} "
+                    f"AND (status = ? OR (status = ? AND lease_expires < ?)) "
+                    f"ORDER BY created_at, seq LIMIT 1",
+                    params + (PENDING, LEASED, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        'UPDATE tasks SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, '
+                        'updated_at = ? WHERE id = ?',
+                        (LEASED, worker_id, now + self.lease_seconds, now, row[0])
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        task = self._row(row)
+        if task is not None:
+            task['status'], task['worker'] = LEASED, worker_id
+            task['attempts'] += 1
+        return task
+
+    def heartbeat(self, task_id: str, worker_id: str, progress: Optional[float] = None,
+                  message: Optional[str] = None) -> bool:
+        """
+        Extend a lease and optionally record progress.
+
+        Args:
+            task_id (str): Task ID
+            worker_id (str): Worker holding the lease
+            progress (Optional[float]): Progress of the task (0.0 - 1.0)
+            message (Optional[str]): Status message
+
+        Returns:
+            bool: False if the worker no longer holds the lease (reassigned or cancelled)
+        """
+        now = time.time()
+        return self._write(
+            'UPDATE tasks SET lease_expires = ?, progress = COALESCE(?, progress), '
+            'message = COALESCE(?, message), updated_at = ? WHERE id = ? AND worker = ? AND status = ?',
+            (now + self.lease_seconds, progress, message, now, task_id, worker_id, LEASED)
+        ) > 0
+
+    def complete(self, task_id: str, worker_id: str, result: Any) -> bool:
+        """
+        Record the result of a leased task.
+
+        Returns:
+            bool: False if the lease was lost and the result was discarded
+        """
+        return self._write(
+            'UPDATE tasks SET status = ?, result = ?, progress = 1, updated_at = ? '
+            'WHERE id = ? AND worker = ? AND status = ?',
+            (DONE, json.dumps(result), time.time(), task_id, worker_id, LEASED)
+        ) > 0
+
+    def fail(self, task_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Give up a leased task, returning it to the queue unless attempts are exhausted.
+
+        Returns:
+            bool: False if the lease had already been lost
+        """
+        task = self.get(task_id)
+        status = PENDING if retry and task and task['attempts'] < self.max_attempts else FAILED
+        return self._write(
+            'UPDATE tasks SET status = ?, error = ?, worker = NULL, updated_at = ? '
+            'WHERE id = ? AND worker = ? AND status = ?',
+            (status, error, time.time(), task_id, worker_id, LEASED)
+        ) > 0
+
+    def cancel(self, task_id: Optional[str] = None, group: Optional[str] = None) -> int:
+        """
+        Cancel unfinished tasks by ID or group; workers notice at their next heartbeat.
+
+        Returns:
+            int: Number of tasks cancelled
+        """
+        where, params = ('id = ?', (task_id,)) if task_id else ('grp = ?', (group,))
+        return self._write(
+            f"UPDATE tasks SET status = ?, updated_at = ? WHERE {where} AND status IN (?, ?)",
+            (CANCELLED, time.time()) + params + (PENDING, LEASED)
+        )
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Load a task by ID."""
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return self._row(row)
+
+    def group(self, group: str) -> List[Dict[str, Any]]:
+        """Load the tasks of a group in sequence order."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM tasks WHERE grp = ? ORDER BY seq", (group,)
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of tasks per state."""
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall()
+        return dict(rows)
+
+    def purge(self, max_age: float = config.JOB_RETENTION) -> int:
+        """Delete finished tasks older than max_age seconds."""
+        return self._write(
+            'DELETE FROM tasks WHERE status IN (?, ?, ?) AND updated_at < ?',
+            (DONE, FAILED, CANCELLED, time.time() - max_age)
+        )
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+class Heartbeat:
+    """
+    Keeps a lease alive from a background thread while a task runs.
+
+    The task's cancel token is cancelled if the lease is lost, so the work
+    stops instead of racing the worker that took it over.
+    """
+
+    def __init__(self, queue: LeaseQueue, task: Dict[str, Any], worker_id: str,
+                 cancel_token: CancellationToken, interval: float = config.HEARTBEAT_INTERVAL):
+        self.queue = queue
+        self.task = task
+        self.worker_id = worker_id
+        self.cancel_token = cancel_token
+        self.interval = interval
+        self.progress: Optional[float] = None
+        self.message: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{task['id'][:8]}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                alive = self.queue.heartbeat(self.task['id'], self.worker_id, self.progress, self.message)
+            except sqlite3.Error as e:
+                logging.getLogger('yt_germanizer').warning(f"Heartbeat failed: {str(e)}")
+                continue
+            if not alive:
+                logging.getLogger('yt_germanizer').warning(f"Lost lease on task {self.task['id']}")
+                self.cancel_token.cancel()
+                return
+
+    def __enter__(self) -> 'Heartbeat':
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+def run_tts_batch(payload: Dict[str, Any], cancel_token: Optional[CancellationToken] = None) -> List[str]:
+    """
+    Synthesize one batch of segments into a shared directory.
+
+    Args:
+        payload (Dict[str, Any]): 'segments' (with 'text', 'start', 'speaker') and 'output_dir'
+        cancel_token (Optional[CancellationToken]): Token checked between segments
+
+    Returns:
+        List[str]: Audio paths in segment order
+    """
+    from src.tts_generation import generate_tts
+
+    paths = []
+    for segment in payload['segments']:
+        check_cancelled(cancel_token)
+        paths.append(generate_tts(
+            text=segment['text'],
+            output_dir=payload['output_dir'],
+            start_time=segment['start'],
+            speaker=segment['speaker']
+        ))
+    return paths
+
+def run_task(queue: LeaseQueue, task: Dict[str, Any], worker_id: str,
+             cancel_token: Optional[CancellationToken] = None) -> bool:
+    """
+    Run one leased task under a heartbeat and record its outcome.
+
+    Args:
+        queue (LeaseQueue): Queue the task was leased from
+        task (Dict[str, Any]): Leased task
+        worker_id (str): Worker holding the lease
+        cancel_token (Optional[CancellationToken]): Token of the job this process runs the task
+            for; cancelling it stops the task (a lost lease stops only the task)
+
+    Returns:
+        bool: Whether the task completed
+    """
+    logger = logging.getLogger('yt_germanizer')
+    token = cancel_token.child() if cancel_token is not None else CancellationToken()
+    try:
+        with Heartbeat(queue, task, worker_id, token) as heartbeat:
+            if task['kind'] == TTS_BATCH:
+                result = run_tts_batch(task['payload'], token)
+            elif task['kind'] == JOB:
+                from src.pipeline import run_pipeline, stage_progress
+
+                def progress_callback(stage: str, fraction: float, message: str):
+                    heartbeat.progress = stage_progress(stage, fraction)
+                    heartbeat.message = f"{stage}: {message}"
+
+                params = dict(task['payload'])
+                params.setdefault('api_key', os.getenv('ASSEMBLYAI_API_KEY'))
+                result = {'output_path': run_pipeline(progress_callback=progress_callback,
+                                                      cancel_token=token, **params)}
+            else:
+                raise ValueError(f"Unknown task kind: {task['kind']}")
+        return queue.complete(task['id'], worker_id, result)
+    except JobCancelled:
+        logger.info(f"Task {task['id']} stopped (cancelled or lease lost)")
+        return False
+    except Exception as e:
+        logger.error(f"Task {task['id']} failed: {str(e)}", exc_info=True)
+        queue.fail(task['id'], worker_id, str(e))
+        return False
+    finally:
+        # A job helping with its own batches runs many tasks on one token
+        if cancel_token is not None:
+            cancel_token.release_child(token)
+
+def run_worker(queue: LeaseQueue, kinds: List[str] = (JOB, TTS_BATCH), worker_id: Optional[str] = None,
+               stop_event: Optional[threading.Event] = None, poll_interval: float = config.QUEUE_POLL_INTERVAL):
+    """
+    Lease and run tasks until stopped.
+
+    Args:
+        queue (LeaseQueue): Shared queue
+        kinds (List[str]): Task kinds this worker runs
+        worker_id (Optional[str]): Worker identity (default: host name and PID)
+        stop_event (Optional[threading.Event]): Set to stop after the current task
+        poll_interval (float): Seconds to wait when the queue is empty
+    """
+    logger = logging.getLogger('yt_germanizer')
+    worker_id = worker_id or default_worker_id()
+    stop_event = stop_event or threading.Event()
+    logger.info(f"Worker {worker_id} polling {queue.path} for {', '.join(kinds)} tasks")
+    while not stop_event.is_set():
+        task = queue.lease(worker_id, list(kinds))
+        if task is None:
+            stop_event.wait(poll_interval)
+            continue
+        logger.info(f"Worker {worker_id} leased {task['kind']} task {task['id']} (attempt {task['attempts']})")
+        run_task(queue, task, worker_id)
+
+def synthesize_distributed(queue: LeaseQueue, segments: List[Dict], output_dir: str,
+                           report: Callable[[str, float, str], None],
+                           cancel_token: Optional[CancellationToken] = None,
+                           batch_size: int = config.TTS_BATCH_SIZE) -> List[str]:
+    """
+    Fan TTS out to every worker polling the queue, and help out locally.
+
+    The segments are split into batches that any node can lease; this
+    process works on its own batches while it waits, so the job finishes
+    even if no other worker is running. Results are collected in order for
+    mixing on this node.
+
+    Args:
+        queue (LeaseQueue): Shared queue
+        segments (List[Dict]): Segments with 'text', 'start' and 'speaker'
+        output_dir (str): Directory on the shared filesystem for the audio files
+        report (Callable[[str, float, str], None]): Progress callback for the 'tts' stage
+        cancel_token (Optional[CancellationToken]): Token that cancels the batches
+        batch_size (int): Segments per task
+
+    Returns:
+        List[str]: Audio paths in segment order
+    """
+    logger = logging.getLogger('yt_germanizer')
+    group = uuid.uuid4().hex
+    worker_id = f"{default_worker_id()}:{threading.get_ident()}"
+    batches = [segments[i:i + batch_size] for i in range(0, len(segments), batch_size)]
+    for seq, batch in enumerate(batches):
+        queue.enqueue(TTS_BATCH, {
+            'segments': [{'text': s['text'], 'start': s['start'], 'speaker': s['speaker']} for s in batch],
+            'output_dir': output_dir,
+        }, group=group, seq=seq)
+    logger.info(f"Queued {len(batches)} TTS batches as group {group}")
+
+    try:
+        while True:
+            check_cancelled(cancel_token)
+            tasks = queue.group(group)
+            failed = [task for task in tasks if task['status'] in (FAILED, CANCELLED)]
+            if failed:
+                raise Exception(f"TTS batch failed: {failed[0]['error']}")
+            done = sum(task['status'] == DONE for task in tasks)
+            report('tts', done / len(tasks), f"Synthesized {done}/{len(tasks)} batches across workers")
+            if done == len(tasks):
+                break
+
+            task = queue.lease(worker_id, [TTS_BATCH], group=group)
+            if task is None:
+                time.sleep(config.QUEUE_POLL_INTERVAL)
+            else:
+                run_task(queue, task, worker_id, cancel_token=cancel_token)
+    except BaseException:
+        queue.cancel(group=group)
+        raise
+
+    return [path for task in queue.group(group) for path in task['result']]
+
+def make_queue_runner(queue: LeaseQueue) -> Callable[..., str]:
+    """
+    Build a JobManager runner that hands jobs to the worker nodes.
+
+    The API key is not written to the shared queue; workers use their own
+    ASSEMBLYAI_API_KEY. The run time estimate is updated from the task's
+    progress, while the worker records the run history.
+
+    Args:
+        queue (LeaseQueue): Shared queue
+
+    Returns:
+        Callable[..., str]: Runner with the run_pipeline calling convention
+    """
+    from src.pipeline import STAGES
+
+    def runner(progress_callback=None, cancel_token: Optional[CancellationToken] = None,
+               estimate=None, **params) -> str:
+        params.pop('api_key', None)
+        task_id = queue.enqueue(JOB, params)
+        try:
+            while True:
+                check_cancelled(cancel_token)
+                task = queue.get(task_id)
+                if task['status'] == DONE:
+                    return task['result']['output_path']
+                if task['status'] in (FAILED, CANCELLED):
+                    raise Exception(task['error'] or f"Task {task['status']}")
+                if progress_callback and task['message']:
+                    # Map overall progress back onto the stage named in the message
+                    stage = task['message'].split(':', 1)[0]
+                    if stage in dict(STAGES):
+                        fraction = _stage_fraction(stage, task['progress'])
+                        if estimate is not None:
+                            estimate.update(stage, fraction)
+                        progress_callback(stage, fraction, task['message'].split(': ', 1)[-1])
+                time.sleep(config.QUEUE_POLL_INTERVAL)
+        except JobCancelled:
+            queue.cancel(task_id)
+            raise
+
+    return runner
+
+def _stage_fraction(stage: str, overall: float) -> float:
+    """Invert pipeline.stage_progress for one stage."""
+    from src.pipeline import STAGES
+    done = 0.0
+    for name, weight in STAGES:
+        if name == stage:
+            return min(max((overall - done) / weight, 0.0), 1.0) if weight else 1.0
+        done += weight
+    return 1.0
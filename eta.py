@@ -0,0 +1,353 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, Iterable, List, Optional
+
+from src import config
+
+# Size that each stage's run time scales with
+STAGE_UNITS = {
+    'download': 'audio_minutes',
+    'transcribe': 'audio_minutes',
+    'translate': 'characters',
+    'tts': 'characters',
+    'sync': 'audio_minutes',
+}
+
+# Seconds per unit used until there is history for a stage
+DEFAULT_RATES = {
+    'download': 2.0,
+    'transcribe': 20.0,
+    'translate': 0.003,
+    'tts': 0.03,
+    'sync': 4.0,
+}
+
+# Speech density used to predict sizes that are not known yet
+DEFAULT_CHARACTERS_PER_MINUTE = 800.0
+DEFAULT_SEGMENTS_PER_MINUTE = 8.0
+DEFAULT_AUDIO_MINUTES = 10.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at REAL NOT NULL,
+    audio_minutes REAL NOT NULL,
+    segments INTEGER NOT NULL,
+    characters INTEGER NOT NULL,
+    stage_seconds TEXT NOT NULL
+)
+"""
+
+class ThroughputStore:
+    """
+    Keeps the sizes and per-stage durations of finished runs in SQLite.
+    """
+
+    def __init__(self, path: Path = config.ETA_DB_PATH):
+        """
+        Open (and create if needed) the throughput database.
+
+        Args:
+            path (Path): SQLite database file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def add(self, audio_minutes: float, segments: int, characters: int, stage_seconds: Dict[str, float]):
+        """
+        Record a finished run.
+
+        Args:
+            audio_minutes (float): Duration of the source audio in minutes
+            segments (int): Number of transcribed segments
+            characters (int): Characters of translated text
+            stage_seconds (Dict[str, float]): Wall-clock seconds per stage
+        """
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO runs (recorded_at, audio_minutes, segments, characters, stage_seconds) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (time.time(), audio_minutes, segments, characters, json.dumps(stage_seconds))
+            )
+            # Old runs no longer influence predictions
+            self._conn.execute('DELETE FROM runs WHERE id <= (SELECT MAX(id) FROM runs) - ?',
+                               (config.ETA_HISTORY * 10,))
+            self._conn.commit()
+
+    def recent(self, limit: int = config.ETA_HISTORY) -> List[Dict[str, Any]]:
+        """
+        Load the most recent runs.
+
+        Args:
+            limit (int): Maximum number of runs
+
+        Returns:
+            List[Dict[str, Any]]: Runs, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT audio_minutes, segments, characters, stage_seconds FROM runs ORDER BY id DESC LIMIT ?',
+                (limit,)
+            ).fetchall()
+        return [
+            {'audio_minutes': minutes, 'segments': segments, 'characters': characters,
+             'stage_seconds': json.loads(stage_seconds)}
+            for minutes, segments, characters, stage_seconds in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_stores: Dict[str, ThroughputStore] = {}
+_stores_lock = threading.Lock()
+
+def get_throughput_store(path: Optional[Path] = None) -> ThroughputStore:
+    """
+    Get the shared throughput store for a database path.
+
+    Args:
+        path (Optional[Path]): SQLite file (default: config.ETA_DB_PATH)
+
+    Returns:
+        ThroughputStore: Store opened once per path and process
+    """
+    path = str(path or config.ETA_DB_PATH)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ThroughputStore(Path(path))
+        return _stores[path]
+
+class ThroughputModel:
+    """
+    Per-stage throughput learned from past runs (median seconds per unit).
+    """
+
+    def __init__(self, runs: Iterable[Dict[str, Any]] = ()):
+        """
+        Build the model.
+
+        Args:
+            runs (Iterable[Dict[str, Any]]): Runs from ThroughputStore.recent()
+        """
+        runs = list(runs)
+        self.rates: Dict[str, float] = {}
+        self.samples: Dict[str, int] = {}
+        for stage, unit in STAGE_UNITS.items():
+            rates = [run['stage_seconds'][stage] / run[unit] for run in runs
+                     if stage in run['stage_seconds'] and run[unit] > 0]
+            self.rates[stage] = median(rates) if rates else DEFAULT_RATES[stage]
+            self.samples[stage] = len(rates)
+        minutes = [run for run in runs if run['audio_minutes'] > 0]
+        self.characters_per_minute = (median(run['characters'] / run['audio_minutes'] for run in minutes)
+                                      if minutes else DEFAULT_CHARACTERS_PER_MINUTE)
+        self.segments_per_minute = (median(run['segments'] / run['audio_minutes'] for run in minutes)
+                                    if minutes else DEFAULT_SEGMENTS_PER_MINUTE)
+
+    @classmethod
+    def load(cls, store: Optional[ThroughputStore] = None) -> 'ThroughputModel':
+        """Build the model from a store's recent runs (defaults only if the store is unreadable)."""
+        try:
+            return cls((store or get_throughput_store()).recent())
+        except sqlite3.Error as e:
+            logging.getLogger('yt_germanizer').warning(f"Could not read run history: {str(e)}")
+            return cls()
+
+    def sizes(self, audio_minutes: Optional[float], segments: Optional[int] = None,
+              characters: Optional[int] = None) -> Dict[str, float]:
+        """
+        Fill in unknown job sizes from the audio duration.
+
+        Args:
+            audio_minutes (Optional[float]): Source duration in minutes
+            segments (Optional[int]): Segment count, if known
+            characters (Optional[int]): Translated characters, if known
+
+        Returns:
+            Dict[str, float]: 'audio_minutes', 'segments' and 'characters'
+        """
+        minutes = audio_minutes if audio_minutes is not None else DEFAULT_AUDIO_MINUTES
+        return {
+            'audio_minutes': minutes,
+            'segments': segments if segments is not None else minutes * self.segments_per_minute,
+            'characters': characters if characters is not None else minutes * self.characters_per_minute,
+        }
+
+    def predict(self, audio_minutes: Optional[float], segments: Optional[int] = None,
+                characters: Optional[int] = None) -> Dict[str, float]:
+        """
+        Predict the seconds each stage will take.
+
+        Args:
+            audio_minutes (Optional[float]): Source duration in minutes
+            segments (Optional[int]): Segment count, if known
+            characters (Optional[int]): Translated characters, if known
+
+        Returns:
+            Dict[str, float]: Predicted seconds per stage, in pipeline order
+        """
+        sizes = self.sizes(audio_minutes, segments, characters)
+        return {stage: self.rates[stage] * sizes[unit] for stage, unit in STAGE_UNITS.items()}
+
+class JobEstimate:
+    """
+    Tracks one running job and predicts its remaining time.
+
+    Stage transitions come from the pipeline's progress reports; sizes are
+    filled in as they become known (duration after download, segments and
+    characters after translation). For the running stage, the prediction is
+    blended with the observed rate as the stage advances.
+    """
+
+    def __init__(self, model: Optional[ThroughputModel] = None, store: Optional[ThroughputStore] = None,
+                 audio_minutes: Optional[float] = None):
+        """
+        Initialize the estimate.
+
+        Args:
+            model (Optional[ThroughputModel]): Throughput model (default: loaded from the store)
+            store (Optional[ThroughputStore]): Where record() saves the run (default: shared store)
+            audio_minutes (Optional[float]): Source duration, if already known
+        """
+        self.store = store
+        self.model = model or ThroughputModel.load(store)
+        self.audio_minutes = audio_minutes
+        self.segments: Optional[int] = None
+        self.characters: Optional[int] = None
+        self.stage: Optional[str] = None
+        self.fraction = 0.0
+        self.stage_seconds: Dict[str, float] = {}
+        self._started: Optional[float] = None
+        self._stage_started: Optional[float] = None
+        self._progress = 0.0
+        self._lock = threading.Lock()
+
+    def set_sizes(self, audio_minutes: Optional[float] = None, segments: Optional[int] = None,
+                  characters: Optional[int] = None):
+        """Record job sizes as they become known (None leaves a size unchanged)."""
+        with self._lock:
+            if audio_minutes is not None:
+                self.audio_minutes = audio_minutes
+            if segments is not None:
+                self.segments = segments
+            if characters is not None:
+                self.characters = characters
+
+    def update(self, stage: str, fraction: float):
+        """
+        Record progress within a stage.
+
+        Args:
+            stage (str): Stage name from STAGE_UNITS
+            fraction (float): Progress within the stage (0.0 - 1.0)
+        """
+        now = time.monotonic()
+        with self._lock:
+            if self._started is None:
+                self._started = now
+            if stage != self.stage:
+                self._close_stage(now)
+                self.stage = stage
+                self._stage_started = now
+            self.fraction = min(max(fraction, 0.0), 1.0)
+
+    def _close_stage(self, now: float):
+        if self.stage is not None:
+            self.stage_seconds[self.stage] = self.stage_seconds.get(self.stage, 0.0) + now - self._stage_started
+
+    def remaining(self) -> float:
+        """
+        Predict the seconds until the job finishes.
+
+        Returns:
+            float: Remaining seconds
+        """
+        with self._lock:
+            return self._remaining(time.monotonic())
+
+    def _remaining(self, now: float) -> float:
+        predicted = self.model.predict(self.audio_minutes, self.segments, self.characters)
+        stages = list(predicted)
+        if self.stage not in predicted:
+            return sum(predicted.values())
+        index = stages.index(self.stage)
+        elapsed = now - self._stage_started
+        expected = predicted[self.stage]
+        if self.fraction > 0:
+            # Trust the observed rate more the further the stage has advanced
+            expected = (1 - self.fraction) * expected + self.fraction * (elapsed / self.fraction)
+        current = max(expected - elapsed, 0.0)
+        return current + sum(predicted[stage] for stage in stages[index + 1:])
+
+    def elapsed(self) -> float:
+        """Seconds since the first progress report."""
+        with self._lock:
+            return time.monotonic() - self._started if self._started is not None else 0.0
+
+    def progress(self) -> float:
+        """
+        Overall progress weighted by predicted stage durations.
+
+        Returns:
+            float: Progress (0.0 - 1.0), never decreasing
+        """
+        with self._lock:
+            if self._started is None:
+                return 0.0
+            now = time.monotonic()
+            elapsed = now - self._started
+            remaining = self._remaining(now)
+            if elapsed + remaining > 0:
+                self._progress = max(self._progress, min(elapsed / (elapsed + remaining), 1.0))
+            return self._progress
+
+    def record(self, exclude: Iterable[str] = ()):
+        """
+        Save the measured stage durations so later estimates learn from this run.
+
+        Args:
+            exclude (Iterable[str]): Stages whose time is not representative
+                (e.g. stages shared with a concurrent job)
+        """
+        with self._lock:
+            self._close_stage(time.monotonic())
+            self.stage = None
+            stage_seconds = {stage: seconds for stage, seconds in self.stage_seconds.items()
+                             if stage in STAGE_UNITS and stage not in exclude}
+            if not self.audio_minutes or self.segments is None or self.characters is None:
+                return
+            audio_minutes, segments, characters = self.audio_minutes, self.segments, self.characters
+        try:
+            (self.store or get_throughput_store()).add(audio_minutes, segments, characters, stage_seconds)
+        except sqlite3.Error as e:
+            logging.getLogger('yt_germanizer').warning(f"Could not record run history: {str(e)}")
+
+def estimate_job(audio_minutes: float, store: Optional[ThroughputStore] = None) -> Dict[str, Any]:
+    """
+    Predict how long a job for audio of the given length will take (dry run).
+
+    Args:
+        audio_minutes (float): Source duration in minutes
+        store (Optional[ThroughputStore]): Run history (default: shared store)
+
+    Returns:
+        Dict[str, Any]: 'stages' (predicted seconds per stage), 'total' seconds,
+            'sizes' (predicted segments and characters) and 'history' (runs per stage)
+    """
+    model = ThroughputModel.load(store)
+    stages = model.predict(audio_minutes)
+    return {
+        'stages': stages,
+        'total': sum(stages.values()),
+        'sizes': model.sizes(audio_minutes),
+        'history': dict(model.samples),
+    }
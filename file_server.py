@@ -0,0 +1,201 @@
+import os
+import re
+import logging
+import ipaddress
+import mimetypes
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, quote, unquote, urlparse
+
+from src import metrics
+from src import config
+
+# Size of the chunks streamed to the client
+CHUNK_SIZE = 256 * 1024
+
+_RANGE_PATTERN = re.compile(r'bytes=(\d*)-(\d*)$')
+
+# Progressive output (HLS) files; '.ts' is otherwise guessed as a Qt translation file
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header.
+
+    Args:
+        header (str): Range header value (e.g. 'bytes=0-1023', 'bytes=-500')
+        size (int): Size of the file in bytes
+
+    Returns:
+        Optional[Tuple[int, int]]: Inclusive (start, end) byte range, or None if unsatisfiable
+
+    Raises:
+        ValueError: If the header is malformed
+    """
+    match = _RANGE_PATTERN.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        raise ValueError(f"Unsupported range: {header}")
+
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves files from the output directory with HTTP range request support,
+    plus Prometheus metrics at /metrics.
+    """
+
+    root: Path = config.OUTPUT_DIR
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _resolve(self, url_path: str) -> Optional[Path]:
+        """Map a /files/<name> URL path to a file inside the root directory."""
+        if not url_path.startswith('/files/'):
+            return None
+        root = Path(self.root).resolve()
+        path = (root / unquote(url_path[len('/files/'):])).resolve()
+        if root not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def _serve(self, send_body: bool):
+        url = urlparse(self.path)
+        if url.path == '/metrics' and send_body:
+            metrics.send_metrics(self)
+            return
+        path = self._resolve(url.path)
+        if path is None:
+            self.send_error(404, "File not found")
+            return
+
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = 200
+
+        range_header = self.headers.get('Range')
+        if range_header:
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                # Malformed or multi-range: ignore the header and send the whole file (RFC 9110)
+                range_header = None
+        if range_header:
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = 206
+
+        length = max(end - start + 1, 0)
+        self.send_response(status)
+        self.send_header('Content-Type', mimetypes.guess_type(path.name)[0] or 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(length))
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        download_name = parse_qs(url.query, keep_blank_values=True).get('download')
+        if download_name is not None:
+            filename = re.sub(r'[^\w.\- ]', '_', os.path.basename(download_name[0])) or path.name
+            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.end_headers()
+
+        if not send_body:
+            return
+
+        # Stream the requested range in fixed-size chunks
+        with open(path, 'rb') as file:
+            file.seek(start)
+            remaining = length
+            try:
+                while remaining > 0:
+                    chunk = file.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                # Browsers routinely abort range requests while seeking
+                pass
+
+    def log_message(self, format: str, *args):
+        logging.getLogger('yt_germanizer').debug(f"File server: {format % args}")
+
+def _is_loopback(host: str) -> bool:
+    """Check whether a bind address only accepts local connections."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def start_file_server(root: Optional[str] = None, host: str = config.FILE_SERVER_HOST,
+                      port: int = config.FILE_SERVER_PORT) -> ThreadingHTTPServer:
+    """
+    Start a background HTTP server that streams files from a directory.
+
+    The server has no authentication, so binding anything but a loopback
+    address needs FILE_SERVER_ALLOW_PUBLIC=1.
+
+    Args:
+        root (Optional[str]): Directory to serve (default: config.OUTPUT_DIR)
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free port)
+
+    Returns:
+        ThreadingHTTPServer: The running server
+
+    Raises:
+        ValueError: If host is not a loopback address and public serving is not enabled
+    """
+    if not _is_loopback(host) and not config.FILE_SERVER_ALLOW_PUBLIC:
+        raise ValueError(f"File server would expose every output on {host} without authentication; "
+                         f"set FILE_SERVER_ALLOW_PUBLIC=1 to allow it")
+    handler = type('OutputFileHandler', (RangeRequestHandler,), {'root': Path(root or config.OUTPUT_DIR)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name='file-server', daemon=True)
+    thread.start()
+    logging.getLogger('yt_germanizer').info(f"Serving output files on port {server.server_address[1]}")
+    return server
+
+def file_url(path: str, root: Optional[str] = None, base_url: Optional[str] = None,
+             download: Optional[str] = None) -> str:
+    """
+    Build the URL under which the file server exposes a file.
+
+    Args:
+        path (str): Path to a file inside the served directory
+        root (Optional[str]): Served directory (default: config.OUTPUT_DIR)
+        base_url (Optional[str]): Public base URL of the server (default: config.FILE_SERVER_PUBLIC_URL)
+        download (Optional[str]): If set, the filename the browser should save the file as
+
+    Returns:
+        str: URL of the file
+    """
+    relative = Path(path).resolve().relative_to(Path(root or config.OUTPUT_DIR).resolve())
+    url = f"{(base_url or config.FILE_SERVER_PUBLIC_URL).rstrip('/')}/files/{quote(relative.as_posix())}"
+    return f"{url}?download={quote(download)}" if download else url
@@ -0,0 +1,478 @@
+import os
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.cancellation import CancellationToken, JobCancelled
+from src.segments import SegmentTable
+from src.utils import link_or_copy
+from src import metrics
+from src import config
+
+# Analysis parameters: 64 ms frames of 8 kHz mono audio
+SAMPLE_RATE = 8000
+WINDOW = 1024
+HOP = 512
+FRAME_MS = HOP * 1000.0 / SAMPLE_RATE
+
+# FFT bin ranges searched for one spectral peak each (~30 Hz - 4 kHz)
+BANDS = [(4, 16), (16, 32), (32, 64), (64, 128), (128, 256), (256, 512)]
+# A peak must be the loudest in its band for this many frames on either side
+PEAK_NEIGHBORHOOD = 3
+# Minimum peak level above the frame median, and absolute floor, in dB
+PEAK_MIN_PROMINENCE_DB = 12.0
+PEAK_MIN_LEVEL_DB = -10.0
+# Each peak is paired with up to this many later peaks within MAX_DT frames
+FAN_OUT = 6
+MAX_DT = 63
+# Hashes that occur more often than this in one source carry no information
+MAX_HASH_OCCURRENCES = 20
+
+class Fingerprint:
+    """
+    Spectral peak pair hashes of a recording, sorted by hash.
+
+    Each hash encodes two peak frequencies and their distance in frames; its
+    frame is the time of the first peak. Matching hashes between two
+    recordings that line up at one constant frame offset identify the same
+    audio, even after re-encoding or cutting.
+    """
+
+    def __init__(self, hashes: np.ndarray, frames: np.ndarray, frame_count: int):
+        """
+        Initialize a fingerprint.
+
+        Args:
+            hashes (np.ndarray): Peak pair hashes (uint32), sorted
+            frames (np.ndarray): Frame of each hash (int32)
+            frame_count (int): Length of the recording in frames
+        """
+        self.hashes = hashes
+        self.frames = frames
+        self.frame_count = frame_count
+
+    @property
+    def duration_ms(self) -> float:
+        return self.frame_count * FRAME_MS
+
+    def save(self, path: str):
+        np.savez(path, hashes=self.hashes, frames=self.frames, frame_count=np.int64(self.frame_count))
+
+    @classmethod
+    def load(cls, path: str) -> 'Fingerprint':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['hashes'], data['frames'], int(data['frame_count']))
+
+def _pick_peaks(spectrum_db: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Find the peaks of a (frames, bins) spectrogram as (frame, bin) arrays."""
+    frame_median = np.median(spectrum_db, axis=1)
+    peak_frames, peak_bins = [], []
+    rows = np.arange(len(spectrum_db))
+    for low, high in BANDS:
+        bins = np.argmax(spectrum_db[:, low:high], axis=1) + low
+        levels = spectrum_db[rows, bins]
+        # Keep band maxima that are also the loudest in their time neighborhood
+        padded = np.pad(levels, PEAK_NEIGHBORHOOD, constant_values=-np.inf)
+        local_max = np.lib.stride_tricks.sliding_window_view(padded, 2 * PEAK_NEIGHBORHOOD + 1).max(axis=1)
+        keep = ((levels >= local_max) & (levels > frame_median + PEAK_MIN_PROMINENCE_DB)
+                & (levels > PEAK_MIN_LEVEL_DB))
+        peak_frames.append(rows[keep])
+        peak_bins.append(bins[keep])
+    return np.concatenate(peak_frames), np.concatenate(peak_bins)
+
+def _hash_peaks(peak_frames: np.ndarray, peak_bins: np.ndarray, frame_count: int) -> Fingerprint:
+    """Pair each peak with the following peaks and hash the pairs."""
+    order = np.lexsort((peak_bins, peak_frames))
+    frames, bins = peak_frames[order].astype(np.int64), peak_bins[order].astype(np.int64)
+    all_hashes, all_frames = [], []
+    for distance in range(1, FAN_OUT + 1):
+        dt = frames[distance:] - frames[:-distance]
+        valid = (dt > 0) & (dt <= MAX_DT)
+        anchor_bins, target_bins = bins[:-distance][valid], bins[distance:][valid]
+        all_hashes.append((anchor_bins << 16) | (target_bins << 6) | dt[valid])
+        all_frames.append(frames[:-distance][valid])
+    hashes = np.concatenate(all_hashes).astype(np.uint32) if all_hashes else np.zeros(0, dtype=np.uint32)
+    hash_frames = np.concatenate(all_frames).astype(np.int32) if all_frames else np.zeros(0, dtype=np.int32)
+    order = np.argsort(hashes, kind='stable')
+    return Fingerprint(hashes[order], hash_frames[order], frame_count)
+
+def compute_fingerprint(path: str, cancel_token: Optional[CancellationToken] = None) -> Fingerprint:
+    """
+    Fingerprint the audio of a media file.
+
+    The audio is decoded as a stream, so memory use does not grow with the
+    length of the recording.
+
+    Args:
+        path (str): Audio or video file
+        cancel_token (Optional[CancellationToken]): Token that stops decoding
+
+    Returns:
+        Fingerprint: The fingerprint
+    """
+    from src.audio_mix import decode_audio_stream
+
+    window = np.hanning(WINDOW).astype(np.float32)
+    carry = np.zeros(0, dtype=np.float32)
+    frame_count = 0
+    peak_frames, peak_bins = [], []
+    for chunk in decode_audio_stream(path, SAMPLE_RATE, 1, SAMPLE_RATE * 60, cancel_token):
+        data = np.concatenate([carry, chunk[:, 0]])
+        count = (len(data) - WINDOW) // HOP + 1 if len(data) >= WINDOW else 0
+        if count > 0:
+            frames = np.lib.stride_tricks.sliding_window_view(data, WINDOW)[::HOP][:count] * window
+            spectrum_db = 20 * np.log10(np.abs(np.fft.rfft(frames, axis=1)) + 1e-9)
+            chunk_frames, chunk_bins = _pick_peaks(spectrum_db)
+            peak_frames.append(chunk_frames + frame_count)
+            peak_bins.append(chunk_bins)
+            frame_count += count
+            carry = data[count * HOP:]
+        else:
+            carry = data
+    if not peak_frames:
+        return Fingerprint(np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.int32), frame_count)
+    return _hash_peaks(np.concatenate(peak_frames), np.concatenate(peak_bins), frame_count)
+
+def align(query: Fingerprint, reference: Fingerprint) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Find the frame offset at which the query best lines up with a reference.
+
+    Args:
+        query (Fingerprint): New recording
+        reference (Fingerprint): Already processed recording
+
+    Returns:
+        Optional[Tuple[int, int, int, int]]: (offset, votes, first, last): reference frame =
+            query frame + offset; votes is the number of aligned hashes; first and last bound
+            the matched query frames. None if no hashes match.
+    """
+    if not len(query.hashes) or not len(reference.hashes):
+        return None
+    low = np.searchsorted(reference.hashes, query.hashes, 'left')
+    high = np.searchsorted(reference.hashes, query.hashes, 'right')
+    counts = high - low
+    keep = (counts > 0) & (counts <= MAX_HASH_OCCURRENCES)
+    if not keep.any():
+        return None
+
+    # Expand every query hash into one row per occurrence in the reference
+    counts = counts[keep]
+    query_rows = np.repeat(np.nonzero(keep)[0], counts)
+    run_starts = np.repeat(np.cumsum(counts) - counts, counts)
+    reference_rows = np.repeat(low[keep], counts) + np.arange(len(query_rows)) - run_starts
+    offsets = reference.frames[reference_rows].astype(np.int64) - query.frames[query_rows]
+
+    values, votes = np.unique(offsets, return_counts=True)
+    best = values[np.argmax(votes)]
+    # Allow one frame of jitter from re-encoding
+    aligned = np.abs(offsets - best) <= 1
+    matched_frames = query.frames[query_rows[aligned]]
+    first, last = np.percentile(matched_frames, [1, 99])
+    return int(best), int(aligned.sum()), int(first), int(last)
+
+class FingerprintMatch:
+    """
+    A previously processed source that contains (part of) the new audio.
+    """
+
+    def __init__(self, source_id: int, directory: Path, offset_frames: int, votes: int,
+                 first_frame: int, last_frame: int, query: Fingerprint, reference_frames: int):
+        self.source_id = source_id
+        self.directory = directory
+        self.offset_ms = offset_frames * FRAME_MS
+        self.votes = votes
+        # Matched part of the new audio in milliseconds
+        self.start_ms = first_frame * FRAME_MS
+        self.end_ms = (last_frame + 1) * FRAME_MS
+        self.coverage = min((last_frame - first_frame + 1) / max(query.frame_count, 1), 1.0)
+        self.query_ms = query.duration_ms
+        # Part of the new audio that the source's recording spans at this offset
+        self.overlap_start_ms = max(0.0, -self.offset_ms)
+        self.overlap_end_ms = min(self.query_ms, reference_frames * FRAME_MS - self.offset_ms)
+
+    def __repr__(self) -> str:
+        return (f"<FingerprintMatch source {self.source_id}: {self.coverage:.0%} of the audio, "
+                f"offset {self.offset_ms / 1000:.1f} s, {self.votes} votes>")
+
+    @property
+    def full(self) -> bool:
+        """Whether the match is good enough to reuse the source's transcript and translation."""
+        return self.coverage >= config.DEDUP_MIN_COVERAGE
+
+    def uncovered_spans(self) -> List[Tuple[float, float]]:
+        """
+        Find the parts of the new audio before and after a full match, e.g. a new intro.
+
+        They are not in the source, so they have to be transcribed and translated.
+        Gaps up to DEDUP_TIME_TOLERANCE_MS are ignored.
+
+        Returns:
+            List[Tuple[float, float]]: (start, end) in milliseconds of the new audio
+        """
+        spans = [(0.0, self.overlap_start_ms), (self.overlap_end_ms, self.query_ms)]
+        return [(start, end) for start, end in spans if end - start > config.DEDUP_TIME_TOLERANCE_MS]
+
+    def reuse_segments(self) -> Tuple[SegmentTable, SegmentTable]:
+        """
+        Get the source's transcript and translation for the matched span, moved to the new audio's timeline.
+
+        For a full match this is the whole overlap with the source's recording;
+        uncovered_spans() lists what it leaves out.
+
+        Returns:
+            Tuple[SegmentTable, SegmentTable]: Transcript and translation
+        """
+        transcript = SegmentTable.load(str(self.directory / 'transcript.npz'))
+        translation = SegmentTable.load(str(self.directory / 'segments.npz'))
+        tolerance = config.DEDUP_TIME_TOLERANCE_MS
+        # A full match covers all of the overlap, not just the span of aligned hashes
+        start_ms, end_ms = ((self.overlap_start_ms, self.overlap_end_ms) if self.full
+                            else (self.start_ms, self.end_ms))
+        low, high = start_ms + self.offset_ms - tolerance, end_ms + self.offset_ms + tolerance
+        offset = -int(round(self.offset_ms))
+
+        def window(table: SegmentTable) -> SegmentTable:
+            table = table.select((table.start >= low) & (table.end <= high)).shifted(offset)
+            # Segments may start up to the tolerance before the new audio does
+            np.maximum(table.start, 0, out=table.start)
+            return table
+
+        translation = window(translation)
+        # The stored translation carries clip names; the pipeline synthesizes or reuses clips itself
+        translation = translation.with_text([segment['text'] for segment in translation])
+        return window(transcript), translation
+
+    def reusable_clips(self, segments: SegmentTable) -> Dict[int, str]:
+        """
+        Find already synthesized clips for segments of the new audio.
+
+        A clip is reused when the source has a segment with the same text and
+        speaker at the corresponding time and its audio file still exists.
+
+        Args:
+            segments (SegmentTable): Translated segments of the new audio
+
+        Returns:
+            Dict[int, str]: Clip path by row of segments
+        """
+        clip_dir = dedup_clip_dir(self.source_id)
+        if not clip_dir.is_dir():
+            return {}
+        source = SegmentTable.load(str(self.directory / 'segments.npz')).sorted_by_start()
+        if not len(source) or source.audio_codes is None:
+            return {}
+
+        # Nearest source segment in time for every new segment
+        wanted = segments.start + int(round(self.offset_ms))
+        nearest = np.clip(np.searchsorted(source.start, wanted), 0, len(source) - 1)
+        previous = np.clip(nearest - 1, 0, len(source) - 1)
+        closer = np.abs(source.start[previous] - wanted) < np.abs(source.start[nearest] - wanted)
+        nearest = np.where(closer, previous, nearest)
+        close = np.abs(source.start[nearest] - wanted) <= config.DEDUP_TIME_TOLERANCE_MS
+
+        clips = {}
+        for row in np.nonzero(close)[0].tolist():
+            candidate = source[int(nearest[row])]
+            segment = segments[row]
+            if candidate['text'] != segment['text'] or candidate['speaker'] != segment['speaker']:
+                continue
+            path = clip_dir / candidate['audio_path']
+            if path.is_file():
+                clips[row] = str(path)
+        return clips
+
+def dedup_clip_dir(source_id: int) -> Path:
+    """Directory of a source's kept TTS clips (under TTS_DIR, so the disk budget can evict it)."""
+    return config.TTS_DIR / f"dedup_{source_id}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    frame_count INTEGER NOT NULL,
+    tts_model TEXT NOT NULL
+)
+"""
+
+class FingerprintIndex:
+    """
+    Fingerprints, transcripts and translations of processed audio.
+
+    Each source gets a directory with fingerprint.npz, transcript.npz and
+    segments.npz (the translation with clip file names); its TTS clips are
+    kept in dedup_clip_dir().
+    """
+
+    def __init__(self, directory: Path = config.FINGERPRINT_DIR):
+        """
+        Open (and create if needed) the index.
+
+        Args:
+            directory (Path): Index directory
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.directory / 'index.db'), check_same_thread=False)
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[int, Fingerprint] = {}
+
+    def _fingerprint(self, source_id: int) -> Optional[Fingerprint]:
+        if source_id not in self._fingerprints:
+            path = self.directory / str(source_id) / 'fingerprint.npz'
+            if not path.is_file():
+                return None
+            self._fingerprints[source_id] = Fingerprint.load(str(path))
+        return self._fingerprints[source_id]
+
+    def find(self, query: Fingerprint, tts_model: str = config.TTS_MODEL_NAME) -> Optional[FingerprintMatch]:
+        """
+        Find the processed source that matches the most of the query.
+
+        Args:
+            query (Fingerprint): Fingerprint of the new audio
+            tts_model (str): Only sources synthesized with this model qualify for clip reuse
+
+        Returns:
+            Optional[FingerprintMatch]: Best match, or None
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT id FROM sources WHERE tts_model = ? ORDER BY id DESC',
+                                      (tts_model,)).fetchall()
+            best = None
+            for (source_id,) in rows:
+                reference = self._fingerprint(source_id)
+                if reference is None:
+                    continue
+                result = align(query, reference)
+                if result is None:
+                    continue
+                offset, votes, first, last = result
+                # Require many aligned hashes, densely spread over the matched span
+                if votes < config.DEDUP_MIN_VOTES or votes < 0.05 * (last - first + 1):
+                    continue
+                match = FingerprintMatch(source_id, self.directory / str(source_id), offset, votes,
+                                         first, last, query, reference.frame_count)
+                if best is None or (match.coverage, match.votes) > (best.coverage, best.votes):
+                    best = match
+        return best
+
+    def add(self, key: str, fingerprint: Fingerprint, transcript: SegmentTable, tts_segments: SegmentTable,
+            tts_model: str = config.TTS_MODEL_NAME) -> int:
+        """
+        Register a processed source and keep its TTS clips.
+
+        Args:
+            key (str): Source identity (see pipeline.source_key)
+            fingerprint (Fingerprint): Fingerprint of its audio
+            transcript (SegmentTable): Original-language segments
+            tts_segments (SegmentTable): Translated segments with 'audio_path'
+            tts_model (str): TTS model the clips were synthesized with
+
+        Returns:
+            int: Source ID
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO sources (key, created_at, frame_count, tts_model) VALUES (?, ?, ?, ?)',
+                (key, time.time(), fingerprint.frame_count, tts_model)
+            )
+            self._conn.commit()
+            source_id = cursor.lastrowid
+
+        directory = self.directory / str(source_id)
+        directory.mkdir(parents=True, exist_ok=True)
+        clip_dir = dedup_clip_dir(source_id)
+        clip_dir.mkdir(parents=True, exist_ok=True)
+        names = []
+        for segment in tts_segments:
+            name = os.path.basename(segment['audio_path'])
+            link_or_copy(segment['audio_path'], str(clip_dir / name))
+            names.append(name)
+        transcript.save(str(directory / 'transcript.npz'))
+        tts_segments.with_audio_paths(names).save(str(directory / 'segments.npz'))
+        # Written last: a source without a fingerprint is never matched
+        fingerprint.save(str(directory / 'fingerprint.npz'))
+
+        self._prune()
+        return source_id
+
+    def _prune(self):
+        """Forget the oldest sources beyond DEDUP_MAX_SOURCES."""
+        with self._lock:
+            rows = self._conn.execute('SELECT id FROM sources ORDER BY id DESC LIMIT -1 OFFSET ?',
+                                      (config.DEDUP_MAX_SOURCES,)).fetchall()
+            for (source_id,) in rows:
+                self._conn.execute('DELETE FROM sources WHERE id = ?', (source_id,))
+                self._fingerprints.pop(source_id, None)
+                shutil.rmtree(self.directory / str(source_id), ignore_errors=True)
+                shutil.rmtree(dedup_clip_dir(source_id), ignore_errors=True)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_index: Optional[FingerprintIndex] = None
+_index_lock = threading.Lock()
+
+def get_fingerprint_index() -> FingerprintIndex:
+    """Get the process-wide fingerprint index."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FingerprintIndex()
+        return _index
+
+def lookup(audio_path: str, cancel_token: Optional[CancellationToken] = None
+           ) -> Tuple[Optional[Fingerprint], Optional[FingerprintMatch]]:
+    """
+    Fingerprint downloaded audio and look it up in the index.
+
+    Failures are logged and treated as "no match", so deduplication never fails a job.
+
+    Args:
+        audio_path (str): Downloaded source audio
+        cancel_token (Optional[CancellationToken]): Token that stops decoding
+
+    Returns:
+        Tuple[Optional[Fingerprint], Optional[FingerprintMatch]]: The fingerprint (None on
+            failure) and the best match (None if there is none)
+    """
+    logger = logging.getLogger('yt_germanizer')
+    try:
+        fingerprint = compute_fingerprint(audio_path, cancel_token=cancel_token)
+        match = get_fingerprint_index().find(fingerprint)
+    except JobCancelled:
+        raise
+    except Exception as e:
+        logger.warning(f"Fingerprint lookup failed: {str(e)}")
+        return None, None
+    metrics.CACHE_REQUESTS.inc(cache='fingerprint', result='miss' if match is None else 'hit')
+    if match is not None:
+        logger.info(f"Audio matches an already processed source: {match}")
+    return fingerprint, match
+
+def register(key: str, fingerprint: Fingerprint, transcript: SegmentTable, tts_segments: SegmentTable):
+    """
+    Add a processed source to the index (failures are logged, not raised).
+
+    Args:
+        key (str): Source identity
+        fingerprint (Fingerprint): Fingerprint of its audio
+        transcript (SegmentTable): Original-language segments
+        tts_segments (SegmentTable): Translated segments with 'audio_path'
+    """
+    try:
+        source_id = get_fingerprint_index().add(key, fingerprint, transcript, tts_segments)
+        logging.getLogger('yt_germanizer').info(f"Added source {source_id} to the fingerprint index")
+    except Exception as e:
+        logging.getLogger('yt_germanizer').warning(f"Could not add source to the fingerprint index: {str(e)}")
@@ -2,19 +2,22 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import messagebox
 from pathlib import Path
-import threading
+import queue
 from PIL import Image
 import os
 from dotenv import load_dotenv
 
 # Import existing functionality
-from src.audio_processing import download_audio
-from src.transcription import transcribe_audio
-from src.tts_generation import generate_tts
-from src.video_sync import sync_audio_with_video
+from src.jobs import JobManager, COMPLETED, FAILED, CANCELLED
+from src.pipeline import STAGES
+from src.tts_generation import preload_tts_model
 from src.utils import setup_logging, clean_filename, get_video_id
+from src.progress import format_time
 from src import config
 
+# Interval in milliseconds at which job events are drained on the Tk main loop
+EVENT_POLL_MS = 100
+
 # Load environment variables
 load_dotenv()
 
@@ -138,6 +141,16 @@ class YouTubeGermanizerGUI(ctk.CTk):
         )
         self.start_button.grid(row=2, column=0, padx=10, pady=10)
         
+        # Cancel button
+        self.cancel_button = ctk.CTkButton(
+            self.url_frame,
+            text="Cancel",
+            command=self.cancel_processing,
+            state="disabled",
+            fg_color=("gray70", "gray30")
+        )
+        self.cancel_button.grid(row=3, column=0, padx=10, pady=(0, 10))
+        
         # Progress area
         self.progress_frame = ctk.CTkFrame(self.main_frame)
         self.progress_frame.grid(row=1, column=0, padx=20, pady=20, sticky="ew")
@@ -171,6 +184,7 @@ class YouTubeGermanizerGUI(ctk.CTk):
         steps = [
             ("📥 Download", "Waiting to start..."),
             ("🎯 Transcribe", "Waiting to start..."),
+            ("🔄 Translate", "Waiting to start..."),
             ("🗣️ Generate TTS", "Waiting to start..."),
             ("🎵 Sync Audio", "Waiting to start...")
         ]
@@ -183,6 +197,14 @@ class YouTubeGermanizerGUI(ctk.CTk):
         # Initialize processing state
         self.processing = False
         self.current_step = 0
+        self.current_job_id = None
+        self.audio_quality = "192"
+        
+        # Jobs run on a worker thread and report back through a queue that
+        # is drained on the Tk main loop, so widgets are only touched here
+        self.events = queue.Queue()
+        self.job_manager = JobManager(max_workers=1, on_update=lambda job: self.events.put(job.to_dict()))
+        self.after(EVENT_POLL_MS, self.drain_events)
     
     def create_status_box(self, parent, title, status):
         frame = ctk.CTkFrame(parent)
@@ -230,7 +252,6 @@ class YouTubeGermanizerGUI(ctk.CTk):
     def update_progress(self, value, status):
         self.progress_bar.set(value)
         self.status_label.configure(text=status)
-        self.update()
     
     def start_processing(self):
         if self.processing:
@@ -248,64 +269,71 @@ class YouTubeGermanizerGUI(ctk.CTk):
             messagebox.showerror("Error", "Please enter a YouTube video URL")
             return
         
-        # Start processing in a separate thread
+        # Warm up the TTS model while the earlier stages run
+        preload_tts_model()
+        
+        # Start processing on the job executor
         self.processing = True
         self.start_button.configure(state="disabled")
-        threading.Thread(target=self.process_video, args=(api_key, video_url), daemon=True).start()
+        self.cancel_button.configure(state="normal")
+        for i in range(len(self.status_boxes)):
+            self.update_status_box(i, "Waiting to start...")
+        job = self.job_manager.submit(
+            video_url=video_url,
+            api_key=api_key,
+            audio_quality=self.audio_quality
+        )
+        self.current_job_id = job.id
+    
+    def cancel_processing(self):
+        if self.current_job_id and self.job_manager.cancel(self.current_job_id):
+            self.cancel_button.configure(state="disabled")
+            self.update_progress(self.progress_bar.get(), "Cancelling...")
     
-    def process_video(self, api_key, video_url):
+    def drain_events(self):
         try:
-            # Step 1: Download
-            self.update_progress(0.0, "Downloading video audio...")
-            self.update_status_box(0, "Downloading...", is_active=True)
-            
-            video_id = get_video_id(video_url)
-            audio_path = download_audio(video_url, config.TEMP_DIR)
-            
-            self.update_progress(0.25, "Audio downloaded successfully")
-            self.update_status_box(0, "Complete ✓", is_complete=True)
-            
-            # Step 2: Transcribe
-            self.update_progress(0.25, "Transcribing audio...")
-            self.update_status_box(1, "Transcribing...", is_active=True)
-            
-            transcript = transcribe_audio(audio_path, api_key)
-            
-            self.update_progress(0.5, "Transcription complete")
-            self.update_status_box(1, "Complete ✓", is_complete=True)
-            
-            # Step 3: Generate TTS
-            self.update_progress(0.5, "Generating German speech...")
-            self.update_status_box(2, "Generating...", is_active=True)
-            
-            tts_output = generate_tts(transcript, config.TTS_DIR)
-            
-            self.update_progress(0.75, "TTS generation complete")
-            self.update_status_box(2, "Complete ✓", is_complete=True)
-            
-            # Step 4: Sync audio
-            self.update_progress(0.75, "Syncing audio with video...")
-            self.update_status_box(3, "Syncing...", is_active=True)
-            
-            output_path = sync_audio_with_video(video_url, tts_output, config.OUTPUT_DIR)
-            
-            self.update_progress(1.0, "Processing complete!")
-            self.update_status_box(3, "Complete ✓", is_complete=True)
-            
+            while True:
+                self.apply_job_update(self.events.get_nowait())
+        except queue.Empty:
+            pass
+        self.after(EVENT_POLL_MS, self.drain_events)
+    
+    def apply_job_update(self, job):
+        if job['id'] != self.current_job_id:
+            return
+        
+        status = job['message']
+        if job['eta'] is not None and job['status'] not in (COMPLETED, FAILED, CANCELLED):
+            status = f"{status} (about {format_time(job['eta'])} left)"
+        self.update_progress(job['progress'], status)
+        for i, (stage, _) in enumerate(STAGES):
+            if stage in job['completed_stages']:
+                self.update_status_box(i, "Complete ✓", is_complete=True)
+            elif stage == job['stage'] and job['status'] == CANCELLED:
+                self.update_status_box(i, "Cancelled")
+            elif stage == job['stage'] and job['status'] != FAILED:
+                self.update_status_box(i, job['message'], is_active=True)
+        
+        if job['status'] not in (COMPLETED, FAILED, CANCELLED):
+            return
+        
+        self.processing = False
+        self.current_job_id = None
+        self.start_button.configure(state="normal")
+        self.cancel_button.configure(state="disabled")
+        
+        if job['status'] == COMPLETED:
             # Show success message and open folder
             if messagebox.askyesno(
                 "Success",
                 "Video processing complete! Would you like to open the output folder?"
             ):
                 os.startfile(str(config.OUTPUT_DIR))
-        
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        elif job['status'] == FAILED:
+            messagebox.showerror("Error", job['error'])
             self.update_progress(0, "Error occurred")
-        
-        finally:
-            self.processing = False
-            self.start_button.configure(state="normal")
+        else:
+            self.update_progress(0, "Cancelled")
 
 if __name__ == "__main__":
     app = YouTubeGermanizerGUI()
@@ -0,0 +1,102 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src import config
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    data TEXT NOT NULL
+)
+"""
+
+class JobStore:
+    """
+    Persists job snapshots in SQLite so job history survives restarts.
+
+    Only the serializable state from Job.to_dict() plus the runner params
+    without secrets is stored.
+    """
+
+    def __init__(self, path: Path = config.JOB_DB_PATH):
+        """
+        Open (and create if needed) the job database.
+
+        Args:
+            path (Path): SQLite database file
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(path)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def save(self, snapshot: Dict[str, Any]):
+        """
+        Insert or update a job snapshot.
+
+        Args:
+            snapshot (Dict[str, Any]): Job state with at least 'id', 'status' and 'created_at'
+        """
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO jobs (id, status, created_at, finished_at, data) VALUES (?, ?, ?, ?, ?)',
+                (snapshot['id'], snapshot['status'], snapshot['created_at'],
+                 snapshot.get('finished_at'), json.dumps(snapshot))
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load one job snapshot.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            Optional[Dict[str, Any]]: Snapshot, or None if unknown
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def load_all(self) -> List[Dict[str, Any]]:
+        """
+        Load every stored job snapshot, newest first.
+
+        Returns:
+            List[Dict[str, Any]]: Snapshots
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT data FROM jobs ORDER BY created_at DESC').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete_finished_before(self, cutoff: float) -> int:
+        """
+        Delete finished jobs older than a timestamp.
+
+        Args:
+            cutoff (float): Unix time; jobs finished before it are removed
+
+        Returns:
+            int: Number of jobs deleted
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                'DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?', (cutoff,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,449 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from src.pipeline import job_key, run_pipeline
+from src.eta import JobEstimate
+from src.cancellation import CancellationToken
+from src.job_store import JobStore
+from src.profiler import SamplingProfiler
+from src.utils import add_log_handler, set_log_context
+from src import metrics
+from src import config
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+def job_log_path(job_id: str, log_dir: Path = config.JOB_LOG_DIR) -> Path:
+    """
+    Get the path of a job's log file.
+
+    Args:
+        job_id (str): Job ID
+        log_dir (Path): Directory holding per-job logs
+
+    Returns:
+        Path: Log file path
+    """
+    return Path(log_dir) / f"{job_id}.log"
+
+# Log directories that already have a JobLogHandler
+_job_log_dirs = set()
+
+class JobLogHandler(logging.Handler):
+    """
+    Copies log records emitted on a job's worker thread into that job's log file.
+
+    Records are routed by the job_id attribute set from the emitting thread's
+    log context (see utils.set_log_context).
+    """
+
+    def __init__(self, log_dir: Path = config.JOB_LOG_DIR):
+        super().__init__()
+        self.log_dir = Path(log_dir)
+        self.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    def emit(self, record: logging.LogRecord):
+        job_id = getattr(record, 'job_id', None)
+        if job_id is None:
+            return
+        try:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            with open(job_log_path(job_id, self.log_dir), 'a', encoding='utf-8') as f:
+                f.write(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+
+class Job:
+    """
+    State of one pipeline run, updated by the worker and read by front ends.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        """
+        Initialize a queued job.
+
+        Args:
+            params (Dict[str, Any]): Keyword arguments passed to the job runner
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = QUEUED
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        # Predicted seconds until the job finishes (None until it starts)
+        self.eta: Optional[float] = None
+        self.message = "Waiting for a free worker..."
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.completed_stages: List[str] = []
+        self.cancel_token = CancellationToken()
+        # Coalescing key and number of submissions attached to this job (see JobManager.submit)
+        self.key: Optional[Hashable] = None
+        self.subscribers = 1
+        # When the job was last written to the store (time.monotonic())
+        self.persisted_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the job has finished, successfully or not."""
+        return self.status in (COMPLETED, FAILED, CANCELLED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get a serializable snapshot of the job without secrets.
+
+        Returns:
+            Dict[str, Any]: Job state
+        """
+        return {
+            'id': self.id,
+            'video_url': self.params.get('video_url'),
+            'status': self.status,
+            'stage': self.stage,
+            'progress': self.progress,
+            'eta': self.eta,
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'completed_stages': list(self.completed_stages),
+            'subscribers': self.subscribers,
+        }
+
+    @classmethod
+    def from_dict(cls, snapshot: Dict[str, Any]) -> 'Job':
+        """
+        Restore a job from a stored snapshot (see JobStore).
+
+        Args:
+            snapshot (Dict[str, Any]): Output of to_dict() plus 'params'
+
+        Returns:
+            Job: The restored job
+        """
+        job = cls(dict(snapshot.get('params') or {'video_url': snapshot.get('video_url')}))
+        for key in ('id', 'status', 'stage', 'progress', 'eta', 'message', 'result', 'error',
+                    'created_at', 'started_at', 'finished_at', 'completed_stages'):
+            if key in snapshot:
+                setattr(job, key, snapshot[key])
+        return job
+
+class JobManager:
+    """
+    Runs pipeline jobs on a background worker pool and tracks their state.
+    """
+
+    def __init__(self, runner: Callable[..., str] = run_pipeline, max_workers: int = config.JOB_WORKERS,
+                 on_update: Optional[Callable[[Job], None]] = None,
+                 store: Optional[JobStore] = None, log_dir: Optional[Path] = None,
+                 key_func: Optional[Callable[[Dict[str, Any]], Hashable]] = job_key,
+                 profile_dir: Optional[Path] = None,
+                 persist_interval: float = config.JOB_PERSIST_INTERVAL):
+        """
+        Initialize the job manager.
+
+        Args:
+            runner (Callable[..., str]): Job function; receives the job params plus
+                progress_callback, cancel_token and estimate (a JobEstimate the runner
+                updates with its progress) keywords, and returns the output path
+            max_workers (int): Number of jobs that run concurrently
+            on_update (Optional[Callable[[Job], None]]): Called from the worker thread
+                whenever a job changes state or progress
+            store (Optional[JobStore]): Persist jobs here and reload them on start;
+                jobs that were active when the previous process stopped are marked failed
+            log_dir (Optional[Path]): Write each job's log records to <log_dir>/<job id>.log
+            key_func (Optional[Callable[[Dict[str, Any]], Hashable]]): Maps job params to an
+                identity; a submission whose key matches an unfinished job attaches to that
+                job instead of starting a new one (None disables coalescing)
+            profile_dir (Optional[Path]): Sample each job's worker thread and write its
+                profile report to <profile_dir>/<job id>/
+            persist_interval (float): Least seconds between stored progress updates within a stage
+                (state changes and stage changes are always stored)
+        """
+        self.runner = runner
+        self.on_update = on_update
+        self.store = store
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.persist_interval = persist_interval
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job-worker')
+        self.key_func = key_func
+        self.jobs: Dict[str, Job] = {}
+        self._inflight: Dict[Hashable, Job] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger('yt_germanizer')
+        metrics.JOBS_QUEUED.set_function(lambda: sum(job.status == QUEUED for job in self.list()))
+
+        if self.log_dir and self.log_dir not in _job_log_dirs:
+            _job_log_dirs.add(self.log_dir)
+            add_log_handler(JobLogHandler(self.log_dir))
+
+        if store is not None:
+            for snapshot in store.load_all():
+                job = Job.from_dict(snapshot)
+                if not job.done:
+                    job.status = FAILED
+                    job.error = "Interrupted by a service restart"
+                    job.message = "Error occurred"
+                    job.finished_at = time.time()
+                    self._persist(job)
+                self.jobs[job.id] = job
+
+    def submit(self, **params) -> Job:
+        """
+        Queue a new job, or attach to an identical job that is still queued or running.
+
+        Args:
+            **params: Keyword arguments for the job runner (e.g. video_url, api_key)
+
+        Returns:
+            Job: The queued job, or the in-flight job the submission was attached to
+        """
+        key = None
+        if self.key_func is not None:
+            try:
+                key = self.key_func(params)
+            except Exception as e:
+                self.logger.warning(f"Could not build job key: {str(e)}")
+
+        with self._lock:
+            existing = self._inflight.get(key) if key is not None else None
+            if existing is not None and not existing.done:
+                existing.subscribers += 1
+                self.logger.info(f"Attached submission for {params.get('video_url')} to job {existing.id} "
+                                 f"({existing.subscribers} subscribers)")
+                return existing
+            job = Job(params)
+            job.key = key
+            self.jobs[job.id] = job
+            if key is not None:
+                self._inflight[key] = job
+        self._persist(job)
+        self.executor.submit(self._run, job)
+        self.logger.info(f"Queued job {job.id} for {params.get('video_url')}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Look up a job by ID.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            Optional[Job]: The job, or None if unknown
+        """
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a queued or running job.
+
+        A job shared by several submissions keeps running until every
+        subscriber has cancelled.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            bool: True if the job was still active and the request was accepted
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        with self._lock:
+            if job.subscribers > 1:
+                job.subscribers -= 1
+                self.logger.info(f"Detached a subscriber from job {job.id} ({job.subscribers} left)")
+                return True
+        self.logger.info(f"Cancelling job {job.id}")
+        job.cancel_token.cancel()
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED, "Cancelled")
+        return True
+
+    def cancel_all(self) -> int:
+        """
+        Cancel every queued or running job, however many submissions share it (e.g. on shutdown).
+
+        Returns:
+            int: Number of jobs cancelled
+        """
+        with self._lock:
+            active = [job for job in self.jobs.values() if not job.done]
+            for job in active:
+                job.subscribers = 1
+        for job in active:
+            self.logger.info(f"Cancelling job {job.id}")
+            job.cancel_token.cancel()
+            if job.status == QUEUED:
+                self._finish(job, CANCELLED, "Cancelled")
+        return len(active)
+
+    def list(self) -> List[Job]:
+        """
+        Get all known jobs, newest first.
+
+        Returns:
+            List[Job]: Jobs sorted by creation time
+        """
+        with self._lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def prune(self, max_age: float = config.JOB_RETENTION) -> int:
+        """
+        Forget finished jobs older than max_age seconds.
+
+        Args:
+            max_age (float): Maximum age of finished jobs in seconds
+
+        Returns:
+            int: Number of jobs removed
+        """
+        cutoff = time.time() - max_age
+        with self._lock:
+            expired = [job_id for job_id, job in self.jobs.items()
+                       if job.done and job.finished_at < cutoff]
+            for job_id in expired:
+                del self.jobs[job_id]
+        if self.store is not None:
+            self.store.delete_finished_before(cutoff)
+        return len(expired)
+
+    def _run(self, job: Job):
+        """Execute a job on a worker thread and record its outcome."""
+        if job.done:
+            # Cancelled while still queued
+            return
+        set_log_context(job_id=job.id)
+        try:
+            if self.profile_dir is None:
+                self._execute(job)
+                return
+            profiler = SamplingProfiler()
+            try:
+                with profiler:
+                    self._execute(job)
+            finally:
+                profiler.write_report(str(self.profile_dir / job.id))
+        finally:
+            set_log_context(job_id=None)
+
+    def profile_path(self, job_id: str) -> Optional[Path]:
+        """
+        Get the profile report directory of a job.
+
+        Args:
+            job_id (str): Job ID
+
+        Returns:
+            Optional[Path]: Report directory, or None if the job was not profiled
+        """
+        if self.profile_dir is None:
+            return None
+        directory = self.profile_dir / job_id
+        return directory if directory.is_dir() else None
+
+    def _execute(self, job: Job):
+        """Call the runner for a job and record progress and outcome."""
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.message = "Starting..."
+        self._notify(job)
+
+        def progress_callback(stage: str, fraction: float, message: str):
+            stage_changed = job.stage != stage
+            if job.stage and stage_changed and job.stage not in job.completed_stages:
+                job.completed_stages.append(job.stage)
+            job.stage = stage
+            # Progress and time left follow the stage durations learned from past runs
+            job.progress = estimate.progress()
+            job.eta = estimate.remaining()
+            job.message = message
+            # Progress within a stage (every TTS segment) is stored at most every JOB_PERSIST_INTERVAL
+            self._notify(job, throttle=not stage_changed)
+
+        estimate = JobEstimate()
+        try:
+            job.result = self.runner(
+                progress_callback=progress_callback,
+                cancel_token=job.cancel_token,
+                estimate=estimate,
+                **job.params
+            )
+            if job.stage and job.stage not in job.completed_stages:
+                job.completed_stages.append(job.stage)
+            job.progress = 1.0
+            job.eta = 0.0
+            self._finish(job, COMPLETED, "Processing complete")
+        except Exception as e:
+            if job.cancel_token.cancelled:
+                self.logger.info(f"Job {job.id} cancelled")
+                self._finish(job, CANCELLED, "Cancelled")
+            else:
+                self.logger.error(f"Job {job.id} failed: {str(e)}", exc_info=True)
+                job.error = str(e)
+                self._finish(job, FAILED, "Error occurred")
+
+    def _finish(self, job: Job, status: str, message: str):
+        """Record the final state of a job and release its secrets."""
+        job.message = message
+        job.finished_at = time.time()
+        if status != COMPLETED:
+            job.eta = None
+        # Drop secrets once they are no longer needed
+        job.params.pop('api_key', None)
+        job.status = status
+        with self._lock:
+            if job.key is not None and self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+        self._notify(job)
+
+    def _persist(self, job: Job, throttle: bool = False):
+        """Save a job snapshot to the store, never letting it break the job."""
+        if self.store is None:
+            return
+        now = time.monotonic()
+        if throttle and job.persisted_at is not None and now - job.persisted_at < self.persist_interval:
+            return
+        job.persisted_at = now
+        snapshot = job.to_dict()
+        snapshot['params'] = {key: value for key, value in job.params.items() if key != 'api_key'}
+        try:
+            self.store.save(snapshot)
+        except Exception as e:
+            self.logger.error(f"Error saving job {job.id}: {str(e)}")
+
+    def _notify(self, job: Job, throttle: bool = False):
+        """Persist a job update and forward it to the listener, never letting it break the job."""
+        self._persist(job, throttle=throttle)
+        if self.on_update is None:
+            return
+        try:
+            self.on_update(job)
+        except Exception as e:
+            self.logger.error(f"Error in job update listener: {str(e)}")
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stop accepting jobs and shut down the worker pool.
+
+        Args:
+            wait (bool): Whether to wait for running jobs to finish
+        """
+        self.executor.shutdown(wait=wait)
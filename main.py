@@ -1,36 +1,167 @@
 import os
 import sys
+import time
+import shutil
+import argparse
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
-# Add debug prints for environment loading
-print("Current working directory:", os.getcwd())
-print("Loading .env file...")
+# Load .env before config so its settings can be overridden from the environment
 load_dotenv(Path(__file__).parent / '.env')
-print("Environment variables loaded")
 
-from src.audio_processing import download_audio
-from src.transcription import transcribe_audio
-from src.tts_generation import generate_tts
-from src.video_sync import sync_audio_with_video
-from src.utils import setup_logging, clean_filename, get_video_id, translate_segments
+# Only lightweight modules are imported here; the pipeline stages (torch,
+# Coqui TTS, moviepy, yt_dlp, assemblyai, pydub) load when a job actually runs.
+from src.utils import setup_logging, get_video_id
 from src import config
 
-def main():
-    # Check command line arguments
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <youtube_url> [--quality QUALITY]")
+def parse_args(argv=None) -> argparse.Namespace:
+    """
+    Parse command line arguments.
+    
+    Args:
+        argv (list, optional): Arguments to parse (default: sys.argv[1:])
+    
+    Returns:
+        argparse.Namespace: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog='python main.py',
+        description="Create a German version of a YouTube video."
+    )
+    parser.add_argument('video_url', nargs='?', help="YouTube video URL")
+    parser.add_argument('--quality', default='192', help="Audio quality in kbps (default: 192)")
+    parser.add_argument('--progressive', action='store_true', default=config.PROGRESSIVE_OUTPUT,
+                        help="Also write an HLS stream (<output dir>/jobs/<job>/hls/index.m3u8) that grows while the job runs")
+    parser.add_argument('--windowed', action='store_true',
+                        help="Dub in rolling windows with a few minutes of delay (live streams, growing files, long videos)")
+    parser.add_argument('--follow', action='store_true',
+                        help="With --windowed, keep reading a local file that is still being written")
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help="Write Prometheus metrics for the run to PATH when it finishes")
+    parser.add_argument('--profile', action='store_true',
+                        help="Sample the run and write per-stage flame graphs and hotspots")
+    parser.add_argument('--profile-dir', metavar='DIR',
+                        help=f"Directory for the profile report (default: a new directory in {config.PROFILE_DIR})")
+    parser.add_argument('--estimate', action='store_true',
+                        help="Only predict how long the job will take from past runs, then exit")
+    parser.add_argument('--duration', type=float, metavar='MINUTES',
+                        help="Source duration for --estimate instead of looking it up (URL optional)")
+    parser.add_argument('--export-edits', metavar='OUTPUT_DIR',
+                        help="Write the translated segments of a finished video to an editable JSON file")
+    parser.add_argument('--apply-edits', metavar='EDIT_FILE',
+                        help="Re-render only the segments changed in an edit file, then exit")
+    parser.add_argument('--validate', action='store_true',
+                        help="Only validate the URL and environment, then exit")
+    return parser.parse_args(argv)
+
+def validate(video_url: str, api_key: str) -> bool:
+    """
+    Check that a job can run without importing any pipeline stage.
+    
+    Args:
+        video_url (str): YouTube video URL
+        api_key (str): AssemblyAI API key
+    
+    Returns:
+        bool: True if the URL, API key and FFmpeg are all usable
+    """
+    ok = True
+    try:
+        print("Video ID:", get_video_id(video_url))
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        ok = False
+    if not api_key:
+        print("Error: Please set ASSEMBLYAI_API_KEY in your .env file")
+        ok = False
+    if shutil.which('ffmpeg') is None:
+        print("Error: FFmpeg not found")
+        ok = False
+    return ok
+
+def print_estimate(video_url: Optional[str], duration_minutes: Optional[float]) -> bool:
+    """
+    Print the predicted run time of a job without running it.
+    
+    Args:
+        video_url (Optional[str]): YouTube URL or local video file, used to look up the duration
+        duration_minutes (Optional[float]): Source duration, if known
+    
+    Returns:
+        bool: True if an estimate was printed
+    """
+    from src.eta import estimate_job
+    from src.progress import format_time
+    
+    if duration_minutes is None:
+        from src.audio_processing import get_source_duration
+        try:
+            duration_minutes = get_source_duration(video_url) / 60
+        except Exception as e:
+            print(f"Error: {str(e)}")
+            return False
+    
+    estimate = estimate_job(duration_minutes)
+    sizes = estimate['sizes']
+    print(f"Source: {duration_minutes:.1f} min, ~{sizes['segments']:.0f} segments, "
+          f"~{sizes['characters']:.0f} characters")
+    for stage, seconds in estimate['stages'].items():
+        runs = estimate['history'][stage]
+        basis = f"{runs} past runs" if runs else "default rate"
+        print(f"  {stage:<12} {format_time(seconds):>8}  ({basis})")
+    print(f"  {'total':<12} {format_time(estimate['total']):>8}")
+    return True
+
+def edit(export_dir: Optional[str], edit_file: Optional[str]) -> int:
+    """
+    Export a finished video's segments for editing, or re-render an edited file.
+    
+    Args:
+        export_dir (Optional[str]): Output directory of the video to export
+        edit_file (Optional[str]): Edited file to apply
+    
+    Returns:
+        int: Exit code
+    """
+    setup_logging(config.LOG_FILE)
+    from src.rerender import apply_edits, export_edits
+    
+    try:
+        if export_dir:
+            print(f"Edit file: {export_edits(export_dir)}")
+        if edit_file:
+            started = time.perf_counter()
+            output_path = apply_edits(edit_file)
+            print(f"Re-rendered {output_path} in {time.perf_counter() - started:.1f} s")
+    except Exception as e:
+        print(f"Error: {str(e)}")
         return 1
+    return 0
+
+def main(argv=None):
+    args = parse_args(argv)
     
-    video_url = sys.argv[1]
-    audio_quality = '192'  # Default quality
+    if args.estimate and (args.video_url or args.duration is not None):
+        return 0 if print_estimate(args.video_url, args.duration) else 1
+    
+    if args.export_edits or args.apply_edits:
+        return edit(args.export_edits, args.apply_edits)
+    
+    # Check command line arguments
+    if not args.video_url:
+        print("Usage: python main.py <youtube_url> [--quality QUALITY] [--profile] [--estimate] [--validate]")
+        return 1
     
-    # Parse optional quality argument
-    if len(sys.argv) > 3 and sys.argv[2] == '--quality':
-        audio_quality = sys.argv[3]
+    video_url = args.video_url
+    audio_quality = args.quality
     
     # Load environment variables
     api_key = os.getenv('ASSEMBLYAI_API_KEY')
+    
+    if args.validate:
+        return 0 if validate(video_url, api_key) else 1
+    
     print("API Key present:", bool(api_key))
     if not api_key:
         print("Error: Please set ASSEMBLYAI_API_KEY in your .env file")
@@ -40,73 +171,34 @@ def main():
     logger = setup_logging(config.LOG_FILE)
     logger.info("Starting YouTube Video Germanizer")
     
+    profiler = None
+    if args.profile:
+        from src.profiler import SamplingProfiler
+        profiler = SamplingProfiler().start()
+    
     try:
-        # Get YouTube video URL from user
-        video_id = get_video_id(video_url)
-        logger.info(f"Processing video ID: {video_id}")
-        
-        # Create output directory for this video
-        video_output_dir = config.OUTPUT_DIR / clean_filename(video_id)
-        os.makedirs(video_output_dir, exist_ok=True)
-        
-        # Step 1: Download audio from YouTube video
-        logger.info("Downloading audio from YouTube...")
-        audio_path = download_audio(
-            video_url,
-            output_dir=str(config.INPUT_DIR),
-            quality=audio_quality
-        )
-        logger.info(f"Audio downloaded successfully to: {audio_path}")
-        
-        # Step 2: Transcribe audio with AssemblyAI
-        logger.info("Transcribing audio with speaker diarization...")
-        transcription = transcribe_audio(api_key, audio_path)
-        logger.info(f"Transcription completed: {len(transcription)} segments")
-        
-        # Log speaker information
-        speakers = set(segment['speaker'] for segment in transcription)
-        logger.info(f"Detected {len(speakers)} speakers: {', '.join(speakers)}")
-        
-        # Step 3: Translate transcription to German
-        logger.info("Translating transcription to German...")
-        translated_segments = translate_segments(transcription)
-        logger.info(f"Translation completed: {len(translated_segments)} segments")
+        if args.windowed:
+            from src.windowed import run_windowed
+            output_path = run_windowed(video_url, api_key, follow=args.follow)
+            print(f"Output: {output_path}")
+            return output_path
         
-        # Step 4: Generate German TTS for each segment
-        logger.info("Generating German TTS...")
-        tts_segments = []
-        current_speaker = None
+        from src.pipeline import run_pipeline
+        from src.eta import JobEstimate
+        from src.progress import ProgressBar
         
-        for segment in translated_segments:
-            # Check if speaker changed to adjust voice
-            if segment['speaker'] != current_speaker:
-                current_speaker = segment['speaker']
-                logger.info(f"Switching to voice for speaker {current_speaker}")
-            
-            # Generate TTS for each segment
-            tts_path = generate_tts(
-                text=segment['text'],
-                output_dir=str(config.TTS_DIR),
-                start_time=segment['start'],
-                speaker=segment['speaker']  # Pass speaker info to TTS generator
-            )
-            tts_segments.append({
-                'audio_path': tts_path,
-                'start': segment['start'],
-                'end': segment['end'],
-                'speaker': segment['speaker']
-            })
-        logger.info(f"TTS generation completed: {len(tts_segments)} segments")
+        # Progress bar with the time left predicted from past runs
+        estimate = JobEstimate()
+        progress_bar = ProgressBar(total=1000, prefix='Progress', length=30)
         
-        # Step 5: Synchronize TTS with video
-        logger.info("Synchronizing TTS with video...")
-        output_path = sync_audio_with_video(
-            video_url=video_url,
-            tts_segments=tts_segments,
-            output_dir=str(config.OUTPUT_DIR)
-        )
+        def show_progress(stage: str, fraction: float, message: str):
+            progress_bar.suffix = f"{stage:<10}"
+            progress_bar.print(int(estimate.progress() * 1000), remaining=estimate.remaining())
         
-        logger.info(f"Video processing completed! Output saved to: {output_path}")
+        output_path = run_pipeline(video_url, api_key, audio_quality=audio_quality,
+                                   progress_callback=show_progress, estimate=estimate,
+                                   progressive=args.progressive)
+        progress_bar.print(1000, remaining=0)
         return output_path
     
     except KeyboardInterrupt:
@@ -115,6 +207,16 @@ def main():
     except Exception as e:
         logger.error(f"Error: {str(e)}", exc_info=True)
         return 1
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            profile_dir = args.profile_dir or str(config.PROFILE_DIR / time.strftime('%Y%m%d_%H%M%S'))
+            paths = profiler.write_report(profile_dir)
+            print(f"Profile: {paths['flamegraph']}, {paths['hotspots']}")
+        if args.metrics_file:
+            from src.metrics import REGISTRY
+            REGISTRY.write(args.metrics_file)
+            logger.info(f"Metrics written to {args.metrics_file}")
     
     return 0
 
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.cancellation import CancellationToken, JobCancelled, run_process
+from src import metrics
+from src import config
+
+# Number of probe results kept in memory
+MEMORY_CACHE_SIZE = 256
+
+# Probe results persisted across processes, keyed by path, mtime and size
+PROBE_CACHE_DIR = config.CACHE_DIR / 'media_probe'
+
+_memory_cache: 'OrderedDict[tuple, Dict[str, Any]]' = OrderedDict()
+_cache_lock = threading.Lock()
+_last_prune = 0.0
+
+def _cache_key(path: str) -> tuple:
+    """Build a cache key that changes whenever the file is replaced or modified."""
+    stat = os.stat(path)
+    return (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+
+def _disk_cache_path(key: tuple, keyframes: bool) -> Path:
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return PROBE_CACHE_DIR / f"{digest}{'_kf' if keyframes else ''}.json"
+
+def _read_disk_cache(cache_file: Path) -> Optional[Dict[str, Any]]:
+    """Load a persisted probe result, treating entries older than CACHE_EXPIRY as missing."""
+    try:
+        if time.time() - cache_file.stat().st_mtime > config.CACHE_EXPIRY:
+            cache_file.unlink()
+            return None
+        return json.loads(cache_file.read_text())
+    except (OSError, ValueError):
+        return None
+
+def _prune_disk_cache():
+    """Delete expired probe results, at most once per CACHE_EXPIRY / 24."""
+    global _last_prune
+    now = time.time()
+    with _cache_lock:
+        if now - _last_prune < config.CACHE_EXPIRY / 24:
+            return
+        _last_prune = now
+    for cache_file in PROBE_CACHE_DIR.glob('*.json'):
+        try:
+            if now - cache_file.stat().st_mtime > config.CACHE_EXPIRY:
+                cache_file.unlink()
+        except OSError:
+            pass
+
+def _probe_keyframes(path: str, cancel_token: Optional[CancellationToken]) -> List[float]:
+    """
+    List the keyframe times of the first video stream.
+    
+    Only the packet headers of that stream are read, as compact CSV, so
+    audio and subtitle packets never reach the output.
+    
+    Args:
+        path (str): Path to a video file
+        cancel_token (Optional[CancellationToken]): Token that kills ffprobe on cancel
+    
+    Returns:
+        List[float]: Keyframe presentation times in seconds
+    """
+    cmd = ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+           '-show_entries', 'packet=pts_time,flags', '-print_format', 'csv=print_section=0', str(path)]
+    process = run_process(cmd, cancel_token)
+    if process.returncode != 0:
+        raise Exception(f"ffprobe error: {process.stderr.strip()}")
+    keyframes = []
+    for line in process.stdout.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags and pts_time not in ('', 'N/A'):
+            keyframes.append(float(pts_time))
+    return keyframes
+
+def _parse_probe(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert raw ffprobe JSON into the metadata used by the pipeline.
+    
+    Args:
+        data (Dict[str, Any]): Parsed ffprobe output
+    
+    Returns:
+        Dict[str, Any]: Media metadata
+    """
+    fmt = data.get('format', {})
+    streams = []
+    for stream in data.get('streams', []):
+        streams.append({
+            'index': stream.get('index'),
+            'codec_type': stream.get('codec_type'),
+            'codec_name': stream.get('codec_name'),
+            'duration': float(stream['duration']) if 'duration' in stream else None,
+            'sample_rate': int(stream['sample_rate']) if 'sample_rate' in stream else None,
+            'channels': stream.get('channels'),
+            'width': stream.get('width'),
+            'height': stream.get('height'),
+        })
+    
+    audio = [s for s in streams if s['codec_type'] == 'audio']
+    video = [s for s in streams if s['codec_type'] == 'video']
+    
+    duration = float(fmt['duration']) if 'duration' in fmt else None
+    if duration is None:
+        durations = [s['duration'] for s in streams if s['duration'] is not None]
+        duration = max(durations) if durations else 0.0
+    
+    info = {
+        'duration': duration,
+        'format_name': fmt.get('format_name'),
+        'size': int(fmt['size']) if 'size' in fmt else None,
+        'bit_rate': int(fmt['bit_rate']) if 'bit_rate' in fmt else None,
+        'streams': streams,
+        'has_audio': bool(audio),
+        'has_video': bool(video),
+        'sample_rate': audio[0]['sample_rate'] if audio else None,
+        'channels': audio[0]['channels'] if audio else None,
+        'keyframes': None,
+    }
+    return info
+
+def probe_media(path: str, keyframes: bool = False,
+                cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    """
+    Get media metadata from ffprobe, cached per file.
+    
+    Args:
+        path (str): Path to an audio or video file
+        keyframes (bool): Also build the keyframe index of the first video stream
+            (a second ffprobe call that reads that stream's packet headers, so it is opt-in)
+        cancel_token (Optional[CancellationToken]): Token that kills ffprobe on cancel
+    
+    Returns:
+        Dict[str, Any]: 'duration' (seconds), 'streams', 'sample_rate', 'channels',
+            'has_audio', 'has_video', 'format_name', 'size', 'bit_rate' and
+            'keyframes' (list of seconds, or None if not requested)
+    """
+    logger = logging.getLogger('yt_germanizer')
+    
+    try:
+        key = _cache_key(path)
+        with _cache_lock:
+            for cache_key in ((key, True), (key, keyframes)):
+                if cache_key in _memory_cache:
+                    _memory_cache.move_to_end(cache_key)
+                    metrics.CACHE_REQUESTS.inc(cache='media_probe_memory', result='hit')
+                    return _memory_cache[cache_key]
+        metrics.CACHE_REQUESTS.inc(cache='media_probe_memory', result='miss')
+        
+        cache_file = _disk_cache_path(key, keyframes)
+        info = _read_disk_cache(cache_file)
+        
+        metrics.CACHE_REQUESTS.inc(cache='media_probe_disk', result='miss' if info is None else 'hit')
+        if info is None:
+            cmd = ['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', str(path)]
+            process = run_process(cmd, cancel_token)
+            if process.returncode != 0:
+                raise Exception(f"ffprobe error: {process.stderr.strip()}")
+            info = _parse_probe(json.loads(process.stdout))
+            if keyframes:
+                info['keyframes'] = _probe_keyframes(path, cancel_token) if info['has_video'] else []
+            
+            try:
+                PROBE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+                cache_file.write_text(json.dumps(info))
+                _prune_disk_cache()
+            except OSError as e:
+                logger.warning(f"Could not write media probe cache: {str(e)}")
+        
+        with _cache_lock:
+            _memory_cache[(key, keyframes)] = info
+            while len(_memory_cache) > MEMORY_CACHE_SIZE:
+                _memory_cache.popitem(last=False)
+        return info
+    
+    except JobCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error probing media {path}: {str(e)}")
+        raise Exception(f"Media probe error: {str(e)}")
+
+def get_duration(path: str, cancel_token: Optional[CancellationToken] = None) -> float:
+    """
+    Get the duration of a media file in seconds.
+    
+    Args:
+        path (str): Path to an audio or video file
+        cancel_token (Optional[CancellationToken]): Token that kills ffprobe on cancel
+    
+    Returns:
+        float: Duration in seconds
+    """
+    return probe_media(path, cancel_token=cancel_token)['duration']
+
+def get_keyframes(path: str, cancel_token: Optional[CancellationToken] = None) -> List[float]:
+    """
+    Get the keyframe timestamps of a video's first video stream.
+    
+    Args:
+        path (str): Path to a video file
+        cancel_token (Optional[CancellationToken]): Token that kills ffprobe on cancel
+    
+    Returns:
+        List[float]: Keyframe presentation times in seconds
+    """
+    return probe_media(path, keyframes=True, cancel_token=cancel_token)['keyframes']
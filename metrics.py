@@ -0,0 +1,335 @@
+import os
+import time
+import bisect
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.cancellation import JobCancelled
+
+# Default histogram buckets in seconds, from sub-second API calls to hour-long stages
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class _Metric:
+    """Base class for a metric family with optional labels."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return '\n'.join(lines + self.samples())
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be read from a callback at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Optional[Callable[[], float]]):
+        """Read the (unlabelled) value from function at scrape time."""
+        self._function = function
+
+    def value(self, **labels) -> float:
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception:
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the duration of the with-block in seconds (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], 0.0))
+        return sum(counts)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+    def write(self, path: str):
+        """
+        Write the current metrics to a file (atomically, for node_exporter's textfile collector).
+
+        Args:
+            path (str): Output file path
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+REGISTRY = Registry()
+
+# Pipeline
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'yt_germanizer_stage_duration_seconds', "Duration of pipeline stages",
+    ['stage']))
+TTS_REAL_TIME_FACTOR = REGISTRY.register(Histogram(
+    'yt_germanizer_tts_real_time_factor', "TTS synthesis time divided by the duration of the generated audio",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5)))
+JOBS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'yt_germanizer_jobs_in_flight', "Pipeline runs currently executing"))
+JOBS_QUEUED = REGISTRY.register(Gauge(
+    'yt_germanizer_jobs_queued', "Jobs waiting for a free worker"))
+JOBS_TOTAL = REGISTRY.register(Counter(
+    'yt_germanizer_jobs_total', "Finished pipeline runs by outcome",
+    ['status']))
+BYTES_PROCESSED = REGISTRY.register(Counter(
+    'yt_germanizer_bytes_processed_total', "Bytes of media handled",
+    ['kind']))
+
+# External services
+EXTERNAL_SECONDS = REGISTRY.register(Histogram(
+    'yt_germanizer_external_request_duration_seconds', "Latency of calls to external services",
+    ['service']))
+EXTERNAL_ERRORS = REGISTRY.register(Counter(
+    'yt_germanizer_external_request_errors_total', "Failed calls to external services",
+    ['service']))
+
+# Caches
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'yt_germanizer_cache_requests_total', "Cache lookups by cache and result (hit or miss)",
+    ['cache', 'result']))
+
+@contextmanager
+def external_call(service: str) -> Iterator[None]:
+    """
+    Time a call to an external service and count it as an error if it raises.
+
+    Args:
+        service (str): Service name (e.g. 'assemblyai', 'google_translate', 'youtube')
+    """
+    with EXTERNAL_SECONDS.time(service=service):
+        try:
+            yield
+        except JobCancelled:
+            raise
+        except Exception:
+            EXTERNAL_ERRORS.inc(service=service)
+            raise
+
+def track_jobs(function: Callable) -> Callable:
+    """
+    Decorate a pipeline entry point to count in-flight and finished runs and their duration.
+
+    Args:
+        function (Callable): Pipeline function
+
+    Returns:
+        Callable: Wrapped function with the same signature
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        JOBS_IN_FLIGHT.inc()
+        status = 'failed'
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            status = 'completed'
+            return result
+        except JobCancelled:
+            status = 'cancelled'
+            raise
+        finally:
+            JOBS_IN_FLIGHT.dec()
+            JOBS_TOTAL.inc(status=status)
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage='job')
+    return wrapper
+
+def add_file_bytes(kind: str, path: str):
+    """Count the size of a file as processed bytes, ignoring missing files."""
+    try:
+        BYTES_PROCESSED.inc(os.path.getsize(path), kind=kind)
+    except OSError:
+        pass
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry at /metrics."""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404, "Not found")
+            return
+        send_metrics(self)
+
+    def log_message(self, format: str, *args):
+        logging.getLogger('yt_germanizer').debug(f"Metrics server: {format % args}")
+
+def send_metrics(handler: BaseHTTPRequestHandler, registry: Registry = REGISTRY):
+    """
+    Write the registry as an HTTP response from any request handler.
+
+    Args:
+        handler (BaseHTTPRequestHandler): Handler of the current request
+        registry (Registry): Metrics to send
+    """
+    body = registry.render().encode('utf-8')
+    handler.send_response(200)
+    handler.send_header('Content-Type', CONTENT_TYPE)
+    handler.send_header('Content-Length', str(len(body)))
+    handler.end_headers()
+    handler.wfile.write(body)
+
+def start_metrics_server(host: str, port: int) -> ThreadingHTTPServer:
+    """
+    Start a background HTTP server that only exposes /metrics.
+
+    Args:
+        host (str): Interface to bind
+        port (int): Port to bind (0 picks a free port)
+
+    Returns:
+        ThreadingHTTPServer: The running server
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logging.getLogger('yt_germanizer').info(f"Serving metrics on port {server.server_address[1]}")
+    return server
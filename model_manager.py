@@ -0,0 +1,247 @@
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from src import metrics
+
+def estimate_model_bytes(model: Any) -> int:
+    """
+    Estimate the memory held by a model from its torch parameters and buffers.
+
+    Args:
+        model (Any): Loaded model object
+
+    Returns:
+        int: Estimated size in bytes (0 if it cannot be determined)
+    """
+    total = 0
+    for attr in ('parameters', 'buffers'):
+        tensors = getattr(model, attr, None)
+        if not callable(tensors):
+            continue
+        try:
+            total += sum(t.numel() * t.element_size() for t in tensors())
+        except Exception:
+            pass
+    return total
+
+def _release_accelerator_memory():
+    """Return cached GPU memory to the driver if torch is already loaded."""
+    import sys
+    torch = sys.modules.get('torch')
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+class ModelManager:
+    """
+    Keeps an LRU of loaded models under a memory budget and unloads idle ones.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], memory_budget_mb: float = 0,
+                 idle_timeout: float = 0, size_estimator: Callable[[Any], int] = estimate_model_bytes,
+                 cache_name: str = 'model'):
+        """
+        Initialize the model manager.
+
+        Args:
+            loader (Callable[[str], Any]): Function that loads a model by name
+            memory_budget_mb (float): Maximum total size of loaded models in MB (0 disables)
+            idle_timeout (float): Seconds after last use before a model is unloaded (0 disables)
+            size_estimator (Callable[[Any], int]): Function returning a model's size in bytes
+            cache_name (str): Name of this cache in the metrics
+        """
+        self.loader = loader
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.idle_timeout = idle_timeout
+        self.size_estimator = size_estimator
+        self.cache_name = cache_name
+        self.logger = logging.getLogger('yt_germanizer')
+
+        self._models: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.RLock()
+        self._loading: Dict[str, threading.Event] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self.counters = {'loads': 0, 'unloads': 0, 'hits': 0, 'preloads': 0}
+
+    def get(self, name: str) -> Any:
+        """
+        Return a loaded model, loading it (and evicting others) if needed.
+
+        Args:
+            name (str): Model name
+
+        Returns:
+            Any: Loaded model
+        """
+        while True:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry is not None:
+                    self._models.move_to_end(name)
+                    entry['last_used'] = time.monotonic()
+                    self.counters['hits'] += 1
+                    metrics.CACHE_REQUESTS.inc(cache=self.cache_name, result='hit')
+                    return entry['model']
+                pending = self._loading.get(name)
+                if pending is None:
+                    pending = self._loading[name] = threading.Event()
+                    break
+            # Another thread is loading this model; wait and retry
+            pending.wait()
+
+        metrics.CACHE_REQUESTS.inc(cache=self.cache_name, result='miss')
+        try:
+            self.logger.info(f"Loading model {name}...")
+            model = self.loader(name)
+            size = self.size_estimator(model)
+            with self._lock:
+                self._models[name] = {
+                    'model': model,
+                    'size': size,
+                    'last_used': time.monotonic(),
+                    'in_use': 0,
+                    'lock': threading.Lock()  # TTS models keep per-call state, so one caller at a time
+                }
+                self.counters['loads'] += 1
+                self._enforce_budget(keep=name)
+            self._start_reaper()
+            return model
+        finally:
+            with self._lock:
+                self._loading.pop(name).set()
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        """
+        Borrow a model, protecting it from eviction while it is in use.
+
+        Callers of the same model take turns: the model is held exclusively
+        until the block exits (waiting callers also keep it from being evicted).
+
+        Args:
+            name (str): Model name
+
+        Yields:
+            Any: Loaded model
+        """
+        while True:
+            model = self.get(name)
+            with self._lock:
+                entry = self._models.get(name)
+                # Retry if the model was evicted between loading and pinning it
+                if entry is not None and entry['model'] is model:
+                    entry['in_use'] += 1
+                    break
+        try:
+            with entry['lock']:
+                yield model
+        finally:
+            with self._lock:
+                entry['in_use'] -= 1
+                entry['last_used'] = time.monotonic()
+
+    def preload(self, name: str) -> threading.Thread:
+        """
+        Load a model in a background thread so it is warm when a job needs it.
+
+        Args:
+            name (str): Model name
+
+        Returns:
+            threading.Thread: The loader thread
+        """
+        with self._lock:
+            self.counters['preloads'] += 1
+
+        def _preload():
+            try:
+                self.get(name)
+            except Exception as e:
+                self.logger.error(f"Error preloading model {name}: {str(e)}")
+
+        thread = threading.Thread(target=_preload, name=f"preload-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, name: str) -> bool:
+        """
+        Unload a model if it is loaded and not in use.
+
+        Args:
+            name (str): Model name
+
+        Returns:
+            bool: True if the model was unloaded
+        """
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None or entry['in_use']:
+                return False
+            del self._models[name]
+            self.counters['unloads'] += 1
+        self.logger.info(f"Unloaded model {name}")
+        del entry
+        gc.collect()
+        _release_accelerator_memory()
+        return True
+
+    def unload_idle(self) -> int:
+        """
+        Unload every model that has not been used within the idle timeout.
+
+        Returns:
+            int: Number of models unloaded
+        """
+        if not self.idle_timeout:
+            return 0
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [name for name, entry in self._models.items()
+                    if entry['last_used'] < cutoff and not entry['in_use']]
+        return sum(self.unload(name) for name in idle)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get load/unload counters and the currently loaded models.
+
+        Returns:
+            Dict[str, Any]: Counters, loaded model names and their total size in bytes
+        """
+        with self._lock:
+            return {
+                **self.counters,
+                'loaded': list(self._models),
+                'loaded_bytes': sum(entry['size'] for entry in self._models.values())
+            }
+
+    def _enforce_budget(self, keep: str):
+        """Evict least recently used models until the budget is respected."""
+        if not self.memory_budget:
+            return
+        for name in list(self._models):
+            total = sum(entry['size'] for entry in self._models.values())
+            if total <= self.memory_budget:
+                break
+            if name != keep and not self._models[name]['in_use']:
+                self.unload(name)
+
+    def _start_reaper(self):
+        """Start the background thread that unloads idle models."""
+        def _reap():
+            while True:
+                time.sleep(max(self.idle_timeout / 4, 1))
+                self.unload_idle()
+                with self._lock:
+                    if not self._models:
+                        self._reaper = None
+                        return
+
+        with self._lock:
+            if not self.idle_timeout or self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=_reap, name="model-reaper", daemon=True)
+            self._reaper.start()
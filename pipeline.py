@@ -0,0 +1,517 @@
+import os
+import inspect
+import logging
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.cancellation import CancellationToken, check_cancelled, run_process
+from src.utils import clean_filename, get_video_id, link_or_copy, translate_segments
+from src.subtitles import write_subtitles
+from src.single_flight import SingleFlight
+from src.eta import JobEstimate
+from src.segments import SegmentTable
+from src import metrics
+from src.workspace import JobWorkspace, cleanup_stale_workspaces, enforce_disk_budget, output_lock, publish_outputs
+from src import config
+
+# Stage modules pull in yt_dlp, assemblyai, torch/Coqui TTS, pydub and moviepy,
+# so they are imported only when the stage that needs them runs.
+STAGE_MODULES = [
+    'src.audio_processing',
+    'src.transcription',
+    'src.tts_generation',
+    'src.video_sync',
+]
+
+# Pipeline stages in execution order with their share of the overall progress
+STAGES = [
+    ('download', 0.1),
+    ('transcribe', 0.2),
+    ('translate', 0.1),
+    ('tts', 0.4),
+    ('sync', 0.2),
+]
+
+ProgressCallback = Callable[[str, float, str], None]
+
+# Coalesces concurrent download/transcription/translation of the same source
+source_flights = SingleFlight()
+
+# Runner arguments that don't change what a job produces
+_NON_KEY_PARAMS = ('api_key', 'progress_callback', 'cancel_token', 'estimate')
+
+# Stages run by prepare_source, whose time is not representative when shared
+SOURCE_STAGES = ('download', 'transcribe', 'translate')
+
+def import_stages():
+    """Import every stage module up front (used by long-running services and benchmarks)."""
+    import importlib
+    for module in STAGE_MODULES:
+        importlib.import_module(module)
+
+def source_key(video_url: str) -> str:
+    """
+    Identify a video source independent of URL form.
+    
+    Args:
+        video_url (str): YouTube URL or local file path
+    
+    Returns:
+        str: Resolved file path or YouTube video ID
+    """
+    if os.path.isfile(video_url):
+        return str(Path(video_url).resolve())
+    try:
+        return get_video_id(video_url)
+    except ValueError:
+        return video_url
+
+def job_key(params: Dict) -> Hashable:
+    """
+    Build the identity of a job from its runner params, for coalescing duplicates.
+    
+    Two submissions get the same key when they refer to the same video and
+    resolve to the same settings once defaults are applied.
+    
+    Args:
+        params (Dict): Keyword arguments for run_pipeline
+    
+    Returns:
+        Hashable: Job key
+    """
+    params = {key: value for key, value in params.items() if key not in _NON_KEY_PARAMS}
+    try:
+        bound = inspect.signature(run_pipeline).bind_partial(**params)
+        bound.apply_defaults()
+        params = {key: value for key, value in bound.arguments.items() if key not in _NON_KEY_PARAMS}
+    except TypeError:
+        pass
+    if 'video_url' in params:
+        params['video_url'] = source_key(params['video_url'])
+    return tuple(sorted((key, repr(value)) for key, value in params.items()))
+
+def stage_progress(stage: str, fraction: float) -> float:
+    """
+    Convert progress within a stage to overall pipeline progress.
+    
+    Args:
+        stage (str): Stage name from STAGES
+        fraction (float): Progress within the stage (0.0 - 1.0)
+    
+    Returns:
+        float: Overall progress (0.0 - 1.0)
+    """
+    done = 0.0
+    for name, weight in STAGES:
+        if name == stage:
+            return done + weight * min(max(fraction, 0.0), 1.0)
+        done += weight
+    return done
+
+def transcribe_spans(transcribe: Callable[..., SegmentTable], api_key: str, audio_path: str,
+                     spans: List[Tuple[float, float]], work_dir: str,
+                     cancel_token: Optional[CancellationToken] = None) -> SegmentTable:
+    """
+    Transcribe parts of an audio file.
+    
+    Args:
+        transcribe (Callable[..., SegmentTable]): Transcriber, called as transcribe(api_key, path, cancel_token=...)
+        api_key (str): AssemblyAI API key
+        audio_path (str): Source audio
+        spans (List[Tuple[float, float]]): (start, end) of each part in milliseconds
+        work_dir (str): Directory for the cut audio
+        cancel_token (Optional[CancellationToken]): Token checked by ffmpeg and the transcriber
+    
+    Returns:
+        SegmentTable: Segments of all parts, with times in the source audio
+    """
+    segments = []
+    for index, (start_ms, end_ms) in enumerate(spans):
+        span_path = os.path.join(work_dir, f"span_{index}.wav")
+        process = run_process(['ffmpeg', '-y', '-ss', f"{start_ms / 1000:.3f}", '-to', f"{end_ms / 1000:.3f}",
+                               '-i', audio_path, '-ac', '1', '-ar', '16000', span_path], cancel_token)
+        if process.returncode != 0:
+            raise Exception(f"FFmpeg error: {process.stderr}")
+        segments += transcribe(api_key, span_path, cancel_token=cancel_token).shifted(int(round(start_ms))).to_dicts()
+    return SegmentTable.from_dicts(segments)
+
+def merge_segments(first: SegmentTable, second: SegmentTable) -> SegmentTable:
+    """
+    Combine two segment tables on the same timeline.
+    
+    Args:
+        first (SegmentTable): Segments
+        second (SegmentTable): More segments
+    
+    Returns:
+        SegmentTable: All segments, ordered by start time
+    """
+    if not len(second):
+        return first
+    return SegmentTable.from_dicts(first.to_dicts() + second.to_dicts()).sorted_by_start()
+
+@metrics.track_jobs
+def run_pipeline(video_url: str, api_key: str, audio_quality: str = '192',
+                 progress_callback: Optional[ProgressCallback] = None,
+                 cancel_token: Optional[CancellationToken] = None,
+                 subtitles: bool = config.SUBTITLES_ENABLED,
+                 original_subtitles: bool = config.ORIGINAL_SUBTITLES,
+                 keep_original_audio: bool = config.KEEP_ORIGINAL_AUDIO,
+                 mix_mode: str = config.MIX_MODE,
+                 estimate: Optional[JobEstimate] = None,
+                 progressive: bool = config.PROGRESSIVE_OUTPUT,
+                 transcriber: Optional[Callable[..., SegmentTable]] = None,
+                 translator: Optional[Callable[..., SegmentTable]] = None) -> str:
+    """
+    Run the full germanization pipeline for one YouTube video or local video file.
+    
+    Args:
+        video_url (str): YouTube video URL, or path to a local video file
+        api_key (str): AssemblyAI API key
+        audio_quality (str): Audio quality in kbps (default: '192')
+        progress_callback (Optional[ProgressCallback]): Called with (stage, fraction, message)
+            as each stage advances
+        cancel_token (Optional[CancellationToken]): Token checked inside every stage
+        subtitles (bool): Mux German soft subtitles into the output
+        original_subtitles (bool): Also mux the original-language transcript as subtitles
+        keep_original_audio (bool): Keep the original audio as a second audio track
+        mix_mode (str): 'duck' keeps the original music and effects under the dub, 'replace' drops them
+        estimate (Optional[JobEstimate]): Run time estimate to update as the job advances;
+            the measured stage times are added to the run history when the job completes
+        progressive (bool): Also write the dub as an HLS stream (<output dir>/jobs/<job>/hls/index.m3u8)
+            that grows while TTS runs, published to <output dir>/hls when the job succeeds
+        transcriber (Optional[Callable[..., SegmentTable]]): Called as transcriber(api_key, audio_path,
+            cancel_token=...) instead of the AssemblyAI backend (e.g. a stand-in for tests)
+        translator (Optional[Callable[..., SegmentTable]]): Called as translator(segments,
+            cancel_token=...) instead of Google Translate
+    
+    Returns:
+        str: Path to the germanized video
+    
+    Raises:
+        JobCancelled: If the job is cancelled
+    """
+    logger = logging.getLogger('yt_germanizer')
+    estimate = estimate or JobEstimate()
+    
+    def report(stage: str, fraction: float, message: str):
+        check_cancelled(cancel_token)
+        estimate.update(stage, fraction)
+        if progress_callback:
+            progress_callback(stage, fraction, message)
+    
+    from src.tts_generation import preload_tts_model
+    
+    is_local = os.path.isfile(video_url)
+    video_id = clean_filename(Path(video_url).stem) if is_local else get_video_id(video_url)
+    logger.info(f"Processing video ID: {video_id}")
+    config.ensure_directories()
+    
+    # Warm up the TTS model while download and transcription run
+    preload_tts_model()
+    
+    # Free disk space before the job adds to it
+    cleanup_stale_workspaces()
+    enforce_disk_budget()
+    
+    # Create output directory for this video
+    video_output_dir = config.OUTPUT_DIR / clean_filename(video_id)
+    
+    # With a video-only download profile the source audio doubles as the original audio track
+    from src.audio_processing import acquisition_profile
+    from src.video_sync import VideoPrefetch, sync_audio_with_video
+    use_source_audio = not is_local and acquisition_profile()['video_only']
+    
+    # Intermediates live in a private workspace that is removed however the job ends;
+    # the video downloads in the background until the mux needs it
+    protect = [video_output_dir] + ([Path(video_url)] if is_local else [])
+    with JobWorkspace(clean_filename(video_id), protect=protect,
+                      keep=config.KEEP_WORKSPACES) as workspace, \
+            VideoPrefetch(video_url, str(workspace.input_dir), cancel_token=cancel_token,
+                          with_audio=not use_source_audio) as prefetch:
+        os.makedirs(video_output_dir, exist_ok=True)
+        # Outputs are written privately and published when the job succeeds, so concurrent
+        # jobs for the same video never overwrite or delete each other's files
+        job_output_dir = workspace.staging_dir(video_output_dir)
+        
+        def prepare_source():
+            """Download, transcribe and translate; shared by concurrent jobs for the same source."""
+            # Step 1: Download audio from YouTube video (or extract it from a local file)
+            report('download', 0.0, "Downloading audio from YouTube...")
+            from src.audio_processing import download_audio, extract_audio
+            logger.info("Downloading audio from YouTube...")
+            with metrics.STAGE_SECONDS.time(stage='download'):
+                audio_path = (extract_audio if is_local else download_audio)(
+                    video_url,
+                    output_dir=str(workspace.input_dir),
+                    quality=audio_quality,
+                    cancel_token=cancel_token
+                )
+            logger.info(f"Audio downloaded successfully to: {audio_path}")
+            from src.media_probe import get_duration
+            estimate.set_sizes(audio_minutes=get_duration(audio_path, cancel_token=cancel_token) / 60)
+            
+            # Re-uploads and mirrors of already processed audio reuse its results
+            fingerprint, match = None, None
+            if config.DEDUP_ENABLED:
+                from src.fingerprint import lookup
+                fingerprint, match = lookup(audio_path, cancel_token=cancel_token)
+            report('download', 1.0, f"Audio downloaded for video ID: {video_id}")
+            
+            transcribe, translate = transcriber, translator or translate_segments
+            if transcribe is None:
+                from src.transcription import transcribe_audio as transcribe
+            if match is not None and match.full:
+                transcription, translated_segments = match.reuse_segments()
+                logger.info(f"Reused transcription and translation of fingerprint source {match.source_id}")
+                gaps = match.uncovered_spans()
+                if gaps:
+                    # Material the source doesn't have (e.g. a new intro) is transcribed on its own
+                    report('transcribe', 0.0, f"Transcribing {len(gaps)} parts not in the matched source...")
+                    logger.info(f"Transcribing {', '.join(f'{start / 1000:.1f}-{end / 1000:.1f} s' for start, end in gaps)}"
+                                f" not covered by fingerprint source {match.source_id}")
+                    # A short part may hold no speech at all
+                    transcribe_part = transcribe if transcriber else partial(transcribe, allow_empty=True)
+                    new_transcription = transcribe_spans(transcribe_part, api_key, audio_path, gaps,
+                                                         str(workspace.input_dir), cancel_token=cancel_token)
+                    report('translate', 0.0, f"Translating {len(new_transcription)} new segments...")
+                    new_translation = (translate(new_transcription, cancel_token=cancel_token)
+                                       if len(new_transcription) else new_transcription)
+                    transcription = merge_segments(transcription, new_transcription)
+                    translated_segments = merge_segments(translated_segments, new_translation)
+                report('transcribe', 1.0, f"Reused {len(transcription)} transcribed segments")
+                report('translate', 1.0, f"Reused {len(translated_segments)} translated segments")
+                return transcription, translated_segments, fingerprint, match, audio_path
+            
+            # Step 2: Transcribe audio with AssemblyAI
+            report('transcribe', 0.0, "Transcribing audio with speaker diarization...")
+            logger.info("Transcribing audio with speaker diarization...")
+            with metrics.STAGE_SECONDS.time(stage='transcribe'):
+                # Only upload audio that may contain speech; times are mapped back afterwards
+                asr_path, offsets = audio_path, None
+                if config.VAD_ENABLED:
+                    from src.vad import trim_non_speech
+                    asr_path, offsets = trim_non_speech(audio_path, str(workspace.input_dir), cancel_token=cancel_token)
+                transcription = transcribe(api_key, asr_path, cancel_token=cancel_token)
+                if offsets is not None:
+                    transcription = offsets.remap(transcription)
+            logger.info(f"Transcription completed: {len(transcription)} segments")
+            
+            # Log speaker information
+            speakers = set(segment['speaker'] for segment in transcription)
+            logger.info(f"Detected {len(speakers)} speakers: {', '.join(speakers)}")
+            report('transcribe', 1.0, f"Transcribed {len(transcription)} segments from {len(speakers)} speakers")
+            
+            # Step 3: Translate transcription to German
+            report('translate', 0.0, "Translating transcription to German...")
+            logger.info("Translating transcription to German...")
+            with metrics.STAGE_SECONDS.time(stage='translate'):
+                translated_segments = translate(transcription, cancel_token=cancel_token)
+            logger.info(f"Translation completed: {len(translated_segments)} segments")
+            report('translate', 1.0, f"Translated {len(translated_segments)} segments")
+            return transcription, translated_segments, fingerprint, match, audio_path
+        
+        # Steps 1-3 depend only on the source and audio quality, so jobs that
+        # differ only in TTS or output settings share one in-flight run
+        (transcription, translated_segments, fingerprint, match, audio_path), shared = source_flights.do(
+            (source_key(video_url), audio_quality),
+            prepare_source,
+            cancel_token=cancel_token,
+            on_wait=lambda: report('download', 0.0, "Waiting for another job processing the same video...")
+        )
+        metrics.CACHE_REQUESTS.inc(cache='source_stages', result='hit' if shared else 'miss')
+        if shared:
+            logger.info(f"Reused transcription and translation from a concurrent job for {video_id}")
+            report('translate', 1.0, f"Translated {len(translated_segments)} segments (shared)")
+        
+        # A shared download lives in the other job's workspace, so take a link to it first
+        original_audio = None
+        if use_source_audio:
+            try:
+                original_audio = (link_or_copy(audio_path, str(workspace.input_dir / os.path.basename(audio_path)))
+                                  if shared else audio_path)
+            except OSError:
+                # Only the audio is missing; the video stream is still fetched separately at mux time
+                logger.info("Shared source audio is gone; downloading it again for the mix")
+                from src.audio_processing import download_audio
+                original_audio = download_audio(video_url, output_dir=str(workspace.input_dir),
+                                                quality=audio_quality, cancel_token=cancel_token)
+        estimate.set_sizes(
+            audio_minutes=None if estimate.audio_minutes else int(transcription.end.max(initial=0)) / 60000,
+            segments=len(translated_segments),
+            characters=int(translated_segments.text_lengths().sum())
+        )
+        
+        # Keep the segments next to the output (compact .npz checkpoints)
+        transcription.save(str(job_output_dir / f"{video_id}_{config.ASSEMBLYAI_LANGUAGE_CODE}.npz"))
+        translated_segments.save(str(job_output_dir / f"{video_id}_de.npz"))
+        
+        # Write subtitle files (SRT for muxing, WebVTT for web players)
+        subtitle_tracks = []
+        if subtitles:
+            paths = write_subtitles(translated_segments, str(job_output_dir), f"{video_id}_de")
+            subtitle_tracks.append({'path': paths['srt'], 'vtt_path': paths['vtt'], 'language': 'ger', 'title': 'Deutsch'})
+        if original_subtitles:
+            paths = write_subtitles(transcription, str(job_output_dir), f"{video_id}_{config.ASSEMBLYAI_LANGUAGE_CODE}")
+            subtitle_tracks.append({
+                'path': paths['srt'],
+                'vtt_path': paths['vtt'],
+                'language': config.SOURCE_LANGUAGE_ISO639_2,
+                'title': 'Original'
+            })
+        
+        # Step 4: Generate German TTS for each segment
+        report('tts', 0.0, "Generating German speech...")
+        logger.info("Generating German TTS...")
+        if config.WORK_QUEUE_PATH:
+            # Worker nodes write into a shared directory; the mix still happens here
+            tts_dir = workspace.add_directory(config.SHARED_DIR / 'tts' / workspace.name)
+        else:
+            tts_dir = workspace.tts_dir
+        cached_audio = {}
+        if match is not None:
+            from src.fingerprint import dedup_clip_dir
+            workspace.protect_path(dedup_clip_dir(match.source_id))
+            cached_audio = match.reusable_clips(translated_segments)
+            logger.info(f"Reusing {len(cached_audio)} of {len(translated_segments)} TTS clips from source {match.source_id}")
+        video, stream = None, None
+        if progressive:
+            # Fragments need the video while TTS runs, so wait for the download first
+            from src.progressive import ProgressiveOutput
+            video = prefetch.result()
+            stream = ProgressiveOutput(video[0], str(job_output_dir / 'hls'), translated_segments,
+                                       str(workspace.input_dir), mix_mode=mix_mode,
+                                       cancel_token=cancel_token, original_audio=original_audio).start()
+        try:
+            tts_segments = synthesize_segments(translated_segments, report, str(tts_dir), cancel_token=cancel_token,
+                                               cached_audio=cached_audio,
+                                               on_segment=stream.segment_ready if stream else None)
+            logger.info(f"TTS generation completed: {len(tts_segments)} segments")
+            if stream:
+                stream.finish(tts_segments)
+            
+            # Step 5: Synchronize TTS with video
+            report('sync', 0.0, "Synchronizing German audio with video...")
+            from src.rerender import render_dir, save_render_state
+            logger.info("Synchronizing TTS with video...")
+            state_dir = str(render_dir(job_output_dir)) if config.RENDER_STATE_ENABLED else None
+            if not prefetch.done:
+                report('sync', 0.0, "Waiting for the video download...")
+            video = prefetch.result()
+            output_path = sync_audio_with_video(
+                video_url=video_url,
+                tts_segments=tts_segments,
+                output_dir=str(job_output_dir),
+                work_dir=str(workspace.input_dir),
+                cancel_token=cancel_token,
+                subtitle_tracks=subtitle_tracks,
+                keep_original_audio=keep_original_audio,
+                mix_mode=mix_mode,
+                render_dir=state_dir,
+                video=video,
+                original_audio=original_audio
+            )
+        finally:
+            # Let the stream write its last fragments (or stop it if the job failed)
+            if stream and stream.close() is None and stream.error is None:
+                logger.warning("Progressive output is incomplete")
+        # The render state refers to the outputs where they are published
+        def published(path: str) -> str:
+            return str(video_output_dir / Path(path).relative_to(job_output_dir))
+        
+        output_path = published(output_path)
+        for track in subtitle_tracks:
+            track['path'], track['vtt_path'] = published(track['path']), published(track['vtt_path'])
+        if state_dir:
+            # Keep the clips so edited segments can be re-rendered without a full run
+            save_render_state(state_dir, video_id, output_path, tts_segments, subtitle_tracks,
+                              keep_original_audio, mix_mode)
+        # Jobs sharing the source stages may finish together with other settings;
+        # the last one to publish wins, but never with a mix of both jobs' files
+        with output_lock(video_output_dir):
+            publish_outputs(job_output_dir, video_output_dir)
+        report('sync', 1.0, "German audio merged with video")
+        
+        # Index new audio while its clips still exist (a concurrent job sharing the source indexes it)
+        reused_source = match is not None and match.full
+        if fingerprint is not None and not shared and not reused_source:
+            from src.fingerprint import register
+            register(source_key(video_url), fingerprint, transcription, tts_segments)
+    
+    # Reused or shared stages did not run at their normal speed
+    excluded = set(SOURCE_STAGES if shared else ())
+    if reused_source:
+        excluded.update(('transcribe', 'translate'))
+    if cached_audio:
+        excluded.add('tts')
+    estimate.record(exclude=excluded)
+    enforce_disk_budget()
+    logger.info(f"Video processing completed! Output saved to: {output_path}")
+    return output_path
+
+def synthesize_segments(translated_segments: SegmentTable, report: ProgressCallback, output_dir: str,
+                        cancel_token: Optional[CancellationToken] = None,
+                        cached_audio: Optional[Dict[int, str]] = None,
+                        on_segment: Optional[Callable[[int, str], None]] = None) -> SegmentTable:
+    """
+    Generate TTS audio for every translated segment.
+    
+    With WORK_QUEUE_PATH set, the segments are split into batches that
+    worker nodes lease from the shared queue (see distributed.py).
+    
+    Args:
+        translated_segments (SegmentTable): Segments with 'text', 'start', 'end' and 'speaker'
+        report (ProgressCallback): Progress callback for the 'tts' stage
+        output_dir (str): Directory for the segment audio files
+        cancel_token (Optional[CancellationToken]): Token checked between segments
+        cached_audio (Optional[Dict[int, str]]): Existing clips by row, used instead of synthesizing
+        on_segment (Optional[Callable[[int, str], None]]): Called with (row, audio path) as each
+            segment's audio becomes available (after all batches in distributed mode)
+    
+    Returns:
+        SegmentTable: The segments with an 'audio_path' column added
+    """
+    cached_audio = cached_audio or {}
+    if config.WORK_QUEUE_PATH:
+        from src.distributed import get_work_queue, synthesize_distributed
+        missing = [row for row in range(len(translated_segments)) if row not in cached_audio]
+        paths = [cached_audio.get(row) for row in range(len(translated_segments))]
+        if missing:
+            generated = synthesize_distributed(get_work_queue(), translated_segments.select(missing), output_dir,
+                                               report, cancel_token=cancel_token)
+            for row, path in zip(missing, generated):
+                paths[row] = path
+        if on_segment:
+            for row, path in enumerate(paths):
+                on_segment(row, path)
+        return translated_segments.with_audio_paths(paths)
+    
+    from src.tts_generation import generate_tts
+    
+    logger = logging.getLogger('yt_germanizer')
+    paths = []
+    current_speaker = None
+    total = len(translated_segments)
+    
+    for i, segment in enumerate(translated_segments):
+        check_cancelled(cancel_token)
+        
+        # Check if speaker changed to adjust voice
+        if segment['speaker'] != current_speaker:
+            current_speaker = segment['speaker']
+            logger.info(f"Switching to voice for speaker {current_speaker}")
+        
+        # Generate TTS for each segment (unless a matched source already has the clip)
+        tts_path = cached_audio.get(i) or generate_tts(
+            text=segment['text'],
+            output_dir=output_dir,
+            start_time=segment['start'],
+            speaker=segment['speaker']  # Pass speaker info to TTS generator
+        )
+        paths.append(tts_path)
+        if on_segment:
+            on_segment(i, tts_path)
+        report('tts', (i + 1) / total, f"Generated speech for segment {i + 1}/{total}")
+    
+    return translated_segments.with_audio_paths(paths)
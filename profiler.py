@@ -0,0 +1,275 @@
+import os
+import sys
+import zlib
+import logging
+import threading
+from collections import Counter, defaultdict
+from html import escape
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src import config
+
+# Innermost matching function on a sampled stack decides the stage it is charged to
+STAGE_FUNCTIONS = {
+    'download_audio': 'download',
+    'extract_audio': 'download',
+    'transcribe_audio': 'transcribe',
+    'translate_segments': 'translate',
+    'synthesize_segments': 'tts',
+    'synthesize_distributed': 'tts',
+    'generate_tts': 'tts',
+    'run_tts_batch': 'tts',
+    'sync_audio_with_video': 'sync',
+    'mix_soundtrack': 'mix',
+    'write_subtitles': 'subtitles',
+}
+
+# Segment currently synthesized per thread, set by the TTS stage
+_segments: Dict[int, str] = {}
+
+def set_segment(segment: Optional[str]):
+    """
+    Label the calling thread's samples with a segment (None clears it).
+
+    Args:
+        segment (Optional[str]): Segment label, e.g. the segment start time
+    """
+    if segment is None:
+        _segments.pop(threading.get_ident(), None)
+    else:
+        _segments[threading.get_ident()] = segment
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for pipeline runs.
+
+    A background thread periodically captures the stacks of the target
+    threads with sys._current_frames() and charges each sample to a pipeline
+    stage (see STAGE_FUNCTIONS) and, during TTS, to the current segment.
+    Profiled code is not instrumented, so the overhead is one stack walk
+    per sample.
+    """
+
+    def __init__(self, thread_ids: Optional[Iterable[int]] = None, interval: float = config.PROFILE_INTERVAL):
+        """
+        Initialize the profiler.
+
+        Args:
+            thread_ids (Optional[Iterable[int]]): Threads to sample (default: the creating thread)
+            interval (float): Seconds between samples
+        """
+        self.thread_ids = set(thread_ids or [threading.get_ident()])
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for thread_id in self.thread_ids:
+            frame = frames.get(thread_id)
+            if frame is None:
+                continue
+            stack = []
+            stage = None
+            while frame is not None:
+                code = frame.f_code
+                label = self._labels.get(code)
+                if label is None:
+                    label = self._labels[code] = _frame_label(code)
+                stack.append(label)
+                if stage is None and code.co_name in STAGE_FUNCTIONS:
+                    stage = STAGE_FUNCTIONS[code.co_name]
+                frame = frame.f_back
+            stack.reverse()
+            stage = stage or 'other'
+            segment = _segments.get(thread_id) if stage == 'tts' else None
+            self.samples[(stage, segment, tuple(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> 'SamplingProfiler':
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'SamplingProfiler':
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def collapsed(self, stage: Optional[str] = None) -> List[str]:
+        """
+        Get the samples in collapsed-stack format ("frame;frame;frame count").
+
+        The stage (and segment, for TTS) is the root frame, so one flame
+        graph shows the split between stages.
+
+        Args:
+            stage (Optional[str]): Only include this stage
+
+        Returns:
+            List[str]: Collapsed stack lines
+        """
+        stacks: Counter = Counter()
+        for (sample_stage, segment, stack), count in self.samples.items():
+            if stage is not None and sample_stage != stage:
+                continue
+            root = [f"[{sample_stage}]"] + ([f"[segment {segment}]"] if segment is not None else [])
+            stacks[';'.join(root + list(stack))] += count
+        return [f"{stack} {count}" for stack, count in sorted(stacks.items())]
+
+    def hotspots(self, top: int = 20) -> str:
+        """
+        Build a per-stage report of the functions with the most samples.
+
+        Args:
+            top (int): Functions listed per stage
+
+        Returns:
+            str: Plain-text report
+        """
+        by_stage: Dict[str, Counter] = defaultdict(Counter)
+        self_time: Dict[str, Counter] = defaultdict(Counter)
+        total_time: Dict[str, Counter] = defaultdict(Counter)
+        segments: Counter = Counter()
+        for (stage, segment, stack), count in self.samples.items():
+            by_stage[stage]['samples'] += count
+            if stack:
+                self_time[stage][stack[-1]] += count
+            for label in set(stack):
+                total_time[stage][label] += count
+            if segment is not None:
+                segments[segment] += count
+
+        grand_total = sum(self.samples.values()) or 1
+        lines = [f"Samples: {grand_total} at {self.interval * 1000:.1f} ms "
+                 f"(~{grand_total * self.interval:.1f} s profiled)", ""]
+        for stage, counter in sorted(by_stage.items(), key=lambda item: -item[1]['samples']):
+            stage_total = counter['samples']
+            lines.append(f"== {stage}: {stage_total} samples ({100 * stage_total / grand_total:.1f}%) ==")
+            lines.append("  self time:")
+            for label, count in self_time[stage].most_common(top):
+                lines.append(f"    {100 * count / stage_total:6.1f}%  {label}")
+            lines.append("  total time:")
+            for label, count in total_time[stage].most_common(top):
+                lines.append(f"    {100 * count / stage_total:6.1f}%  {label}")
+            lines.append("")
+        if segments:
+            lines.append("== slowest TTS segments ==")
+            for segment, count in segments.most_common(top):
+                lines.append(f"    {count * self.interval:8.2f} s  segment {segment}")
+        return '\n'.join(lines) + '\n'
+
+    def write_report(self, output_dir: str, top: int = config.PROFILE_TOP) -> Dict[str, str]:
+        """
+        Write collapsed stacks (all and per stage), an SVG flame graph and the hotspot report.
+
+        Args:
+            output_dir (str): Directory for the report files
+            top (int): Functions listed per stage in the hotspot report
+
+        Returns:
+            Dict[str, str]: Written file paths keyed by report name
+        """
+        directory = Path(output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = {}
+
+        collapsed = self.collapsed()
+        paths['collapsed'] = str(directory / 'all.collapsed')
+        Path(paths['collapsed']).write_text('\n'.join(collapsed) + '\n')
+        for stage in sorted({stage for stage, _, _ in self.samples}):
+            path = directory / f"{stage}.collapsed"
+            path.write_text('\n'.join(self.collapsed(stage)) + '\n')
+            paths[f"collapsed_{stage}"] = str(path)
+
+        paths['flamegraph'] = str(directory / 'flamegraph.svg')
+        Path(paths['flamegraph']).write_text(render_flamegraph(collapsed))
+        paths['hotspots'] = str(directory / 'hotspots.txt')
+        Path(paths['hotspots']).write_text(self.hotspots(top))
+
+        logging.getLogger('yt_germanizer').info(f"Profile written to {directory}")
+        return paths
+
+def render_flamegraph(collapsed: List[str], width: int = 1200, row_height: int = 16) -> str:
+    """
+    Render collapsed stacks as a static SVG flame graph.
+
+    Args:
+        collapsed (List[str]): Lines in "frame;frame count" format
+        width (int): Image width in pixels
+        row_height (int): Height of one stack level in pixels
+
+    Returns:
+        str: SVG document
+    """
+    # Merge the stacks into a tree: name -> [count, children]
+    root: List = [0, {}]
+    for line in collapsed:
+        stack, _, count = line.rpartition(' ')
+        if not stack:
+            continue
+        count = int(count)
+        node = root
+        node[0] += count
+        for name in stack.split(';'):
+            node = node[1].setdefault(name, [0, {}])
+            node[0] += count
+
+    total = root[0] or 1
+    rects: List[Tuple[float, int, float, str, int]] = []
+    max_depth = 0
+
+    def layout(children: Dict, x: float, depth: int):
+        nonlocal max_depth
+        max_depth = max(max_depth, depth)
+        for name, (count, grandchildren) in sorted(children.items()):
+            rect_width = width * count / total
+            if rect_width >= 0.5:
+                rects.append((x, depth, rect_width, name, count))
+                layout(grandchildren, x, depth + 1)
+            x += rect_width
+
+    layout(root[1], 0.0, 0)
+    height = (max_depth + 1) * row_height + 20
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        f'<rect width="{width}" height="{height}" fill="#f8f8f8"/>',
+    ]
+    for x, depth, rect_width, name, count in rects:
+        # Flame graphs grow upwards from the root
+        y = height - (depth + 1) * row_height
+        hue = zlib.crc32(name.encode('utf-8')) % 60
+        title = f"{name} ({count} samples, {100 * count / total:.1f}%)"
+        parts.append(
+            f'<g><title>{escape(title)}</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{rect_width:.1f}" height="{row_height - 1}" '
+            f'fill="hsl({hue},85%,60%)"/>'
+        )
+        max_chars = int(rect_width / 7)
+        if max_chars >= 3:
+            text = name if len(name) <= max_chars else name[:max_chars - 2] + '..'
+            parts.append(f'<text x="{x + 2:.1f}" y="{y + row_height - 4}">{escape(text)}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts) + '\n'
@@ -31,12 +31,14 @@ class ProgressBar:
         self.iteration = 0
         self.start_time = time.time()
     
-    def print(self, iteration: Optional[int] = None):
+    def print(self, iteration: Optional[int] = None, remaining: Optional[float] = None):
         """
         Print progress bar.
         
         Args:
             iteration (int, optional): Current iteration
+            remaining (float, optional): Predicted seconds left (e.g. from eta.JobEstimate);
+                by default extrapolated linearly from the iterations so far
         """
         if iteration is not None:
             self.iteration = iteration
@@ -47,7 +49,9 @@ class ProgressBar:
         
         # Calculate elapsed time and estimated time remaining
         elapsed_time = time.time() - self.start_time
-        if self.iteration > 0:
+        if remaining is not None:
+            time_info = f" | {format_time(elapsed_time)} < {format_time(remaining)}"
+        elif self.iteration > 0:
             eta = elapsed_time * (self.total / self.iteration - 1)
             time_info = f" | {format_time(elapsed_time)} < {format_time(eta)}"
         else:
@@ -0,0 +1,249 @@
+import os
+import math
+import shutil
+import logging
+import threading
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.cancellation import CancellationToken, JobCancelled, check_cancelled, run_process
+from src.segments import SegmentTable
+from src import config
+
+PLAYLIST_NAME = 'index.m3u8'
+
+def fragment_boundaries(keyframes: List[float], duration: float,
+                        fragment_seconds: float = config.PROGRESSIVE_FRAGMENT_SECONDS) -> List[float]:
+    """
+    Split a video into fragments that start on keyframes, so the video can be stream-copied.
+
+    Args:
+        keyframes (List[float]): Keyframe times in seconds
+        duration (float): Video duration in seconds
+        fragment_seconds (float): Target fragment length
+
+    Returns:
+        List[float]: Fragment boundaries from 0 to duration
+    """
+    if not keyframes:
+        # No keyframe information: fixed-length fragments
+        count = max(int(math.ceil(duration / fragment_seconds)), 1)
+        return [min(i * fragment_seconds, duration) for i in range(count)] + [duration]
+    boundaries = [0.0]
+    for keyframe in keyframes:
+        if keyframe - boundaries[-1] >= fragment_seconds and keyframe < duration:
+            boundaries.append(keyframe)
+    boundaries.append(duration)
+    return boundaries
+
+def write_playlist(path: str, durations: List[float], target_duration: int, ended: bool):
+    """
+    Write an HLS event playlist (replaced atomically so players never see a partial file).
+
+    Args:
+        path (str): Playlist path
+        durations (List[float]): Durations of the fragments written so far
+        target_duration (int): Longest fragment duration in whole seconds
+        ended (bool): Whether all fragments have been written
+    """
+    lines = [
+        '#EXTM3U',
+        '#EXT-X-VERSION:3',
+        f'#EXT-X-TARGETDURATION:{target_duration}',
+        '#EXT-X-PLAYLIST-TYPE:EVENT',
+        '#EXT-X-MEDIA-SEQUENCE:0',
+    ]
+    for index, duration in enumerate(durations):
+        lines += [f'#EXTINF:{duration:.3f},', fragment_name(index)]
+    if ended:
+        lines.append('#EXT-X-ENDLIST')
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(temp_path, path)
+
+def fragment_name(index: int) -> str:
+    return f"fragment_{index:05d}.ts"
+
+class ProgressiveOutput:
+    """
+    Writes the dubbed video as a growing HLS stream while TTS is still running.
+
+    The video is cut into fragments of a few seconds at keyframes. A background
+    thread mixes and muxes each fragment (video stream-copied, dub encoded to
+    AAC) as soon as every segment that can be heard in it has been synthesized,
+    then appends it to the playlist.
+    """
+
+    def __init__(self, video_path: str, output_dir: str, segments: SegmentTable, work_dir: str,
+                 mix_mode: str = config.MIX_MODE, cancel_token: Optional[CancellationToken] = None,
+                 fragment_seconds: float = config.PROGRESSIVE_FRAGMENT_SECONDS,
+                 original_audio: Optional[str] = None):
+        """
+        Initialize the progressive output (call start() to begin writing).
+
+        Args:
+            video_path (str): Source video
+            output_dir (str): Directory for the playlist and fragments (emptied first)
+            segments (SegmentTable): Translated segments in the order TTS reports them
+            work_dir (str): Directory for the per-fragment soundtrack
+            mix_mode (str): 'duck' to keep the original audio under the dub, 'replace' for the dub alone
+            cancel_token (Optional[CancellationToken]): Token that stops the writer
+            fragment_seconds (float): Target fragment length in seconds
+            original_audio (Optional[str]): Original audio for 'duck' mode if the video has none
+        """
+        self.video_path = video_path
+        self.output_dir = Path(output_dir)
+        self.segments = segments
+        self.work_dir = work_dir
+        self.mix_mode = mix_mode
+        self.cancel_token = cancel_token
+        self.fragment_seconds = fragment_seconds
+        self.original_audio = original_audio
+        self.playlist_path = str(self.output_dir / PLAYLIST_NAME)
+        self.durations: List[float] = []
+        self.error: Optional[Exception] = None
+
+        # Segments by start time; rows are ready once their audio exists
+        self._order = np.argsort(segments.start, kind='stable')
+        self._sorted_starts = segments.start[self._order]
+        self._paths: List[Optional[str]] = [None] * len(segments)
+        self._audio_ends = np.zeros(len(segments), dtype=np.float64)
+        self._ready_prefix = 0
+        self._finished = False
+        self._stopped = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'ProgressiveOutput':
+        """Probe the video and start the writer thread."""
+        from src.media_probe import get_duration, get_keyframes
+
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        duration = get_duration(self.video_path, cancel_token=self.cancel_token)
+        try:
+            keyframes = get_keyframes(self.video_path, cancel_token=self.cancel_token)
+        except JobCancelled:
+            raise
+        except Exception:
+            keyframes = []
+        self.boundaries = fragment_boundaries(keyframes, duration, self.fragment_seconds)
+        lengths = np.diff(self.boundaries)
+        self.target_duration = max(int(math.ceil(lengths.max())), 1) if len(lengths) else 1
+        write_playlist(self.playlist_path, [], self.target_duration, ended=False)
+
+        self._thread = threading.Thread(target=self._run, name='progressive-output', daemon=True)
+        self._thread.start()
+        logging.getLogger('yt_germanizer').info(
+            f"Progressive output: {len(self.boundaries) - 1} fragments in {self.playlist_path}")
+        return self
+
+    def segment_ready(self, row: int, audio_path: str):
+        """
+        Report that a segment has been synthesized (safe to call from any thread).
+
+        Args:
+            row (int): Row of the segment in the table passed to the constructor
+            audio_path (str): Its audio file
+        """
+        from src.audio_mix import segment_duration_ms
+
+        segment = self.segments[row]
+        audio_end = segment['start'] + segment_duration_ms({'audio_path': audio_path, 'start': segment['start'],
+                                                            'end': segment['end']})
+        with self._condition:
+            self._paths[row] = audio_path
+            self._audio_ends[row] = audio_end
+            while (self._ready_prefix < len(self._order)
+                   and self._paths[self._order[self._ready_prefix]] is not None):
+                self._ready_prefix += 1
+            self._condition.notify_all()
+
+    def finish(self, tts_segments: SegmentTable):
+        """
+        Report that TTS is complete; the remaining fragments are written in the background.
+
+        Args:
+            tts_segments (SegmentTable): All segments with 'audio_path', same rows as the constructor's table
+        """
+        for row, segment in enumerate(tts_segments):
+            if self._paths[row] is None:
+                self.segment_ready(row, segment['audio_path'])
+        with self._condition:
+            self._finished = True
+            self._condition.notify_all()
+
+    def close(self) -> Optional[str]:
+        """
+        Wait for the remaining fragments if finish() was called, otherwise stop writing.
+
+        Returns:
+            Optional[str]: Playlist path if every fragment was written, else None
+        """
+        with self._condition:
+            if not self._finished:
+                self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        complete = self._thread is not None and len(self.durations) == len(self.boundaries) - 1
+        return self.playlist_path if complete else None
+
+    def _wait_for_fragment(self, end: float) -> Optional[Tuple[List[int], List[Optional[str]], np.ndarray]]:
+        """Block until every segment audible before end (plus the ducking attack) is ready."""
+        limit = end * 1000.0 + config.DUCK_ATTACK_MS
+        needed = int(np.searchsorted(self._sorted_starts, limit, side='left'))
+        with self._condition:
+            while self._ready_prefix < needed and not self._stopped:
+                self._condition.wait(timeout=1.0)
+                check_cancelled(self.cancel_token)
+            if self._stopped:
+                return None
+            return [int(row) for row in self._order[:needed]], list(self._paths), self._audio_ends.copy()
+
+    def _run(self):
+        from src.audio_mix import mix_window
+        from src.video_sync import build_mux_command
+
+        logger = logging.getLogger('yt_germanizer')
+        background = (self.original_audio or self.video_path) if self.mix_mode == 'duck' else None
+        audio_path = os.path.join(self.work_dir, 'progressive_audio.wav')
+        try:
+            for index in range(len(self.boundaries) - 1):
+                start, end = self.boundaries[index], self.boundaries[index + 1]
+                ready = self._wait_for_fragment(end)
+                if ready is None:
+                    return
+                rows, paths, audio_ends = ready
+                # Only segments still audible (or releasing the ducking) in this fragment
+                rows = [row for row in rows if audio_ends[row] + config.DUCK_RELEASE_MS > start * 1000.0]
+                window = self.segments.select(rows).with_audio_paths([paths[row] for row in rows])
+                mix_window(window, audio_path, start, end, background_path=background,
+                           cancel_token=self.cancel_token)
+
+                fragment_path = str(self.output_dir / fragment_name(index))
+                cmd = build_mux_command(self.video_path, audio_path, f"{fragment_path}.tmp")
+                # Seek the video to the fragment's keyframe and keep timestamps continuous
+                cmd[2:2] = ['-ss', f"{start:.6f}"]
+                cmd[-1:-1] = ['-t', f"{end - start:.6f}", '-output_ts_offset', f"{start:.6f}", '-f', 'mpegts']
+                process = run_process(cmd, self.cancel_token)
+                if process.returncode != 0:
+                    raise Exception(f"FFmpeg error: {process.stderr}")
+                os.replace(f"{fragment_path}.tmp", fragment_path)
+
+                self.durations.append(end - start)
+                write_playlist(self.playlist_path, self.durations, self.target_duration,
+                               ended=len(self.durations) == len(self.boundaries) - 1)
+                if index == 0:
+                    logger.info(f"First progressive fragment ready: {self.playlist_path}")
+        except JobCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+            logger.error(f"Progressive output stopped: {str(e)}")
+        finally:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
@@ -0,0 +1,279 @@
+import os
+import json
+import shutil
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.cancellation import CancellationToken, JobCancelled, check_cancelled, run_process
+from src.segments import SegmentTable
+from src.utils import link_or_copy
+from src.workspace import output_lock
+from src import config
+
+# Files kept in <output dir>/render for incremental re-renders
+RENDER_DIR_NAME = 'render'
+STATE_FILE = 'render.json'
+SEGMENTS_FILE = 'tts.npz'
+SOUNDTRACK_FILE = 'soundtrack.wav'
+BACKGROUND_FILE = 'background.mka'
+CLIP_DIR = 'clips'
+
+def render_dir(video_output_dir: str) -> Path:
+    """Directory of a video's re-render state."""
+    return Path(video_output_dir) / RENDER_DIR_NAME
+
+def save_render_state(directory: str, video_id: str, output_path: str, tts_segments: SegmentTable,
+                      subtitle_tracks: List[Dict], keep_original_audio: bool, mix_mode: str):
+    """
+    Keep the TTS clips and job settings next to the output so edits can be re-rendered.
+
+    sync_audio_with_video(render_dir=...) has already placed the mixed soundtrack
+    (and the original audio in 'duck' mode) in the directory.
+
+    Args:
+        directory (str): Render state directory (see render_dir())
+        video_id (str): Video ID
+        output_path (str): The germanized video
+        tts_segments (SegmentTable): Segments with 'audio_path'
+        subtitle_tracks (List[Dict]): Subtitle tracks muxed into the output
+        keep_original_audio (bool): Whether the output has the original audio as a second track
+        mix_mode (str): 'duck' or 'replace'
+    """
+    directory = Path(directory)
+    clip_dir = directory / CLIP_DIR
+    clip_dir.mkdir(parents=True, exist_ok=True)
+    names = []
+    for segment in tts_segments:
+        name = os.path.basename(segment['audio_path'])
+        link_or_copy(segment['audio_path'], str(clip_dir / name))
+        names.append(name)
+    tts_segments.with_audio_paths(names).save(str(directory / SEGMENTS_FILE))
+    state = {
+        'video_id': video_id,
+        'output_path': str(Path(output_path).resolve()),
+        'subtitle_tracks': subtitle_tracks,
+        'keep_original_audio': keep_original_audio,
+        'mix_mode': mix_mode,
+        'tts_model': config.TTS_MODEL_NAME,
+    }
+    with open(directory / STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+def _load_state(directory: Path) -> Tuple[Dict[str, Any], SegmentTable]:
+    """Load a render state, with clip names resolved to paths."""
+    if not (directory / STATE_FILE).is_file():
+        raise FileNotFoundError(f"No re-render state in {directory} (was the job run with RENDER_STATE_ENABLED?)")
+    with open(directory / STATE_FILE, encoding='utf-8') as f:
+        state = json.load(f)
+    segments = SegmentTable.load(str(directory / SEGMENTS_FILE))
+    paths = [str(directory / CLIP_DIR / segment['audio_path']) for segment in segments]
+    return state, segments.with_audio_paths(paths)
+
+def export_edits(video_output_dir: str, path: Optional[str] = None) -> str:
+    """
+    Write a video's translated segments to a JSON file for hand editing.
+
+    Edit 'text', 'start', 'end' or 'speaker'; delete entries to drop segments,
+    or add entries without an 'id' for new ones.
+
+    Args:
+        video_output_dir (str): Output directory of a finished job
+        path (Optional[str]): Edit file (default: <video_id>_de.edit.json in the output directory)
+
+    Returns:
+        str: Path of the edit file
+    """
+    directory = render_dir(video_output_dir)
+    state, segments = _load_state(directory)
+    path = path or os.path.join(video_output_dir, f"{state['video_id']}_de.edit.json")
+    document = {
+        'output_dir': str(Path(video_output_dir).resolve()),
+        'segments': [
+            {'id': row, 'start': segment['start'], 'end': segment['end'],
+             'speaker': segment['speaker'], 'text': segment['text']}
+            for row, segment in enumerate(segments)
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return path
+
+def plan_edits(old: SegmentTable, edits: List[Dict]) -> Tuple[List[Dict], List[int], List[Tuple[float, float]]]:
+    """
+    Work out what an edit changes.
+
+    Args:
+        old (SegmentTable): Rendered segments with 'audio_path'
+        edits (List[Dict]): Edited segments ('id' refers to a row of old; missing for new segments)
+
+    Returns:
+        Tuple[List[Dict], List[int], List[Tuple[float, float]]]: The new segments (with the
+            old 'audio_path' where the clip can be kept), indices of new segments that need
+            synthesis, and the changed (start, end) spans of the old and new audio in milliseconds
+    """
+    from src.audio_mix import segment_duration_ms
+
+    segments, synthesize, spans = [], [], []
+    kept = set()
+    for edit in edits:
+        segment = {
+            'text': str(edit['text']),
+            'start': int(edit['start']),
+            'end': int(edit['end']),
+            'speaker': str(edit.get('speaker', 'A')),
+        }
+        row = edit.get('id')
+        previous = old[row] if isinstance(row, int) and 0 <= row < len(old) and row not in kept else None
+        if previous is not None:
+            kept.add(row)
+        if previous is not None and (previous['text'], previous['speaker']) == (segment['text'], segment['speaker']):
+            segment['audio_path'] = previous['audio_path']
+            if previous['start'] != segment['start']:
+                duration = segment_duration_ms(previous)
+                spans.append((previous['start'], previous['start'] + duration))
+                spans.append((segment['start'], segment['start'] + duration))
+        else:
+            if previous is not None:
+                spans.append((previous['start'], previous['start'] + segment_duration_ms(previous)))
+            synthesize.append(len(segments))
+        segments.append(segment)
+
+    # Segments left out of the edit file are removed from the mix
+    for row in sorted(set(range(len(old))) - kept):
+        spans.append((old[row]['start'], old[row]['start'] + segment_duration_ms(old[row])))
+    return segments, synthesize, spans
+
+def merge_windows(spans: List[Tuple[float, float]], attack_ms: float, release_ms: float) -> List[Tuple[float, float]]:
+    """
+    Widen changed spans by the ducking ramps and merge overlapping ones.
+
+    Args:
+        spans (List[Tuple[float, float]]): (start, end) in milliseconds
+        attack_ms (float): Fade-down time before speech
+        release_ms (float): Fade-up time after speech
+
+    Returns:
+        List[Tuple[float, float]]: Sorted, non-overlapping windows
+    """
+    windows: List[List[float]] = []
+    for start, end in sorted((start - attack_ms, end + release_ms) for start, end in spans):
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([max(start, 0.0), end])
+    return [(start, end) for start, end in windows]
+
+def apply_edits(edit_path: str, cancel_token: Optional[CancellationToken] = None) -> str:
+    """
+    Re-render a video after its segments were edited.
+
+    Only segments whose text or speaker changed are synthesized again, only
+    the soundtrack windows around changed, moved or removed segments are
+    re-mixed, and the output is re-muxed with the video stream copied.
+
+    Args:
+        edit_path (str): Edit file written by export_edits() and edited by hand
+        cancel_token (Optional[CancellationToken]): Token checked between segments and chunks
+
+    Returns:
+        str: Path to the updated video
+    """
+    from src.audio_mix import patch_soundtrack, segment_duration_ms
+    from src.subtitles import write_subtitles
+    from src.video_sync import build_mux_command
+
+    logger = logging.getLogger('yt_germanizer')
+    try:
+        with open(edit_path, encoding='utf-8') as f:
+            document = json.load(f)
+        video_output_dir = document['output_dir']
+        # A job publishing new outputs for this video must not swap render/ out mid-edit
+        with output_lock(video_output_dir):
+            directory = render_dir(video_output_dir)
+            state, old = _load_state(directory)
+            video_id = state['video_id']
+
+            segments, synthesize, spans = plan_edits(old, document['segments'])
+            logger.info(f"Edit changes {len(spans)} spans; synthesizing {len(synthesize)} of {len(segments)} segments")
+
+            # Everything is rendered into a pending directory first; the render state, soundtrack,
+            # subtitles and video are only replaced once all of them are ready, so a cancel or
+            # error leaves the previous render intact
+            pending_dir = directory / 'pending'
+            shutil.rmtree(pending_dir, ignore_errors=True)
+            pending_dir.mkdir(parents=True)
+            if synthesize:
+                from src.tts_generation import generate_tts
+                for index in synthesize:
+                    check_cancelled(cancel_token)
+                    segment = segments[index]
+                    segment['audio_path'] = generate_tts(
+                        text=segment['text'],
+                        output_dir=str(pending_dir),
+                        start_time=segment['start'],
+                        speaker=segment['speaker'],
+                        model_name=state.get('tts_model')
+                    )
+                    spans.append((segment['start'], segment['start'] + segment_duration_ms(segment)))
+            table = SegmentTable.from_dicts(segments)
+
+            # Re-mix only the changed windows of a copy of the kept soundtrack
+            soundtrack_path = str(directory / SOUNDTRACK_FILE)
+            pending_soundtrack = str(pending_dir / SOUNDTRACK_FILE)
+            shutil.copyfile(soundtrack_path, pending_soundtrack)
+            background_path = str(directory / BACKGROUND_FILE) if state['mix_mode'] == 'duck' else None
+            windows = merge_windows(spans, config.DUCK_ATTACK_MS, config.DUCK_RELEASE_MS)
+            frames = patch_soundtrack(table, pending_soundtrack, windows, background_path=background_path,
+                                      cancel_token=cancel_token)
+            logger.info(f"Re-mixed {len(windows)} windows ({frames / config.MIX_SAMPLE_RATE:.1f} s of audio)")
+
+            # Rewrite the German subtitles, then re-mux without touching the video stream
+            subtitle_tracks = [dict(track) for track in state['subtitle_tracks']]
+            subtitle_files = []
+            for track in subtitle_tracks:
+                if track.get('language') == 'ger':
+                    paths = write_subtitles(table, str(pending_dir), f"{video_id}_de")
+                    subtitle_files.append((paths['srt'], track['path']))
+                    if track.get('vtt_path'):
+                        subtitle_files.append((paths['vtt'], track['vtt_path']))
+                    track['path'] = paths['srt']
+            output_path = state['output_path']
+            temp_output = str(pending_dir / os.path.basename(output_path))
+            cmd = build_mux_command(output_path, pending_soundtrack, temp_output, subtitle_tracks=subtitle_tracks,
+                                    keep_original_audio=state['keep_original_audio'], original_audio_stream='0:a:1?')
+            process = run_process(cmd, cancel_token)
+            if process.returncode != 0:
+                raise Exception(f"FFmpeg error: {process.stderr}")
+
+            # All outputs match the edit: make them the new render state (no cancellation from here on)
+            names = [Path(segment['audio_path']).name for segment in table]
+            kept_names = {name for name, segment in zip(names, table) if Path(segment['audio_path']).parent != pending_dir}
+            for row, segment in enumerate(table):
+                path = Path(segment['audio_path'])
+                if path.parent != pending_dir:
+                    continue
+                name, suffix = path.name, 1
+                while name in kept_names:
+                    name = f"{path.stem}_{suffix}{path.suffix}"
+                    suffix += 1
+                os.replace(path, directory / CLIP_DIR / name)
+                names[row] = name
+                kept_names.add(name)
+            os.replace(pending_soundtrack, soundtrack_path)
+            table.with_audio_paths(names).save(str(directory / SEGMENTS_FILE))
+            table.with_text([segment['text'] for segment in table]).save(
+                os.path.join(video_output_dir, f"{video_id}_de.npz"))
+            for pending_path, path in subtitle_files:
+                os.replace(pending_path, path)
+            os.replace(temp_output, output_path)
+            shutil.rmtree(pending_dir, ignore_errors=True)
+            logger.info(f"Re-rendered {output_path}")
+            return output_path
+
+    except JobCancelled:
+        raise
+    except Exception as e:
+        check_cancelled(cancel_token)
+        logger.error(f"Error re-rendering edits: {str(e)}")
+        raise Exception(f"Re-render error: {str(e)}")
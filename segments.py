@@ -0,0 +1,346 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+class StringPool:
+    """
+    Interned strings referenced by integer codes.
+
+    Repeated values (speaker labels, short utterances like "Yeah.") are
+    stored once; columns hold int32 codes into the pool.
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values:
+            self.code(value)
+
+    def code(self, value: str) -> int:
+        """Get the code of a string, adding it to the pool if needed."""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def encode(self, values: Iterable[str]) -> np.ndarray:
+        """Encode strings as an int32 code column."""
+        return np.fromiter((self.code(value) for value in values), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Pack the pool as a UTF-8 blob plus offsets (no pickling needed to store it)."""
+        encoded = [value.encode('utf-8') for value in self.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return {'blob': np.frombuffer(b''.join(encoded), dtype=np.uint8), 'offsets': offsets}
+
+    @classmethod
+    def from_arrays(cls, blob: np.ndarray, offsets: np.ndarray) -> 'StringPool':
+        data = blob.tobytes()
+        return cls(data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:]))
+
+class SegmentView(Mapping):
+    """
+    Read-only dict-like view of one row of a SegmentTable.
+
+    Supports segment['text'], segment.get('speaker', 'A'), dict(segment) and
+    iteration over keys, so code written for segment dicts keeps working.
+    Values are plain Python types, so dict(segment) is JSON serializable.
+    """
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: 'SegmentTable', row: int):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key: str) -> Any:
+        return self._table.value(self._row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._table.columns)
+
+    def __len__(self) -> int:
+        return len(self._table.columns)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+class SegmentTable(Sequence):
+    """
+    Columnar store for transcript segments.
+
+    Times (ms), confidences and speaker codes are NumPy arrays; text, speaker
+    labels and audio paths are interned in string pools. Rows are exposed as
+    SegmentView objects, so a table can be passed wherever a list of segment
+    dicts was expected. Slicing and deriving tables (with_text,
+    with_audio_paths) share the unchanged columns instead of copying them.
+    """
+
+    def __init__(self, start: np.ndarray, end: np.ndarray, speaker_codes: np.ndarray, speakers: StringPool,
+                 text_codes: np.ndarray, texts: StringPool, confidence: Optional[np.ndarray] = None,
+                 audio_codes: Optional[np.ndarray] = None, audio_paths: Optional[StringPool] = None):
+        """
+        Initialize a table from its columns (use from_dicts() to build one from segment dicts).
+
+        Args:
+            start (np.ndarray): Start times in milliseconds (int64)
+            end (np.ndarray): End times in milliseconds (int64)
+            speaker_codes (np.ndarray): Codes into speakers (int32)
+            speakers (StringPool): Speaker labels
+            text_codes (np.ndarray): Codes into texts (int32)
+            texts (StringPool): Segment texts
+            confidence (Optional[np.ndarray]): Transcription confidence per segment (float64)
+            audio_codes (Optional[np.ndarray]): Codes into audio_paths (int32)
+            audio_paths (Optional[StringPool]): Synthesized audio file paths
+        """
+        self.start = start
+        self.end = end
+        self.speaker_codes = speaker_codes
+        self.speakers = speakers
+        self.text_codes = text_codes
+        self.texts = texts
+        self.confidence = confidence
+        self.audio_codes = audio_codes
+        self.audio_paths = audio_paths
+        self.columns = ['text', 'start', 'end', 'speaker']
+        if confidence is not None:
+            self.columns.append('confidence')
+        if audio_codes is not None:
+            self.columns.append('audio_path')
+
+    @classmethod
+    def from_dicts(cls, segments: Iterable[Dict[str, Any]]) -> 'SegmentTable':
+        """
+        Build a table from segment dicts with 'text', 'start', 'end' and optionally
+        'speaker' (default 'A'), 'confidence' and 'audio_path'.
+
+        Args:
+            segments (Iterable[Dict[str, Any]]): Segments
+
+        Returns:
+            SegmentTable: The table
+        """
+        segments = list(segments)
+        texts, speakers = StringPool(), StringPool()
+        table = cls(
+            start=np.fromiter((segment['start'] for segment in segments), dtype=np.int64, count=len(segments)),
+            end=np.fromiter((segment['end'] for segment in segments), dtype=np.int64, count=len(segments)),
+            speaker_codes=speakers.encode(segment.get('speaker', 'A') for segment in segments),
+            speakers=speakers,
+            text_codes=texts.encode(segment['text'] for segment in segments),
+            texts=texts,
+        )
+        if segments and all(segment.get('confidence') is not None for segment in segments):
+            table.confidence = np.fromiter((segment['confidence'] for segment in segments), dtype=np.float64)
+            table.columns.append('confidence')
+        if segments and all(segment.get('audio_path') for segment in segments):
+            table = table.with_audio_paths([segment['audio_path'] for segment in segments])
+        return table
+
+    @classmethod
+    def coerce(cls, segments: Union['SegmentTable', Iterable[Dict[str, Any]]]) -> 'SegmentTable':
+        """Return segments as a table, converting a list of dicts if needed."""
+        return segments if isinstance(segments, SegmentTable) else cls.from_dicts(segments)
+
+    def value(self, row: int, key: str) -> Any:
+        """
+        Get one field of one row.
+
+        Args:
+            row (int): Row index
+            key (str): Column name
+
+        Returns:
+            Any: Plain Python value
+
+        Raises:
+            KeyError: If the table has no such column
+        """
+        if key == 'text':
+            return self.texts.values[self.text_codes[row]]
+        if key == 'start':
+            return int(self.start[row])
+        if key == 'end':
+            return int(self.end[row])
+        if key == 'speaker':
+            return self.speakers.values[self.speaker_codes[row]]
+        if key == 'confidence' and self.confidence is not None:
+            return float(self.confidence[row])
+        if key == 'audio_path' and self.audio_codes is not None:
+            return self.audio_paths.values[self.audio_codes[row]]
+        raise KeyError(key)
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # Basic slices of NumPy arrays are views; the pools are shared
+            return self._take(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return SegmentView(self, index)
+
+    def __iter__(self) -> Iterator[SegmentView]:
+        for row in range(len(self)):
+            yield SegmentView(self, row)
+
+    def __repr__(self) -> str:
+        return f"<SegmentTable {len(self)} segments, {len(self.speakers)} speakers, {len(self.texts)} distinct texts>"
+
+    def _take(self, index) -> 'SegmentTable':
+        return SegmentTable(
+            self.start[index], self.end[index], self.speaker_codes[index], self.speakers,
+            self.text_codes[index], self.texts,
+            confidence=self.confidence[index] if self.confidence is not None else None,
+            audio_codes=self.audio_codes[index] if self.audio_codes is not None else None,
+            audio_paths=self.audio_paths,
+        )
+
+    def select(self, rows) -> 'SegmentTable':
+        """
+        Get a table with a subset of the rows.
+
+        Args:
+            rows: Boolean mask or row indices
+
+        Returns:
+            SegmentTable: The selected rows (pools are shared)
+        """
+        return self._take(np.asarray(rows))
+
+    def shifted(self, offset_ms: int) -> 'SegmentTable':
+        """
+        Get the table with every segment moved by an offset (other columns are shared).
+
+        Args:
+            offset_ms (int): Milliseconds to add to start and end times
+
+        Returns:
+            SegmentTable: The shifted table
+        """
+        return SegmentTable(self.start + offset_ms, self.end + offset_ms, self.speaker_codes, self.speakers,
+                            self.text_codes, self.texts, confidence=self.confidence,
+                            audio_codes=self.audio_codes, audio_paths=self.audio_paths)
+
+    def retimed(self, start: np.ndarray, end: np.ndarray) -> 'SegmentTable':
+        """
+        Get the table with new start and end times (other columns are shared).
+
+        Args:
+            start (np.ndarray): One start time per row in milliseconds
+            end (np.ndarray): One end time per row in milliseconds
+
+        Returns:
+            SegmentTable: The retimed table
+        """
+        if len(start) != len(self) or len(end) != len(self):
+            raise ValueError(f"Expected {len(self)} start and end times")
+        return SegmentTable(np.asarray(start, dtype=np.int64), np.asarray(end, dtype=np.int64),
+                            self.speaker_codes, self.speakers, self.text_codes, self.texts,
+                            confidence=self.confidence, audio_codes=self.audio_codes, audio_paths=self.audio_paths)
+
+    def sorted_by_start(self) -> 'SegmentTable':
+        """Get the rows in start time order (self if already sorted)."""
+        if len(self) < 2 or np.all(self.start[1:] >= self.start[:-1]):
+            return self
+        return self._take(np.argsort(self.start, kind='stable'))
+
+    def text_lengths(self) -> np.ndarray:
+        """Character count of each segment's text."""
+        pool_lengths = np.fromiter((len(text) for text in self.texts.values), dtype=np.int64, count=len(self.texts))
+        return pool_lengths[self.text_codes] if len(self) else np.zeros(0, dtype=np.int64)
+
+    def with_text(self, texts: Sequence[str]) -> 'SegmentTable':
+        """
+        Derive a table with new texts (e.g. translations) sharing the other columns.
+
+        Args:
+            texts (Sequence[str]): One text per row
+
+        Returns:
+            SegmentTable: The derived table (confidence and audio paths are dropped)
+        """
+        if len(texts) != len(self):
+            raise ValueError(f"Expected {len(self)} texts, got {len(texts)}")
+        pool = StringPool()
+        return SegmentTable(self.start, self.end, self.speaker_codes, self.speakers, pool.encode(texts), pool)
+
+    def with_audio_paths(self, paths: Sequence[str]) -> 'SegmentTable':
+        """
+        Derive a table with synthesized audio paths sharing the other columns.
+
+        Args:
+            paths (Sequence[str]): One audio path per row
+
+        Returns:
+            SegmentTable: The derived table
+        """
+        if len(paths) != len(self):
+            raise ValueError(f"Expected {len(self)} audio paths, got {len(paths)}")
+        pool = StringPool()
+        return SegmentTable(self.start, self.end, self.speaker_codes, self.speakers, self.text_codes, self.texts,
+                            confidence=self.confidence, audio_codes=pool.encode(paths), audio_paths=pool)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convert to a list of plain segment dicts."""
+        return [dict(segment) for segment in self]
+
+    def save(self, path: str):
+        """
+        Write the table to an uncompressed .npz file (a checkpoint that loads without pickling).
+
+        Args:
+            path (str): Output path; NumPy appends '.npz' if missing
+        """
+        arrays = {
+            'start': self.start,
+            'end': self.end,
+            'speaker_codes': self.speaker_codes,
+            'text_codes': self.text_codes,
+        }
+        pools = {'speakers': self.speakers, 'texts': self.texts}
+        if self.confidence is not None:
+            arrays['confidence'] = self.confidence
+        if self.audio_codes is not None:
+            arrays['audio_codes'] = self.audio_codes
+            pools['audio_paths'] = self.audio_paths
+        for name, pool in pools.items():
+            for part, array in pool.to_arrays().items():
+                arrays[f"{name}_{part}"] = array
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> 'SegmentTable':
+        """
+        Read a table written by save().
+
+        Args:
+            path (str): Path of the .npz file
+
+        Returns:
+            SegmentTable: The table
+        """
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+
+        def pool(name: str) -> Optional[StringPool]:
+            if f"{name}_blob" not in arrays:
+                return None
+            return StringPool.from_arrays(arrays[f"{name}_blob"], arrays[f"{name}_offsets"])
+
+        return cls(
+            arrays['start'], arrays['end'], arrays['speaker_codes'], pool('speakers'),
+            arrays['text_codes'], pool('texts'),
+            confidence=arrays.get('confidence'),
+            audio_codes=arrays.get('audio_codes'),
+            audio_paths=pool('audio_paths'),
+        )
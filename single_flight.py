@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from src.cancellation import CancellationToken, JobCancelled, check_cancelled
+
+# Seconds between cancellation checks while waiting for another caller's result
+WAIT_INTERVAL = 0.2
+
+class _Call:
+    """One in-flight computation and the callers waiting for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Runs at most one computation per key at a time; concurrent callers with
+    the same key wait for that computation and share its result or error.
+
+    Results are not cached: once a call finishes, the next caller starts a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.counters = {'calls': 0, 'shared': 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any],
+           cancel_token: Optional[CancellationToken] = None,
+           on_wait: Optional[Callable[[], None]] = None) -> Tuple[Any, bool]:
+        """
+        Run fn for key, or wait for the call already running for key.
+
+        If the running call was cancelled by its own job, a waiting caller
+        that is not cancelled runs fn itself instead of failing.
+
+        Args:
+            key (Hashable): Identity of the computation
+            fn (Callable[[], Any]): The computation
+            cancel_token (Optional[CancellationToken]): Token of the caller; a waiting
+                caller stops waiting (raising JobCancelled) when it is cancelled
+            on_wait (Optional[Callable[[], None]]): Called when the caller starts
+                waiting for another caller's computation
+
+        Returns:
+            Tuple[Any, bool]: The result, and whether it came from another caller's call
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.counters['calls'] += 1
+                else:
+                    call.waiters += 1
+                    self.counters['shared'] += 1
+
+            if leader:
+                try:
+                    call.result = fn()
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    call.done.set()
+                return call.result, False
+
+            if on_wait is not None:
+                on_wait()
+            while not call.done.wait(WAIT_INTERVAL):
+                check_cancelled(cancel_token)
+            check_cancelled(cancel_token)
+
+            if isinstance(call.error, JobCancelled):
+                # The leader's job was cancelled, not ours: try again
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+    def in_flight(self) -> int:
+        """Number of keys currently being computed."""
+        with self._lock:
+            return len(self._calls)
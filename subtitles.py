@@ -0,0 +1,84 @@
+import os
+from typing import Dict, List
+
+def format_timestamp(milliseconds: float, separator: str = ',') -> str:
+    """
+    Format a time in milliseconds as a subtitle timestamp.
+    
+    Args:
+        milliseconds (float): Time in milliseconds
+        separator (str): Separator before the milliseconds (',' for SRT, '.' for WebVTT)
+    
+    Returns:
+        str: Timestamp in HH:MM:SS,mmm form
+    """
+    total = max(int(round(milliseconds)), 0)
+    hours, remainder = divmod(total, 3600 * 1000)
+    minutes, remainder = divmod(remainder, 60 * 1000)
+    seconds, millis = divmod(remainder, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{millis:03d}"
+
+def _cues(segments: List[Dict]) -> List[Dict]:
+    """Keep segments with text, sorted by start time."""
+    cues = [segment for segment in segments if str(segment.get('text', '')).strip()]
+    return sorted(cues, key=lambda segment: segment['start'])
+
+def segments_to_srt(segments: List[Dict]) -> str:
+    """
+    Render segments as SubRip (SRT) subtitles.
+    
+    Args:
+        segments (List[Dict]): Segments with 'text', 'start' and 'end' in milliseconds
+    
+    Returns:
+        str: SRT document
+    """
+    blocks = []
+    for i, segment in enumerate(_cues(segments), start=1):
+        blocks.append(
+            f"{i}\n"
+            f"{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n"
+            f"{segment['text'].strip()}\n"
+        )
+    return '\n'.join(blocks)
+
+def segments_to_vtt(segments: List[Dict]) -> str:
+    """
+    Render segments as WebVTT subtitles.
+    
+    Args:
+        segments (List[Dict]): Segments with 'text', 'start' and 'end' in milliseconds
+    
+    Returns:
+        str: WebVTT document
+    """
+    blocks = ["WEBVTT\n"]
+    for segment in _cues(segments):
+        blocks.append(
+            f"{format_timestamp(segment['start'], '.')} --> {format_timestamp(segment['end'], '.')}\n"
+            f"{segment['text'].strip()}\n"
+        )
+    return '\n'.join(blocks)
+
+def write_subtitles(segments: List[Dict], output_dir: str, basename: str) -> Dict[str, str]:
+    """
+    Write SRT and WebVTT subtitle files for a list of segments.
+    
+    Args:
+        segments (List[Dict]): Segments with 'text', 'start' and 'end' in milliseconds
+        output_dir (str): Directory to write the files to
+        basename (str): File name without extension
+    
+    Returns:
+        Dict[str, str]: Paths of the written files keyed by format ('srt', 'vtt')
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        'srt': os.path.join(output_dir, f"{basename}.srt"),
+        'vtt': os.path.join(output_dir, f"{basename}.vtt"),
+    }
+    with open(paths['srt'], 'w', encoding='utf-8') as f:
+        f.write(segments_to_srt(segments))
+    with open(paths['vtt'], 'w', encoding='utf-8') as f:
+        f.write(segments_to_vtt(segments))
+    return paths
@@ -0,0 +1,84 @@
+import sys
+import types
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The modules import each other as src.*; alias the checkout so the tests run from any directory name
+if 'src' not in sys.modules:
+    package = types.ModuleType('src')
+    package.__path__ = [str(ROOT)]
+    sys.modules['src'] = package
+
+from src import config
+from src import media_probe
+from src.segments import SegmentTable
+
+DIRECTORIES = ('DATA_DIR', 'INPUT_DIR', 'OUTPUT_DIR', 'TTS_DIR', 'TEMP_DIR', 'LOG_DIR', 'JOB_DIR', 'JOB_LOG_DIR',
+               'FINGERPRINT_DIR', 'SHARED_DIR', 'PROFILE_DIR', 'WORKSPACE_DIR', 'CACHE_DIR', 'PARTIAL_DOWNLOAD_DIR')
+
+requires_ffmpeg = pytest.mark.skipif(not (shutil.which('ffmpeg') and shutil.which('ffprobe')),
+                                     reason='ffmpeg and ffprobe are required')
+
+@pytest.fixture(autouse=True)
+def data_dirs(tmp_path, monkeypatch):
+    """Point every data directory at a fresh temporary tree."""
+    data_dir = tmp_path / 'data'
+    paths = {}
+    for name in DIRECTORIES:
+        try:
+            paths[name] = data_dir / Path(getattr(config, name)).relative_to(config.DATA_DIR)
+        except ValueError:
+            paths[name] = data_dir / name.lower()
+    for name, path in paths.items():
+        path.mkdir(parents=True, exist_ok=True)
+        monkeypatch.setattr(config, name, path)
+    monkeypatch.setattr(config, 'JOB_DB_PATH', config.JOB_DIR / 'jobs.db')
+    monkeypatch.setattr(config, 'ETA_DB_PATH', config.JOB_DIR / 'throughput.db')
+    monkeypatch.setattr(media_probe, 'PROBE_CACHE_DIR', config.CACHE_DIR / 'media_probe')
+    return data_dir
+
+@pytest.fixture
+def sample_video(tmp_path):
+    """A 10 second MP4 with a keyframe every 2 seconds and a sine tone."""
+    path = tmp_path / 'sample.mp4'
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=d=10:s=160x120:r=25',
+                    '-f', 'lavfi', '-i', 'sine=d=10', '-g', '50', '-c:v', 'libx264', '-c:a', 'aac', str(path)],
+                   check=True)
+    return path
+
+TTS_SAMPLE_RATE = 22050
+
+class StandInTTS:
+    """Speaks every text as a one second tone (pitch by text length), in place of a Coqui TTS model."""
+
+    class synthesizer:
+        output_sample_rate = TTS_SAMPLE_RATE
+
+    def tts(self, text, speed=1.0):
+        frequency = 200 + 20 * (len(text) % 20)
+        return 0.2 * np.sin(np.arange(TTS_SAMPLE_RATE) * 2 * np.pi * frequency / TTS_SAMPLE_RATE)
+
+def stand_in_transcriber(api_key, audio_path, cancel_token=None):
+    return SegmentTable.from_dicts([
+        {'text': 'Hello and welcome.', 'start': 500, 'end': 2500, 'speaker': 'A'},
+        {'text': 'Thanks for watching.', 'start': 5000, 'end': 7000, 'speaker': 'B'},
+    ])
+
+def stand_in_translator(segments, cancel_token=None):
+    german = {'Hello and welcome.': 'Hallo und willkommen.', 'Thanks for watching.': 'Danke fürs Zuschauen.'}
+    return segments.with_text([german[segment['text']] for segment in segments])
+
+@pytest.fixture
+def stand_in_tts(monkeypatch):
+    """Run TTS with StandInTTS and turn off fingerprint reuse between tests."""
+    from src import tts_generation
+    monkeypatch.setattr(config, 'DEDUP_ENABLED', False)
+    monkeypatch.setattr(tts_generation.model_manager, 'loader', lambda name: StandInTTS())
+    yield
+    tts_generation.model_manager.unload(config.TTS_MODEL_NAME)
@@ -0,0 +1,97 @@
+import json
+import time
+import functools
+import threading
+import urllib.request
+from urllib.error import HTTPError
+
+import pytest
+
+from conftest import requires_ffmpeg, stand_in_transcriber, stand_in_translator
+from src import config
+
+@pytest.fixture
+def api(stand_in_tts):
+    from src.api_server import create_api_server
+    from src.jobs import JobManager
+    from src.job_store import JobStore
+    from src.pipeline import run_pipeline
+    from src.utils import setup_logging
+
+    setup_logging()
+    runner = functools.partial(run_pipeline, transcriber=stand_in_transcriber, translator=stand_in_translator)
+    store = JobStore(config.JOB_DIR / 'jobs.db')
+    manager = JobManager(runner=runner, max_workers=1, store=store, log_dir=config.JOB_LOG_DIR)
+    server = create_api_server(manager, '127.0.0.1', 0, api_key='test-key')
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", manager
+    server.shutdown()
+    server.server_close()
+    manager.shutdown(wait=True)
+    store.close()
+
+def request(url, data=None, method=None):
+    with urllib.request.urlopen(urllib.request.Request(url, data=data, method=method), timeout=60) as response:
+        return response.status, response.read()
+
+def wait_for(base_url, job_id, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _, body = request(f"{base_url}/jobs/{job_id}")
+        job = json.loads(body)
+        if job['status'] in ('completed', 'failed', 'cancelled'):
+            return job
+        time.sleep(0.2)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+@requires_ffmpeg
+def test_upload_runs_to_completion(api, sample_video):
+    base_url, _ = api
+    status, body = request(f"{base_url}/jobs/upload?filename=talk.mp4&subtitles=1",
+                           data=sample_video.read_bytes(), method='POST')
+    assert status == 202
+    job_id = json.loads(body)['id']
+
+    # Following the log streams it until the job is done
+    _, log = request(f"{base_url}/jobs/{job_id}/logs?follow=1")
+    job = wait_for(base_url, job_id)
+    assert job['status'] == 'completed', job['error']
+    assert job['progress'] == 1.0
+    assert 'Transcription completed: 2 segments' in log.decode('utf-8')
+
+    _, body = request(f"{base_url}/jobs/{job_id}/artifacts")
+    # Uploads are stored as upload_<id>_<filename>
+    artifacts = {artifact['name'].split('_talk')[-1]: artifact for artifact in json.loads(body)['artifacts']}
+    assert {'_german.mp4', '_de.srt', '_de.vtt', '_de.npz'} <= set(artifacts)
+    _, subtitles = request(base_url + artifacts['_de.srt']['url'])
+    assert 'Hallo und willkommen.' in subtitles.decode('utf-8')
+    _, video = request(base_url + artifacts['_german.mp4']['url'])
+    assert len(video) == artifacts['_german.mp4']['size']
+
+def test_unknown_job_and_missing_profile(api):
+    base_url, manager = api
+    with pytest.raises(HTTPError) as error:
+        request(f"{base_url}/jobs/0123456789ab")
+    assert error.value.code == 404
+
+    from src.jobs import Job
+    job = Job({'video_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'})
+    manager.jobs[job.id] = job
+    manager.profile_dir = config.PROFILE_DIR
+    (config.PROFILE_DIR / job.id).mkdir(parents=True)
+    with pytest.raises(HTTPError) as error:
+        request(f"{base_url}/jobs/{job.id}/profile?format=svg")
+    assert error.value.code == 404
+
+def test_log_offset_is_validated(api):
+    base_url, manager = api
+    from src.jobs import Job, job_log_path
+    job = Job({'video_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'})
+    manager.jobs[job.id] = job
+    job_log_path(job.id, config.JOB_LOG_DIR).write_text('first line\n')
+    for offset in ('-1', 'abc', '1.5'):
+        with pytest.raises(HTTPError) as error:
+            request(f"{base_url}/jobs/{job.id}/logs?offset={offset}")
+        assert error.value.code == 400
+    assert request(f"{base_url}/jobs/{job.id}/logs?offset=6") == (200, b'line\n')
@@ -0,0 +1,90 @@
+import wave
+
+import numpy as np
+import pytest
+
+from conftest import requires_ffmpeg
+from src import audio_mix
+from src.audio_mix import ENVELOPE_RATE, SoundtrackWriter, build_ducking_envelope, mix_soundtrack, read_wav_header
+from src.media_probe import get_duration
+
+SAMPLE_RATE = 8000
+DUCK_DB = -12.0
+DUCK_GAIN = 10 ** (DUCK_DB / 20)
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    samples = samples.reshape(len(samples), -1)
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setnchannels(samples.shape[1])
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes((samples * 32767).astype('<i2').tobytes())
+
+def read_wav(path):
+    channels, sample_rate, _, frames, offset = read_wav_header(str(path))
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        pcm = np.frombuffer(f.read(frames * channels * 2), dtype='<i2')
+    return pcm.reshape(-1, channels) / 32767.0, sample_rate
+
+def test_envelope_ducks_under_speech_with_linear_ramps():
+    envelope = build_ducking_envelope([(1000, 2000)], 3000, duck_db=DUCK_DB, attack_ms=100, release_ms=200)
+    at = lambda ms: envelope[int(ms * ENVELOPE_RATE / 1000)]
+    assert len(envelope) == 3000 * ENVELOPE_RATE // 1000 + 1
+    assert at(0) == at(890) == 1.0
+    assert np.allclose([at(1000), at(1500), at(1995)], DUCK_GAIN)
+    # Attack: down over the 100 ms before speech; release: up over the 200 ms after it
+    assert at(950) == pytest.approx(DUCK_GAIN + (1 - DUCK_GAIN) * 0.5)
+    assert at(2100) == pytest.approx(DUCK_GAIN + (1 - DUCK_GAIN) * 0.5, abs=0.03)
+    assert at(2200) == 1.0 and at(3000) == 1.0
+    assert np.all(np.diff(envelope[:200]) <= 0) and np.all(np.diff(envelope[200:]) >= 0)
+
+def test_overlapping_speech_stays_ducked():
+    envelope = build_ducking_envelope([(1000, 2000), (1900, 2500)], 3000, duck_db=DUCK_DB,
+                                      attack_ms=100, release_ms=200)
+    assert np.allclose(envelope[200:500], DUCK_GAIN)
+    assert np.all(build_ducking_envelope([], 1000) == 1.0)
+
+@requires_ffmpeg
+def test_mix_attenuates_the_background_only_under_speech(tmp_path):
+    # 1 kHz background under a silent one-second clip at 1 s, so the mix shows the gain alone
+    time = np.arange(3 * SAMPLE_RATE) / SAMPLE_RATE
+    tone = 0.5 * np.sin(2 * np.pi * 1000 * time)
+    write_wav(tmp_path / 'background.wav', np.stack([tone, tone], axis=1))
+    write_wav(tmp_path / 'clip.wav', np.zeros(SAMPLE_RATE))
+    segments = [{'text': 'Hallo', 'start': 1000, 'end': 2000, 'audio_path': str(tmp_path / 'clip.wav')}]
+    mix_soundtrack(segments, str(tmp_path / 'mix.wav'), 3.0, background_path=str(tmp_path / 'background.wav'),
+                   duck_db=DUCK_DB, attack_ms=100, release_ms=200, background_gain_db=0.0,
+                   sample_rate=SAMPLE_RATE)
+
+    mix, sample_rate = read_wav(tmp_path / 'mix.wav')
+    assert sample_rate == SAMPLE_RATE and mix.shape == (3 * SAMPLE_RATE, 2)
+    rms = lambda start_ms, end_ms: np.sqrt(np.mean(mix[start_ms * 8:end_ms * 8, 0] ** 2))
+    full = 0.5 / np.sqrt(2)
+    assert rms(100, 800) == pytest.approx(full, rel=0.02)
+    assert rms(1100, 1900) == pytest.approx(full * DUCK_GAIN, rel=0.02)
+    assert rms(2300, 2900) == pytest.approx(full, rel=0.02)
+    # Halfway through the ramps the gain is halfway between
+    assert rms(945, 955) == pytest.approx(full * (DUCK_GAIN + 1) / 2, rel=0.1)
+    assert rms(2095, 2105) == pytest.approx(full * (DUCK_GAIN + 1) / 2, rel=0.1)
+
+def test_soundtrack_stays_a_plain_wav_below_the_limit(tmp_path):
+    path = tmp_path / 'soundtrack.wav'
+    with SoundtrackWriter(str(path), 2, SAMPLE_RATE) as writer:
+        writer.writeframes(np.arange(200, dtype='<i2').tobytes())
+    with wave.open(str(path), 'rb') as wav_file:
+        assert (wav_file.getnchannels(), wav_file.getframerate(), wav_file.getnframes()) == (2, SAMPLE_RATE, 100)
+        assert np.array_equal(np.frombuffer(wav_file.readframes(100), dtype='<i2'), np.arange(200))
+
+@requires_ffmpeg
+def test_soundtrack_switches_to_rf64_past_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio_mix, 'RIFF_MAX_DATA', 1000)
+    path = tmp_path / 'soundtrack.wav'
+    samples = np.sin(np.arange(2 * SAMPLE_RATE) / 10.0)[:, None].repeat(2, axis=1) * 0.5
+    with SoundtrackWriter(str(path), 2, SAMPLE_RATE) as writer:
+        writer.writeframes((samples * 32767).astype('<i2').tobytes())
+
+    assert path.read_bytes()[:4] == b'RF64'
+    assert read_wav_header(str(path))[:4] == (2, SAMPLE_RATE, 2, 2 * SAMPLE_RATE)
+    assert np.allclose(read_wav(path)[0], samples, atol=1e-4)
+    assert get_duration(str(path)) == pytest.approx(2.0, abs=0.01)
@@ -0,0 +1,69 @@
+import fcntl
+import threading
+import time
+
+import pytest
+
+from src import config
+from src.audio_processing import get_video_id, partial_download_lock
+from src.cancellation import CancellationToken, JobCancelled
+
+def hold_lock(video_url, format_spec):
+    """Hold the download lock in another thread until the returned event is set."""
+    entered, release = threading.Event(), threading.Event()
+
+    def holder():
+        with partial_download_lock(video_url, format_spec):
+            entered.set()
+            release.wait()
+
+    thread = threading.Thread(target=holder, daemon=True)
+    thread.start()
+    entered.wait()
+    return thread, release
+
+def test_waiting_for_another_url_form_of_the_video_is_cancellable():
+    thread, release = hold_lock('https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42', 'bestaudio')
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        with partial_download_lock('https://youtu.be/dQw4w9WgXcQ?si=abc', 'bestaudio', token):
+            pass
+    assert time.monotonic() - started < 1.5
+
+    # Another format writes other partial files, so it may download at the same time
+    with partial_download_lock('https://youtu.be/dQw4w9WgXcQ', 'bestvideo', token):
+        pass
+    release.set()
+    thread.join()
+    assert get_video_id('https://youtu.be/dQw4w9WgXcQ?si=abc') == 'dQw4w9WgXcQ'
+
+def test_lock_file_keeps_other_processes_out():
+    thread, release = hold_lock('https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'bestaudio')
+    # flock() conflicts between separate opens of the file, as it does between processes
+    lock_path, = config.PARTIAL_DOWNLOAD_DIR.glob('.*.lock')
+    with open(lock_path, 'a') as other:
+        with pytest.raises(BlockingIOError):
+            fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        release.set()
+        thread.join()
+        fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+def test_cancelled_prefetch_does_not_wait_for_another_jobs_download(tmp_path):
+    from src.audio_processing import acquisition_profile
+    from src.video_sync import VideoPrefetch
+
+    video_url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+    thread, release = hold_lock(video_url, acquisition_profile()['video_format'])
+    token = CancellationToken()
+    prefetch = VideoPrefetch(video_url, str(tmp_path), cancel_token=token, with_audio=False)
+    time.sleep(0.2)
+    token.cancel()
+    started = time.monotonic()
+    with pytest.raises(JobCancelled):
+        prefetch.result()
+    assert time.monotonic() - started < 1.5
+    assert prefetch.done
+    release.set()
+    thread.join()
@@ -0,0 +1,46 @@
+import pytest
+
+from src import config
+from src.cancellation import CancellationToken, JobCancelled
+from src.distributed import CANCELLED, LeaseQueue, synthesize_distributed
+
+def test_cancel_stops_a_batch_running_locally(monkeypatch, tmp_path):
+    from src import tts_generation
+
+    token = CancellationToken()
+    calls = []
+
+    def generate_tts(text, output_dir, start_time, speaker=None, model_name=None):
+        calls.append(text)
+        if len(calls) == 3:
+            token.cancel()
+        return f"{output_dir}/tts_{start_time}.wav"
+
+    monkeypatch.setattr(tts_generation, 'generate_tts', generate_tts)
+    queue = LeaseQueue(config.DATA_DIR / 'queue.db')
+    segments = [{'text': f"Satz {i}", 'start': i * 1000, 'speaker': 'A'} for i in range(20)]
+
+    with pytest.raises(JobCancelled):
+        synthesize_distributed(queue, segments, str(tmp_path), lambda *args: None,
+                               cancel_token=token, batch_size=20)
+    # The local batch stops at the next segment instead of running to the end
+    assert len(calls) == 3
+    assert queue.counts() == {CANCELLED: 1}
+    queue.close()
+
+def test_finished_tasks_release_their_child_tokens(monkeypatch, tmp_path):
+    from src import tts_generation
+
+    monkeypatch.setattr(tts_generation, 'generate_tts',
+                        lambda text, output_dir, start_time, speaker=None, model_name=None:
+                        f"{output_dir}/tts_{start_time}.wav")
+    queue = LeaseQueue(config.DATA_DIR / 'queue.db')
+    token = CancellationToken()
+    segments = [{'text': f"Satz {i}", 'start': i * 1000, 'speaker': 'A'} for i in range(20)]
+
+    paths = synthesize_distributed(queue, segments, str(tmp_path), lambda *args: None,
+                                   cancel_token=token, batch_size=2)
+    assert len(paths) == 20
+    # Ten batches ran locally on the job's token without leaving a child behind
+    assert token._children == []
+    queue.close()
@@ -0,0 +1,105 @@
+import pytest
+
+from src import eta
+from src.eta import DEFAULT_RATES, JobEstimate, ThroughputModel, ThroughputStore, estimate_job
+
+def run(audio_minutes, segments, characters, **stage_seconds):
+    return {'audio_minutes': audio_minutes, 'segments': segments, 'characters': characters,
+            'stage_seconds': stage_seconds}
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(eta.time, 'monotonic', clock)
+    return clock
+
+def test_defaults_without_history():
+    model = ThroughputModel()
+    assert model.samples == {stage: 0 for stage in DEFAULT_RATES}
+    predicted = model.predict(10)
+    assert list(predicted) == ['download', 'transcribe', 'translate', 'tts', 'sync']
+    assert predicted['transcribe'] == pytest.approx(200)
+    # Characters are predicted from the audio duration
+    assert predicted['tts'] == pytest.approx(10 * eta.DEFAULT_CHARACTERS_PER_MINUTE * DEFAULT_RATES['tts'])
+    assert model.predict(10, characters=1000)['tts'] == pytest.approx(30)
+
+def test_rates_are_medians_per_unit():
+    model = ThroughputModel([
+        run(2, 10, 1000, transcribe=20, tts=50),
+        run(4, 40, 4000, transcribe=60, tts=80),
+        run(1, 20, 2000, transcribe=30),
+    ])
+    assert model.rates['transcribe'] == pytest.approx(15)
+    assert model.rates['tts'] == pytest.approx((0.05 + 0.02) / 2)
+    assert model.samples['tts'] == 2
+    # Stages without history keep their default
+    assert model.rates['sync'] == DEFAULT_RATES['sync']
+    assert model.characters_per_minute == pytest.approx(1000)
+    assert model.segments_per_minute == pytest.approx(10)
+
+def test_store_keeps_recent_runs(tmp_path):
+    store = ThroughputStore(tmp_path / 'eta' / 'throughput.db')
+    store.add(1, 5, 500, {'tts': 10.0})
+    store.add(2, 8, 900, {'tts': 20.0})
+    assert store.recent() == [run(2, 8, 900, tts=20.0), run(1, 5, 500, tts=10.0)]
+    assert len(store.recent(limit=1)) == 1
+    assert estimate_job(3, store)['history']['tts'] == 2
+    store.close()
+
+def test_remaining_blends_in_the_observed_rate(clock):
+    model = ThroughputModel()
+    estimate = JobEstimate(model=model, audio_minutes=1)
+    predicted = model.predict(1)
+    assert estimate.remaining() == pytest.approx(sum(predicted.values()))
+
+    estimate.update('transcribe', 0.0)
+    clock.now += 5
+    later = sum(predicted[stage] for stage in ('translate', 'tts', 'sync'))
+    # No progress yet: the prediction minus the elapsed time
+    assert estimate.remaining() == pytest.approx(predicted['transcribe'] - 5 + later)
+
+    # Half done after 5 s: halfway between the 20 s prediction and the observed 10 s
+    estimate.update('transcribe', 0.5)
+    assert estimate.remaining() == pytest.approx(0.5 * 20 + 0.5 * 10 - 5 + later)
+
+    clock.now += 100
+    assert estimate.remaining() == pytest.approx(0.5 * 20 + 0.5 * 210 - 105 + later)
+    # Running over the prediction never gives a negative time for the stage
+    estimate.update('transcribe', 0.0)
+    assert estimate.remaining() == pytest.approx(later)
+
+def test_progress_never_decreases(clock):
+    estimate = JobEstimate(model=ThroughputModel(), audio_minutes=1)
+    assert estimate.progress() == 0.0
+    estimate.update('download', 0.0)
+    clock.now += 1
+    estimate.update('download', 1.0)
+    before = estimate.progress()
+    assert 0 < before < 1
+    # Learning that the job is far larger makes the remaining time jump
+    estimate.set_sizes(audio_minutes=100)
+    assert estimate.progress() == before
+
+def test_record_saves_measured_stages(clock, tmp_path):
+    store = ThroughputStore(tmp_path / 'throughput.db')
+    estimate = JobEstimate(model=ThroughputModel(), store=store, audio_minutes=2)
+    for stage, seconds in (('download', 3), ('transcribe', 30), ('translate', 1), ('tts', 40)):
+        estimate.update(stage, 0.0)
+        clock.now += seconds
+
+    # Sizes still unknown: nothing to learn from
+    estimate.record()
+    assert store.recent() == []
+
+    estimate.set_sizes(segments=12, characters=1500)
+    estimate.record(exclude=['download'])
+    assert store.recent() == [run(2, 12, 1500, transcribe=30.0, translate=1.0, tts=40.0)]
+    assert ThroughputModel.load(store).rates['transcribe'] == pytest.approx(15)
+    store.close()
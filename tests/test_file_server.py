@@ -0,0 +1,28 @@
+import urllib.request
+
+import pytest
+
+from src import config
+from src.file_server import start_file_server
+
+def test_binds_publicly_only_when_allowed(monkeypatch):
+    with pytest.raises(ValueError):
+        start_file_server(host='0.0.0.0', port=0)
+    monkeypatch.setattr(config, 'FILE_SERVER_ALLOW_PUBLIC', True)
+    server = start_file_server(host='0.0.0.0', port=0)
+    server.shutdown()
+    server.server_close()
+
+def test_serves_ranges_on_loopback():
+    (config.OUTPUT_DIR / 'video').mkdir()
+    (config.OUTPUT_DIR / 'video' / 'video_german.mp4').write_bytes(b'0123456789')
+    server = start_file_server(host='127.0.0.1', port=0)
+    try:
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_address[1]}/files/video/video_german.mp4",
+                                         headers={'Range': 'bytes=2-5'})
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 206
+            assert response.read() == b'2345'
+    finally:
+        server.shutdown()
+        server.server_close()
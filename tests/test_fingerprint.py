@@ -0,0 +1,77 @@
+import subprocess
+
+import pytest
+
+from conftest import requires_ffmpeg
+from src import config, fingerprint
+from src.media_probe import get_duration
+from src.pipeline import run_pipeline
+from src.segments import SegmentTable
+
+NOISE = 'anoisesrc=d=40:c=pink:seed=7:a=0.3'
+
+def make_video(path, intro_seconds=0):
+    """A 40 second noise soundtrack, optionally after an intro tone."""
+    inputs = ['-f', 'lavfi', '-i', f"testsrc=d={40 + intro_seconds}:s=160x120:r=25", '-f', 'lavfi', '-i', NOISE]
+    audio = '[1:a]anull[a]'
+    if intro_seconds:
+        inputs += ['-f', 'lavfi', '-i', f"sine=f=330:d={intro_seconds}"]
+        audio = '[2:a][1:a]concat=n=2:v=0:a=1[a]'
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', *inputs, '-filter_complex', audio, '-map', '0:v', '-map', '[a]',
+                    '-c:v', 'libx264', '-c:a', 'aac', '-ar', '44100', str(path)], check=True)
+    return path
+
+class RecordingTranscriber:
+    def __init__(self):
+        self.durations = []
+
+    def __call__(self, api_key, audio_path, cancel_token=None):
+        duration = get_duration(audio_path)
+        self.durations.append(duration)
+        if duration < 10:
+            return SegmentTable.from_dicts([{'text': 'A new intro.', 'start': 500, 'end': 2000, 'speaker': 'A'}])
+        return SegmentTable.from_dicts([
+            {'text': 'Hello and welcome.', 'start': 1000, 'end': 4000, 'speaker': 'A'},
+            {'text': 'Thanks for watching.', 'start': 20000, 'end': 24000, 'speaker': 'A'},
+        ])
+
+def translator(segments, cancel_token=None):
+    return segments.with_text([f"DE: {segment['text']}" for segment in segments])
+
+@pytest.fixture
+def index(stand_in_tts, monkeypatch):
+    monkeypatch.setattr(config, 'DEDUP_ENABLED', True)
+    monkeypatch.setattr(config, 'VAD_ENABLED', False)
+    index = fingerprint.FingerprintIndex(config.FINGERPRINT_DIR)
+    monkeypatch.setattr(fingerprint, '_index', index)
+    yield index
+    index.close()
+
+@requires_ffmpeg
+def test_new_intro_is_transcribed_and_merged(index, tmp_path):
+    transcriber = RecordingTranscriber()
+    run_pipeline(str(make_video(tmp_path / 'source.mp4')), 'test-key',
+                 transcriber=transcriber, translator=translator)
+    assert len(transcriber.durations) == 1
+
+    run_pipeline(str(make_video(tmp_path / 'intro.mp4', intro_seconds=2)), 'test-key',
+                 transcriber=transcriber, translator=translator)
+    # Only the intro was sent to the transcriber
+    assert len(transcriber.durations) == 2
+    assert transcriber.durations[1] == pytest.approx(2.0, abs=0.5)
+
+    segments = SegmentTable.load(str(config.OUTPUT_DIR / 'intro' / 'intro_de.npz'))
+    assert [segment['text'] for segment in segments] == [
+        'DE: A new intro.', 'DE: Hello and welcome.', 'DE: Thanks for watching.']
+    assert segments.start.tolist() == pytest.approx([500, 3000, 22000], abs=config.DEDUP_TIME_TOLERANCE_MS)
+
+@requires_ffmpeg
+def test_full_match_is_reused_without_transcribing(index, tmp_path):
+    transcriber = RecordingTranscriber()
+    run_pipeline(str(make_video(tmp_path / 'source.mp4')), 'test-key',
+                 transcriber=transcriber, translator=translator)
+    run_pipeline(str(make_video(tmp_path / 'mirror.mp4')), 'test-key',
+                 transcriber=transcriber, translator=translator)
+    assert len(transcriber.durations) == 1
+    segments = SegmentTable.load(str(config.OUTPUT_DIR / 'mirror' / 'mirror_de.npz'))
+    assert len(segments) == 2
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from src import config
+from src.job_store import JobStore
+from src.cancellation import check_cancelled
+from src.jobs import CANCELLED, COMPLETED, JobManager
+
+class CountingStore(JobStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.saves = []
+
+    def save(self, snapshot):
+        self.saves.append((snapshot['status'], snapshot['stage']))
+        super().save(snapshot)
+
+def test_progress_within_a_stage_is_stored_throttled():
+    def runner(progress_callback, cancel_token, estimate, **params):
+        progress_callback('transcribe', 1.0, "Transcribed")
+        for i in range(200):
+            progress_callback('tts', (i + 1) / 200, f"Generated speech for segment {i + 1}/200")
+        return 'out.mp4'
+
+    store = CountingStore(config.JOB_DIR / 'jobs.db')
+    manager = JobManager(runner=runner, max_workers=1, store=store, key_func=None, persist_interval=60.0)
+    job = manager.submit(video_url='video.mp4')
+    manager.shutdown(wait=True)
+
+    assert job.status == COMPLETED
+    # Submit, start, the first update of each stage and the final state
+    assert store.saves == [('queued', None), ('running', None), ('running', 'transcribe'),
+                           ('running', 'tts'), ('completed', 'tts')]
+    assert store.get(job.id)['progress'] == 1.0
+    store.close()
+
+def test_cancel_all_stops_a_job_shared_by_several_submissions():
+    started = threading.Event()
+
+    def runner(progress_callback, cancel_token, estimate, **params):
+        started.set()
+        while True:
+            check_cancelled(cancel_token)
+            time.sleep(0.05)
+
+    manager = JobManager(runner=runner, max_workers=1, store=None, key_func=lambda params: params['video_url'])
+    job = manager.submit(video_url='video.mp4')
+    assert manager.submit(video_url='video.mp4') is job
+    started.wait()
+    assert manager.cancel_all() == 1
+    began = time.monotonic()
+    manager.shutdown(wait=True)
+    assert time.monotonic() - began < 1
+    assert job.status == CANCELLED
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from conftest import requires_ffmpeg
+from src import media_probe
+
+@pytest.fixture(autouse=True)
+def probe_cache(monkeypatch):
+    monkeypatch.setattr(media_probe, '_last_prune', 0.0)
+    media_probe._memory_cache.clear()
+    yield
+    media_probe._memory_cache.clear()
+
+@requires_ffmpeg
+def test_keyframes_of_video_stream_only(sample_video):
+    info = media_probe.probe_media(str(sample_video), keyframes=True)
+    assert info['has_audio'] and info['has_video']
+    assert info['duration'] == pytest.approx(10.0, abs=0.1)
+    assert info['keyframes'] == [0.0, 2.0, 4.0, 6.0, 8.0]
+
+@requires_ffmpeg
+def test_expired_disk_cache_entries_are_dropped(sample_video):
+    media_probe.probe_media(str(sample_video))
+    cache_file, = media_probe.PROBE_CACHE_DIR.iterdir()
+    os.utime(cache_file, (0, 0))
+    media_probe._memory_cache.clear()
+
+    info = media_probe.probe_media(str(sample_video))
+    assert info['duration'] == pytest.approx(10.0, abs=0.1)
+    assert cache_file.stat().st_mtime > 0
+
+@requires_ffmpeg
+def test_stale_probe_results_are_pruned(sample_video):
+    media_probe.PROBE_CACHE_DIR.mkdir(parents=True)
+    stale = media_probe.PROBE_CACHE_DIR / 'stale.json'
+    stale.write_text('{}')
+    os.utime(stale, (0, 0))
+
+    media_probe.probe_media(str(sample_video))
+    assert not stale.exists()
@@ -0,0 +1,103 @@
+import urllib.request
+
+import pytest
+
+from src import metrics
+from src.cancellation import JobCancelled
+from src.metrics import Counter, Gauge, Histogram, Registry, start_metrics_server, track_jobs
+
+def test_counter_renders_one_line_per_label_set():
+    counter = Counter('jobs_total', "Finished jobs", ['status'])
+    counter.inc(status='failed')
+    counter.inc(2, status='completed')
+    counter.inc(0.5, status='completed')
+    assert counter.value(status='completed') == 2.5
+    assert counter.render() == '\n'.join([
+        '# HELP jobs_total Finished jobs',
+        '# TYPE jobs_total counter',
+        'jobs_total{status="completed"} 2.5',
+        'jobs_total{status="failed"} 1',
+    ])
+
+def test_label_values_are_escaped():
+    counter = Counter('cache_total', "Lookups", ['cache', 'result'])
+    counter.inc(cache='a "quoted"\\path\nname', result='hit')
+    assert counter.samples() == ['cache_total{cache="a \\"quoted\\"\\\\path\\nname",result="hit"} 1']
+
+def test_labels_must_match_the_declared_names():
+    counter = Counter('jobs_total', "Finished jobs", ['status'])
+    with pytest.raises(ValueError):
+        counter.inc()
+    with pytest.raises(ValueError):
+        counter.inc(status='failed', stage='tts')
+
+def test_gauge_without_labels_and_from_a_callback():
+    gauge = Gauge('queued', "Waiting jobs")
+    gauge.inc(3)
+    gauge.dec()
+    assert gauge.samples() == ['queued 2']
+    gauge.set_function(lambda: 7)
+    assert gauge.value() == 7.0
+    assert gauge.samples() == ['queued 7']
+    gauge.set_function(lambda: 1 / 0)
+    # A failing callback drops the sample instead of breaking the scrape
+    assert gauge.samples() == []
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('stage_seconds', "Stage durations", ['stage'], buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value, stage='tts')
+    assert histogram.count(stage='tts') == 4
+    assert histogram.samples() == [
+        'stage_seconds_bucket{stage="tts",le="1"} 2',
+        'stage_seconds_bucket{stage="tts",le="5"} 3',
+        'stage_seconds_bucket{stage="tts",le="+Inf"} 4',
+        'stage_seconds_sum{stage="tts"} 14.5',
+        'stage_seconds_count{stage="tts"} 4',
+    ]
+
+def test_registry_renders_and_writes_every_metric(tmp_path):
+    registry = Registry()
+    registry.register(Gauge('a', "First")).set(1)
+    registry.register(Counter('b', "Second")).inc()
+    with pytest.raises(ValueError):
+        registry.register(Gauge('a', "Duplicate"))
+    text = registry.render()
+    assert text == '# HELP a First\n# TYPE a gauge\na 1\n# HELP b Second\n# TYPE b counter\nb 1\n'
+    path = tmp_path / 'textfile' / 'yt_germanizer.prom'
+    registry.write(str(path))
+    assert path.read_text(encoding='utf-8') == text
+    assert list(path.parent.iterdir()) == [path]
+
+def test_track_jobs_counts_outcomes():
+    completed = metrics.JOBS_TOTAL.value(status='completed')
+    cancelled = metrics.JOBS_TOTAL.value(status='cancelled')
+    failed = metrics.JOBS_TOTAL.value(status='failed')
+
+    @track_jobs
+    def run(outcome):
+        assert metrics.JOBS_IN_FLIGHT.value() >= 1
+        if outcome is not None:
+            raise outcome
+        return 'done'
+
+    assert run(None) == 'done'
+    with pytest.raises(JobCancelled):
+        run(JobCancelled())
+    with pytest.raises(RuntimeError):
+        run(RuntimeError())
+    assert metrics.JOBS_TOTAL.value(status='completed') == completed + 1
+    assert metrics.JOBS_TOTAL.value(status='cancelled') == cancelled + 1
+    assert metrics.JOBS_TOTAL.value(status='failed') == failed + 1
+
+def test_metrics_server_serves_the_registry():
+    server = start_metrics_server('127.0.0.1', 0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.headers['Content-Type'] == metrics.CONTENT_TYPE
+            body = response.read().decode('utf-8')
+        assert '# TYPE yt_germanizer_jobs_total counter' in body
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from src.model_manager import ModelManager
+
+class Model:
+    pass
+
+def test_concurrent_users_of_one_model_take_turns():
+    manager = ModelManager(lambda name: Model(), memory_budget_mb=1, size_estimator=lambda model: 1024 * 1024)
+    running, overlaps, models = [], [], []
+
+    def worker():
+        with manager.use('a') as model:
+            models.append(model)
+            running.append(1)
+            overlaps.append(len(running))
+            time.sleep(0.05)
+            running.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == [1, 1, 1, 1]
+    assert all(model is models[0] for model in models)
+
+def test_models_in_use_are_not_evicted():
+    manager = ModelManager(lambda name: Model(), memory_budget_mb=1, size_estimator=lambda model: 1024 * 1024)
+    entered, release = threading.Event(), threading.Event()
+
+    def holder():
+        with manager.use('a'):
+            entered.set()
+            release.wait()
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    entered.wait()
+    # Loading another model goes over the budget, but 'a' is busy
+    manager.get('b')
+    assert manager.stats()['loaded'] == ['a', 'b']
+    assert not manager.unload('a')
+    release.set()
+    thread.join()
@@ -0,0 +1,39 @@
+import json
+import threading
+
+from conftest import requires_ffmpeg, stand_in_transcriber, stand_in_translator
+from src import config
+from src.pipeline import run_pipeline
+
+def run(video, results, key, **options):
+    try:
+        results[key] = run_pipeline(str(video), 'test-key', transcriber=stand_in_transcriber,
+                                    translator=stand_in_translator, **options)
+    except Exception as e:
+        results[key] = e
+
+@requires_ffmpeg
+def test_same_video_jobs_with_different_settings(stand_in_tts, sample_video):
+    results = {}
+    jobs = [
+        threading.Thread(target=run, args=(sample_video, results, 'duck'),
+                         kwargs={'mix_mode': 'duck', 'subtitles': True}),
+        threading.Thread(target=run, args=(sample_video, results, 'replace'),
+                         kwargs={'mix_mode': 'replace', 'subtitles': False, 'progressive': True}),
+    ]
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+
+    output_dir = config.OUTPUT_DIR / 'sample'
+    assert results['duck'] == results['replace'] == str(output_dir / 'sample_german.mp4')
+    # Whichever job published last, the render state describes its own files
+    with open(output_dir / 'render' / 'render.json', encoding='utf-8') as f:
+        state = json.load(f)
+    assert state['output_path'] == str((output_dir / 'sample_german.mp4').resolve())
+    assert all(track['path'].startswith(str(output_dir)) for track in state['subtitle_tracks'])
+    assert bool(state['subtitle_tracks']) == (state['mix_mode'] == 'duck')
+    assert (output_dir / 'hls' / 'index.m3u8').read_text().rstrip().endswith('#EXT-X-ENDLIST')
+    assert (output_dir / 'sample_de.srt').exists()
+    assert not any((output_dir / 'jobs').iterdir())
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from conftest import requires_ffmpeg, stand_in_transcriber, stand_in_translator
+from src import audio_mix, config, rerender
+from src.cancellation import CancellationToken, JobCancelled
+from src.pipeline import run_pipeline
+from src.segments import SegmentTable
+
+def edit_text(edit_path, text):
+    with open(edit_path, encoding='utf-8') as f:
+        document = json.load(f)
+    document['segments'][0]['text'] = text
+    with open(edit_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f)
+
+@requires_ffmpeg
+def test_cancelled_edit_leaves_render_state_intact(stand_in_tts, sample_video, monkeypatch):
+    run_pipeline(str(sample_video), 'test-key', transcriber=stand_in_transcriber,
+                 translator=stand_in_translator, subtitles=True)
+    output_dir = config.OUTPUT_DIR / 'sample'
+    render = rerender.render_dir(output_dir)
+    files = [render / rerender.SOUNDTRACK_FILE, render / rerender.SEGMENTS_FILE,
+             output_dir / 'sample_de.srt', output_dir / 'sample_german.mp4']
+    before = [path.read_bytes() for path in files]
+    edit_path = rerender.export_edits(str(output_dir))
+    original_text = SegmentTable.load(str(render / rerender.SEGMENTS_FILE))[0]['text']
+
+    # Cancel after the soundtrack has been patched
+    token = CancellationToken()
+    patch_soundtrack = audio_mix.patch_soundtrack
+
+    def patch_then_cancel(*args, **kwargs):
+        frames = patch_soundtrack(*args, **kwargs)
+        token.cancel()
+        return frames
+
+    monkeypatch.setattr(audio_mix, 'patch_soundtrack', patch_then_cancel)
+    edit_text(edit_path, 'Herzlich willkommen zu dieser Folge.')
+    with pytest.raises(JobCancelled):
+        rerender.apply_edits(edit_path, cancel_token=token)
+    assert [path.read_bytes() for path in files] == before
+    monkeypatch.setattr(audio_mix, 'patch_soundtrack', patch_soundtrack)
+
+    rerender.apply_edits(edit_path)
+    assert files[0].read_bytes() != before[0]
+    assert 'Herzlich willkommen' in files[2].read_text(encoding='utf-8')
+    assert not (render / 'pending').exists()
+
+    edited = files[0].read_bytes()
+    edit_text(edit_path, original_text)
+    rerender.apply_edits(edit_path)
+    assert files[0].read_bytes() != edited
+    assert SegmentTable.load(str(render / rerender.SEGMENTS_FILE))[0]['text'] == original_text
+    assert 'Herzlich willkommen' not in files[2].read_text(encoding='utf-8')
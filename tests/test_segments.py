@@ -0,0 +1,85 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.segments import SegmentTable, StringPool
+
+SEGMENTS = [
+    {'text': 'Hallo und willkommen.', 'start': 500, 'end': 2500, 'speaker': 'A', 'confidence': 0.9},
+    {'text': 'Ja.', 'start': 2600, 'end': 2900, 'speaker': 'B', 'confidence': 0.8},
+    {'text': 'Schön, dass ihr da seid – 🎉', 'start': 3000, 'end': 5000, 'speaker': 'A', 'confidence': 0.95},
+    {'text': 'Ja.', 'start': 5200, 'end': 5400, 'speaker': 'B', 'confidence': 0.7},
+]
+
+def test_string_pool_interns_and_round_trips():
+    pool = StringPool()
+    codes = pool.encode(['A', 'B', 'A', 'ü', 'B'])
+    assert codes.dtype == np.int32
+    assert list(codes) == [0, 1, 0, 2, 1]
+    assert pool.values == ['A', 'B', 'ü']
+    restored = StringPool.from_arrays(**pool.to_arrays())
+    assert restored.values == pool.values
+    assert restored.code('ü') == 2
+
+def test_repeated_texts_and_speakers_are_stored_once():
+    table = SegmentTable.from_dicts(SEGMENTS)
+    assert len(table.texts) == 3
+    assert table.speakers.values == ['A', 'B']
+    assert table[1]['text'] == table[3]['text'] == 'Ja.'
+    assert table.to_dicts() == SEGMENTS
+    json.dumps(dict(table[2]))
+
+def test_save_and_load_round_trip(tmp_path):
+    table = SegmentTable.from_dicts(SEGMENTS).with_audio_paths([f"/tts/{i}.wav" for i in range(4)])
+    table.save(str(tmp_path / 'segments.npz'))
+    loaded = SegmentTable.load(str(tmp_path / 'segments.npz'))
+    assert loaded.columns == table.columns
+    assert loaded.to_dicts() == table.to_dicts()
+    assert loaded.start.dtype == np.int64
+
+    # Without the optional columns
+    plain = SegmentTable.from_dicts([{key: value for key, value in segment.items() if key != 'confidence'}
+                                     for segment in SEGMENTS])
+    plain.save(str(tmp_path / 'plain.npz'))
+    loaded = SegmentTable.load(str(tmp_path / 'plain.npz'))
+    assert loaded.columns == ['text', 'start', 'end', 'speaker']
+    assert loaded.to_dicts() == plain.to_dicts()
+
+def test_empty_table_round_trips(tmp_path):
+    SegmentTable.from_dicts([]).save(str(tmp_path / 'empty.npz'))
+    loaded = SegmentTable.load(str(tmp_path / 'empty.npz'))
+    assert len(loaded) == 0 and loaded.to_dicts() == []
+
+def test_retimed_shares_the_other_columns():
+    table = SegmentTable.from_dicts(SEGMENTS)
+    retimed = table.retimed(table.start * 2, table.end * 2)
+    assert list(retimed.start) == [1000, 5200, 6000, 10400]
+    assert retimed.texts is table.texts and retimed.confidence is table.confidence
+    assert [segment['text'] for segment in retimed] == [segment['text'] for segment in table]
+    with pytest.raises(ValueError):
+        table.retimed(table.start[:2], table.end[:2])
+
+def test_with_audio_paths_and_with_text():
+    table = SegmentTable.from_dicts(SEGMENTS)
+    voiced = table.with_audio_paths(['/tts/a.wav', '/tts/b.wav', '/tts/a.wav', '/tts/c.wav'])
+    assert voiced.columns[-1] == 'audio_path'
+    assert len(voiced.audio_paths) == 3
+    assert [segment['audio_path'] for segment in voiced] == ['/tts/a.wav', '/tts/b.wav', '/tts/a.wav', '/tts/c.wav']
+    assert voiced.start is table.start and voiced.text_codes is table.text_codes
+    assert 'audio_path' not in table.columns
+    with pytest.raises(ValueError):
+        table.with_audio_paths(['/tts/a.wav'])
+
+    translated = voiced.with_text(['Hello.', 'Yes.', 'Nice.', 'Yes.'])
+    assert translated.columns == ['text', 'start', 'end', 'speaker']
+    assert len(translated.texts) == 3
+
+def test_slices_and_selection_keep_rows_together():
+    table = SegmentTable.from_dicts(SEGMENTS)
+    assert table[1:3].to_dicts() == SEGMENTS[1:3]
+    assert table.select(table.speaker_codes == table.speakers.code('B')).to_dicts() == [SEGMENTS[1], SEGMENTS[3]]
+    assert table[-1]['start'] == 5200
+    unsorted = table.select([2, 0, 1])
+    assert list(unsorted.sorted_by_start().start) == [500, 2600, 3000]
+    assert list(table.shifted(-500).start) == [0, 2100, 2500, 4700]
@@ -0,0 +1,8 @@
+import threading
+
+from src import profiler, tts_generation
+
+def test_segment_label_is_cleared_after_each_segment(stand_in_tts, tmp_path):
+    path = tts_generation.generate_tts("Hallo", str(tmp_path), 1500, speaker='A')
+    assert path.endswith('tts_1500_A.wav')
+    assert threading.get_ident() not in profiler._segments
@@ -0,0 +1,72 @@
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+from src import utils
+from src.utils import setup_logging
+
+@pytest.fixture
+def isolated_logging(monkeypatch):
+    # Fresh queue, handlers and listener so the test neither sees nor disturbs the session's logging
+    monkeypatch.setattr(utils, '_log_queue', queue.Queue(-1))
+    monkeypatch.setattr(utils, '_log_handlers', [])
+    monkeypatch.setattr(utils, '_log_outputs', {})
+    monkeypatch.setattr(utils, '_log_listener', None)
+    monkeypatch.setattr(logging.getLogger('yt_germanizer'), 'handlers', [])
+    yield
+    utils.stop_logging()
+
+def test_setup_logging_twice_adds_nothing(isolated_logging, tmp_path):
+    log_file = tmp_path / 'logs' / 'app.log'
+    logger = setup_logging(str(log_file), json_format=False)
+    handlers = list(logger.handlers)
+    outputs = list(utils._log_handlers)
+    listener = utils._log_listener
+    threads = threading.active_count()
+
+    assert setup_logging(str(log_file), json_format=True) is logger
+    assert logger.handlers == handlers and len(handlers) == 1
+    assert utils._log_handlers == outputs and len(outputs) == 2
+    assert utils._log_listener is listener
+    assert threading.active_count() == threads
+    # The second call still switches the format
+    assert all(isinstance(handler.formatter, utils.JsonFormatter) for handler in outputs)
+
+    logger.info('written once')
+    utils.stop_logging()
+    assert log_file.read_text(encoding='utf-8').count('written once') == 1
+
+def test_json_lines_keep_the_exception(isolated_logging, tmp_path):
+    log_file = tmp_path / 'app.log'
+    logger = setup_logging(str(log_file), json_format=True)
+    utils.set_log_context(job_id='job-1')
+    try:
+        try:
+            raise ValueError('bad segment')
+        except ValueError:
+            logger.exception('Segment %d failed', 3)
+    finally:
+        utils.set_log_context(job_id=None)
+    utils.stop_logging()
+
+    entry = json.loads(log_file.read_text(encoding='utf-8').splitlines()[-1])
+    assert entry['message'] == 'Segment 3 failed'
+    assert entry['job_id'] == 'job-1'
+    assert entry['exception'].startswith('Traceback')
+    assert 'ValueError: bad segment' in entry['exception']
+
+def test_text_lines_keep_the_traceback(isolated_logging, tmp_path):
+    log_file = tmp_path / 'app.log'
+    logger = setup_logging(str(log_file), json_format=False)
+    try:
+        raise ValueError('bad segment')
+    except ValueError:
+        logger.exception('Segment failed')
+    utils.stop_logging()
+
+    text = log_file.read_text(encoding='utf-8')
+    assert 'Segment failed\nTraceback' in text
+    assert text.count('ValueError: bad segment') == 1
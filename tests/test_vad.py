@@ -0,0 +1,74 @@
+import wave
+
+import numpy as np
+
+from conftest import requires_ffmpeg
+from src.media_probe import get_duration
+from src.segments import SegmentTable
+from src.vad import SAMPLE_RATE, OffsetMap, frame_features, speech_spans, trim_non_speech
+
+# Tone (ms) with silence between: speech at 0-1000, 6000-8000 and 12000-13000
+TONES = [(0, 1000), (6000, 8000), (12000, 13000)]
+TOTAL_MS = 14000
+# The tones padded by VAD_PAD_MS; both gaps are longer than VAD_MIN_GAP_MS, the 700 ms at the end is not
+EXPECTED_SPANS = [(0, 1300), (5700, 8300), (11700, 14000)]
+
+def tone_and_silence(frequency=440.0):
+    samples = np.zeros(TOTAL_MS * SAMPLE_RATE // 1000, dtype=np.float32)
+    for start, end in TONES:
+        time = np.arange((end - start) * SAMPLE_RATE // 1000) / SAMPLE_RATE
+        samples[start * SAMPLE_RATE // 1000:end * SAMPLE_RATE // 1000] = 0.3 * np.sin(2 * np.pi * frequency * time)
+    return samples
+
+def test_speech_spans_keep_padded_tones():
+    assert speech_spans(*frame_features(tone_and_silence())) == EXPECTED_SPANS
+
+def test_hum_below_the_speech_band_is_not_speech():
+    assert speech_spans(*frame_features(tone_and_silence(frequency=100.0))) == []
+
+def test_offset_map_is_monotonic_and_exact_at_span_boundaries():
+    offsets = OffsetMap.from_spans(EXPECTED_SPANS)
+    assert offsets.trimmed_ms == 1300 + 2600 + 2300 + 2 * 300
+    assert list(offsets.to_original(offsets.trimmed_starts)) == [start for start, _ in EXPECTED_SPANS]
+    assert list(offsets.to_original(offsets.trimmed_starts + offsets.lengths, ends=True)) == \
+        [end for _, end in EXPECTED_SPANS]
+
+    trimmed = np.arange(offsets.trimmed_ms + 1)
+    for ends in (False, True):
+        original = offsets.to_original(trimmed, ends=ends)
+        assert np.all(np.diff(original) >= 0)
+    # Inside a span the mapping is a shift, so mapping back to the trimmed timeline is exact
+    original = offsets.to_original(trimmed)
+    for trimmed_start, start, length in zip(offsets.trimmed_starts, offsets.original_starts, offsets.lengths):
+        inside = (trimmed >= trimmed_start) & (trimmed < trimmed_start + length)
+        assert np.array_equal(original[inside] - start + trimmed_start, trimmed[inside])
+
+def test_remapped_segments_land_on_the_original_timeline():
+    offsets = OffsetMap.from_spans(EXPECTED_SPANS)
+    segments = SegmentTable.from_dicts([
+        {'text': 'Erster', 'start': 0, 'end': 1300, 'speaker': 'A'},
+        # Ends in the silence inserted after the second span
+        {'text': 'Zweiter', 'start': 1600, 'end': 4300, 'speaker': 'A'},
+    ])
+    remapped = offsets.remap(segments)
+    assert list(remapped.start) == [0, 5700]
+    assert list(remapped.end) == [1300, 8300]
+
+@requires_ffmpeg
+def test_trim_non_speech_writes_the_kept_spans(tmp_path):
+    work_dir = tmp_path / 'work'
+    work_dir.mkdir()
+    source = work_dir / 'talk.wav'
+    with wave.open(str(source), 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes((tone_and_silence() * 32767).astype('<i2').tobytes())
+
+    trimmed_path, offsets = trim_non_speech(str(source), str(work_dir))
+    assert trimmed_path.endswith('talk_vad.ogg')
+    assert [(int(start), int(start + length)) for start, length in zip(offsets.original_starts, offsets.lengths)] \
+        == EXPECTED_SPANS
+    assert abs(get_duration(trimmed_path) * 1000 - offsets.trimmed_ms) < 30
+    # Only the Opus file is left behind
+    assert sorted(path.name for path in work_dir.iterdir()) == ['talk.wav', 'talk_vad.ogg']
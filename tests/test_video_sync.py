@@ -0,0 +1,68 @@
+from src.video_sync import build_mux_command
+
+SUBTITLES = [
+    {'path': 'video_de.srt', 'language': 'ger', 'title': 'Deutsch'},
+    {'path': 'video_en.srt', 'language': 'eng'},
+]
+DUB_CODEC = ['-c:v', 'copy', '-c:a:0', 'aac', '-strict', 'experimental']
+DUB_METADATA = ['-metadata:s:a:0', 'language=ger', '-metadata:s:a:0', 'title=Deutsch', '-disposition:a:0', 'default']
+ORIGINAL_METADATA = ['-metadata:s:a:1', 'title=Original', '-disposition:a:1', '0']
+SUBTITLE_METADATA = ['-metadata:s:s:0', 'language=ger', '-metadata:s:s:0', 'title=Deutsch',
+                     '-metadata:s:s:1', 'language=eng']
+
+def test_dub_only():
+    assert build_mux_command('video.mp4', 'dub.wav', 'out.mp4') == [
+        'ffmpeg', '-y', '-i', 'video.mp4', '-i', 'dub.wav',
+        '-map', '0:v:0', '-map', '1:a:0',
+        *DUB_CODEC, *DUB_METADATA, 'out.mp4',
+    ]
+
+def test_subtitles():
+    assert build_mux_command('video.mp4', 'dub.wav', 'out.mp4', subtitle_tracks=SUBTITLES) == [
+        'ffmpeg', '-y', '-i', 'video.mp4', '-i', 'dub.wav', '-i', 'video_de.srt', '-i', 'video_en.srt',
+        '-map', '0:v:0', '-map', '1:a:0', '-map', '2:s:0', '-map', '3:s:0',
+        *DUB_CODEC, '-c:s', 'mov_text', *DUB_METADATA, *SUBTITLE_METADATA, 'out.mp4',
+    ]
+
+def test_original_audio_from_the_video():
+    assert build_mux_command('video.mp4', 'dub.wav', 'out.mp4', keep_original_audio=True) == [
+        'ffmpeg', '-y', '-i', 'video.mp4', '-i', 'dub.wav',
+        '-map', '0:v:0', '-map', '1:a:0', '-map', '0:a:0?',
+        *DUB_CODEC, '-c:a:1', 'copy', *DUB_METADATA, *ORIGINAL_METADATA, 'out.mp4',
+    ]
+    # A previous output carries the original as its second audio track
+    cmd = build_mux_command('previous.mp4', 'dub.wav', 'out.mp4', keep_original_audio=True,
+                            original_audio_stream='0:a:1?')
+    assert cmd[cmd.index('1:a:0') + 1:cmd.index('1:a:0') + 3] == ['-map', '0:a:1?']
+
+def test_original_audio_from_the_video_with_subtitles():
+    assert build_mux_command('video.mp4', 'dub.wav', 'out.mp4', subtitle_tracks=SUBTITLES,
+                             keep_original_audio=True) == [
+        'ffmpeg', '-y', '-i', 'video.mp4', '-i', 'dub.wav', '-i', 'video_de.srt', '-i', 'video_en.srt',
+        '-map', '0:v:0', '-map', '1:a:0', '-map', '0:a:0?', '-map', '2:s:0', '-map', '3:s:0',
+        *DUB_CODEC, '-c:a:1', 'copy', '-c:s', 'mov_text',
+        *DUB_METADATA, *ORIGINAL_METADATA, *SUBTITLE_METADATA, 'out.mp4',
+    ]
+
+def test_original_audio_from_a_separate_file():
+    assert build_mux_command('video_only.mp4', 'dub.wav', 'out.mp4', keep_original_audio=True,
+                             original_audio_path='source.webm') == [
+        'ffmpeg', '-y', '-i', 'video_only.mp4', '-i', 'dub.wav', '-i', 'source.webm',
+        '-map', '0:v:0', '-map', '1:a:0', '-map', '2:a:0',
+        *DUB_CODEC, '-c:a:1', 'copy', *DUB_METADATA, *ORIGINAL_METADATA, 'out.mp4',
+    ]
+
+def test_original_audio_from_a_separate_file_with_subtitles():
+    # The audio file is the input after the subtitles, so its index depends on their number
+    assert build_mux_command('video_only.mp4', 'dub.wav', 'out.mp4', subtitle_tracks=SUBTITLES,
+                             keep_original_audio=True, original_audio_path='source.webm') == [
+        'ffmpeg', '-y', '-i', 'video_only.mp4', '-i', 'dub.wav', '-i', 'video_de.srt', '-i', 'video_en.srt',
+        '-i', 'source.webm',
+        '-map', '0:v:0', '-map', '1:a:0', '-map', '4:a:0', '-map', '2:s:0', '-map', '3:s:0',
+        *DUB_CODEC, '-c:a:1', 'copy', '-c:s', 'mov_text',
+        *DUB_METADATA, *ORIGINAL_METADATA, *SUBTITLE_METADATA, 'out.mp4',
+    ]
+
+def test_separate_original_audio_is_ignored_unless_kept():
+    assert build_mux_command('video_only.mp4', 'dub.wav', 'out.mp4', original_audio_path='source.webm') == \
+        build_mux_command('video_only.mp4', 'dub.wav', 'out.mp4')
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from src.voice_effects import apply_voice_profile, apply_voice_profile_batch, pitch_shift, time_stretch
+
+SAMPLE_RATE = 22050
+
+def tone(frequency, seconds=1.0):
+    return (0.5 * np.sin(2 * np.pi * frequency * np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE)).astype(np.float32)
+
+def peak_hz(samples):
+    # Skip the edges, where the overlap-add has not settled
+    middle = samples[len(samples) // 8:-len(samples) // 8]
+    spectrum = np.abs(np.fft.rfft(middle * np.hanning(len(middle)), n=8 * len(middle)))
+    return np.argmax(spectrum) * SAMPLE_RATE / (8 * len(middle))
+
+@pytest.mark.parametrize('semitones', [-5, -2, 1, 3, 7])
+def test_pitch_shift_moves_a_tone_to_the_target(semitones):
+    shifted = pitch_shift(tone(220.0), semitones)
+    assert len(shifted) == SAMPLE_RATE
+    target = 220.0 * 2 ** (semitones / 12)
+    # Within a sixth of a semitone
+    assert abs(12 * np.log2(peak_hz(shifted) / target)) < 1 / 6
+
+def test_zero_shift_returns_the_input():
+    samples = tone(220.0)
+    assert pitch_shift(samples, 0) is samples
+
+def test_time_stretch_keeps_the_pitch():
+    stretched = time_stretch(tone(220.0), 1.5)
+    assert abs(len(stretched) / SAMPLE_RATE - 1.5) < 0.05
+    assert abs(12 * np.log2(peak_hz(stretched) / 220.0)) < 1 / 6
+
+def test_batch_matches_single_segments():
+    profile = {'pitch': 2.0, 'eq_tilt': 3.0, 'speed': 1.0}
+    segments = [tone(220.0, 0.5), tone(330.0, 0.8)]
+    for batched, segment in zip(apply_voice_profile_batch(segments, SAMPLE_RATE, profile), segments):
+        assert np.allclose(batched, apply_voice_profile(segment, SAMPLE_RATE, profile), atol=1e-4)
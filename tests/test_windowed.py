@@ -0,0 +1,59 @@
+import struct
+import threading
+import time
+
+import numpy as np
+
+from src import config
+from src.media_probe import get_duration
+from src.segments import SegmentTable
+from src.windowed import run_windowed
+from conftest import requires_ffmpeg, stand_in_translator
+
+SAMPLE_RATE = 16000
+
+def transcribe_window(api_key, audio_path, cancel_token=None):
+    return SegmentTable.from_dicts([{'text': 'Hello and welcome.', 'start': 500, 'end': 1500, 'speaker': 'A'}])
+
+@requires_ffmpeg
+def test_follows_a_wav_while_it_is_written(stand_in_tts, monkeypatch, tmp_path):
+    monkeypatch.setattr(config, 'WINDOW_FOLLOW_TIMEOUT', 2.0)
+    source = tmp_path / 'recording.wav'
+    stale = config.OUTPUT_DIR / 'recording' / 'windowed' / 'fragment_00099.ts'
+    stale.parent.mkdir(parents=True)
+    stale.write_bytes(b'old run')
+
+    # A recorder streaming to disk: the header leaves the length open, one second of noise per chunk
+    rng = np.random.default_rng(3)
+    recording = open(source, 'wb')
+    recording.write(b'RIFF' + struct.pack('<L', 0xffffffff) + b'WAVEfmt '
+                    + struct.pack('<LHHLLHH', 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16)
+                    + b'data' + struct.pack('<L', 0xffffffff))
+    recording.write(rng.normal(0, 3000, SAMPLE_RATE).astype('<i2').tobytes())
+    recording.flush()
+
+    def write_chunks():
+        for _ in range(9):
+            time.sleep(0.3)
+            recording.write(rng.normal(0, 3000, SAMPLE_RATE).astype('<i2').tobytes())
+            recording.flush()
+        recording.close()
+
+    writer = threading.Thread(target=write_chunks)
+    writer.start()
+    try:
+        output_path = run_windowed(str(source), 'key', follow=True, window_seconds=4, delay_seconds=4,
+                                   transcriber=transcribe_window, translator=stand_in_translator)
+    finally:
+        writer.join()
+
+    # All ten seconds were dubbed, not just what existed when the job started
+    assert output_path.endswith('recording_german.m4a')
+    assert abs(get_duration(output_path) - 10) < 0.2
+    stream_dir = stale.parent
+    assert not stale.exists()
+    playlist = (stream_dir / 'index.m3u8').read_text()
+    assert playlist.rstrip().endswith('#EXT-X-ENDLIST')
+    durations = [float(line[len('#EXTINF:'):-1]) for line in playlist.splitlines() if line.startswith('#EXTINF:')]
+    assert len(durations) > 1 and abs(sum(durations) - 10) < 0.05
+    assert len(list(stream_dir.glob('*.ts'))) == len(durations)
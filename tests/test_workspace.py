@@ -0,0 +1,81 @@
+import os
+
+from src import config
+from src.workspace import JobWorkspace, cleanup_stale_workspaces, enforce_disk_budget, publish_outputs
+
+def test_staging_dirs_are_private_per_job():
+    output_dir = config.OUTPUT_DIR / 'video'
+    with JobWorkspace('video') as first, JobWorkspace('video') as second:
+        first_dir, second_dir = first.staging_dir(output_dir), second.staging_dir(output_dir)
+        assert first_dir != second_dir
+        (first_dir / 'video_german.mp4').write_text('first')
+        (second_dir / 'video_german.mp4').write_text('second')
+        # A running job's staging directory is neither stale nor evictable
+        assert cleanup_stale_workspaces() == 0
+        assert first_dir.is_dir() and second_dir.is_dir()
+    assert not first_dir.exists() and not second_dir.exists()
+
+def test_publish_replaces_files_and_directories():
+    output_dir = config.OUTPUT_DIR / 'video'
+    (output_dir / 'render').mkdir(parents=True)
+    (output_dir / 'render' / 'old_clip.wav').write_text('old')
+    (output_dir / 'video_german.mp4').write_text('old')
+    (output_dir / 'video_de.edit.json').write_text('edits')
+
+    with JobWorkspace('video') as workspace:
+        staging = workspace.staging_dir(output_dir)
+        (staging / 'render').mkdir()
+        (staging / 'render' / 'clip.wav').write_text('new')
+        (staging / 'video_german.mp4').write_text('new')
+        published = publish_outputs(staging, output_dir)
+
+    assert sorted(path.name for path in published) == ['render', 'video_german.mp4']
+    assert (output_dir / 'video_german.mp4').read_text() == 'new'
+    assert os.listdir(output_dir / 'render') == ['clip.wav']
+    assert (output_dir / 'video_de.edit.json').read_text() == 'edits'
+    assert not any(name.startswith('.retired') for name in os.listdir(output_dir / 'jobs'))
+
+def test_stale_staging_dirs_are_removed():
+    stale = config.OUTPUT_DIR / 'video' / 'jobs' / '999999999_video_deadbeef'
+    stale.mkdir(parents=True)
+    (stale / 'video_german.mp4').write_text('partial')
+    assert cleanup_stale_workspaces() == 1
+    assert not stale.exists()
+
+def test_disk_budget_skips_running_jobs_outputs():
+    output_dir = config.OUTPUT_DIR / 'video'
+    with JobWorkspace('video', protect=[output_dir]) as workspace:
+        staging = workspace.staging_dir(output_dir)
+        (staging / 'video_german.mp4').write_bytes(b'0' * 2 * 1024 * 1024)
+        assert enforce_disk_budget(budget_mb=1) == []
+        assert (staging / 'video_german.mp4').exists()
+
+def test_disk_budget_keeps_partial_downloads():
+    (config.PARTIAL_DOWNLOAD_DIR / 'video.webm.part').write_bytes(b'0' * 2 * 1024 * 1024)
+    old_input = config.INPUT_DIR / 'old.mp4'
+    old_input.write_bytes(b'0' * 1024 * 1024)
+    os.utime(old_input, (0, 0))
+    assert enforce_disk_budget(budget_mb=1) == [old_input]
+    assert (config.PARTIAL_DOWNLOAD_DIR / 'video.webm.part').exists()
+
+def test_protection_outlives_the_first_of_two_jobs():
+    output_dir = config.OUTPUT_DIR / 'video'
+    first = JobWorkspace('video', protect=[output_dir]).__enter__()
+    with JobWorkspace('video', protect=[output_dir]) as second:
+        staging = second.staging_dir(output_dir)
+        (staging / 'video_german.mp4').write_bytes(b'0' * 2 * 1024 * 1024)
+        first.cleanup()
+        # The first job's end-of-run eviction must not touch the second job's outputs
+        assert enforce_disk_budget(budget_mb=1) == []
+        assert (staging / 'video_german.mp4').exists()
+    # Once both jobs are done the outputs are evictable again
+    (output_dir / 'video_german.mp4').write_bytes(b'0' * 2 * 1024 * 1024)
+    assert enforce_disk_budget(budget_mb=1) == [output_dir]
+
+def test_disk_budget_skips_entries_holding_active_directories():
+    output_dir = config.OUTPUT_DIR / 'video'
+    with JobWorkspace('video') as workspace:
+        staging = workspace.staging_dir(output_dir)
+        (staging / 'video_german.mp4').write_bytes(b'0' * 2 * 1024 * 1024)
+        assert enforce_disk_budget(budget_mb=1) == []
+        assert (staging / 'video_german.mp4').exists()
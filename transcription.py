@@ -1,17 +1,28 @@
 import assemblyai as aai
 import logging
-from typing import Dict, List
+import numpy as np
+from typing import Optional
+from src.cancellation import CancellationToken, JobCancelled
+from src.segments import SegmentTable, StringPool
+from src import metrics
 
-def transcribe_audio(api_key: str, audio_path: str) -> List[Dict[str, str]]:
+# Seconds between transcript status checks
+POLL_INTERVAL = 1.0
+
+def transcribe_audio(api_key: str, audio_path: str,
+                     cancel_token: Optional[CancellationToken] = None,
+                     allow_empty: bool = False) -> SegmentTable:
     """
     Transcribe audio file using AssemblyAI API with speaker diarization.
     
     Args:
         api_key (str): AssemblyAI API key
         audio_path (str): Path to the audio file
+        cancel_token (Optional[CancellationToken]): Token that stops waiting for the transcript
+        allow_empty (bool): Return an empty table for audio without speech instead of failing
         
     Returns:
-        List[Dict[str, str]]: List of transcription segments with text, timestamps, and speaker labels
+        SegmentTable: Transcription segments with text, timestamps (ms), speaker labels and confidence
     """
     logger = logging.getLogger('yt_germanizer')
     
@@ -29,25 +40,39 @@ def transcribe_audio(api_key: str, audio_path: str) -> List[Dict[str, str]]:
             language_code="en"  # You can make this configurable if needed
         )
         
-        # Start transcription
-        transcript = transcriber.transcribe(audio_path, config=config)
+        # Submit the transcription and poll so a cancelled job stops waiting promptly
+        cancel_token = cancel_token or CancellationToken()
+        with metrics.external_call('assemblyai'):
+            transcript = transcriber.submit(audio_path, config=config)
+            while transcript.status in (aai.TranscriptStatus.queued, aai.TranscriptStatus.processing):
+                if cancel_token.wait(POLL_INTERVAL):
+                    cancel_token.check()
+                transcript = aai.Transcript.get_by_id(transcript.id)
+            
+            if transcript.status == aai.TranscriptStatus.error:
+                raise Exception(transcript.error)
         
         if not transcript.utterances:
+            if allow_empty:
+                return SegmentTable.from_dicts([])
             raise Exception("No transcription results found")
             
-        # Extract utterances with speaker labels and timestamps
-        segments = []
-        for utterance in transcript.utterances:
-            segments.append({
-                'text': utterance.text,
-                'start': utterance.start,
-                'end': utterance.end,
-                'speaker': utterance.speaker,
-                'confidence': utterance.confidence
-            })
-            
-        return segments
+        # Extract utterances with speaker labels and timestamps into columns
+        utterances = transcript.utterances
+        texts, speakers = StringPool(), StringPool()
+        return SegmentTable(
+            start=np.array([utterance.start for utterance in utterances], dtype=np.int64),
+            end=np.array([utterance.end for utterance in utterances], dtype=np.int64),
+            speaker_codes=speakers.encode(utterance.speaker for utterance in utterances),
+            speakers=speakers,
+            text_codes=texts.encode(utterance.text for utterance in utterances),
+            texts=texts,
+            confidence=np.array([np.nan if utterance.confidence is None else utterance.confidence
+                                 for utterance in utterances], dtype=np.float64)
+        )
         
+    except JobCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error during transcription: {str(e)}")
         raise Exception(f"Transcription error: {str(e)}")
@@ -1,29 +1,50 @@
-from TTS.api import TTS
 import os
+import time
 import tempfile
-import torch
 from typing import Dict, Any, Optional
 import logging
 from pathlib import Path
-from pydub import AudioSegment
+import numpy as np
 import random
+from src.voice_effects import apply_voice_profile, write_wav
+from src.model_manager import ModelManager
+from src import metrics
+from src import profiler
+from src import config
+from src.utils import LogRateLimiter, set_log_context
 
-# Initialize TTS model globally for better performance
-tts_model = None
+def _load_tts_model(model_name: str):
+    """Load a Coqui TTS model by name (imports torch and Coqui TTS on first use)."""
+    from TTS.api import TTS
+    return TTS(model_name=model_name, progress_bar=False)
 
-def init_tts_model():
-    """Initialize the Coqui TTS model with Thorsten voice."""
-    global tts_model
-    if tts_model is None:
-        tts_model = TTS(model_name="tts_models/de/thorsten/tacotron2-DDC", progress_bar=False)
+# Loaded TTS models are shared, kept warm and unloaded when idle or over budget
+model_manager = ModelManager(
+    _load_tts_model,
+    memory_budget_mb=config.TTS_MODEL_MEMORY_BUDGET_MB,
+    idle_timeout=config.TTS_MODEL_IDLE_TIMEOUT,
+    cache_name='tts_model'
+)
+
+# "Generating TTS" is logged at most once per interval; the rest go to DEBUG
+_segment_log = LogRateLimiter(config.LOG_SEGMENT_INTERVAL)
+
+def init_tts_model(model_name: Optional[str] = None):
+    """Initialize the Coqui TTS model (Thorsten voice by default) and return it."""
+    return model_manager.get(model_name or config.TTS_MODEL_NAME)
+
+def preload_tts_model(model_name: Optional[str] = None):
+    """Start loading a TTS model in the background when a job is queued."""
+    return model_manager.preload(model_name or config.TTS_MODEL_NAME)
 
 # Define different voice profiles for speakers
+# pitch is in semitones, eq_tilt in dB per octave around 1 kHz (positive is brighter)
 VOICE_PROFILES = {
-    'A': {'speed': 1.0, 'pitch': 0},      # Default voice
-    'B': {'speed': 0.95, 'pitch': 2},     # Slightly slower, higher pitch
-    'C': {'speed': 1.05, 'pitch': -2},    # Slightly faster, lower pitch
-    'D': {'speed': 0.9, 'pitch': 4},      # Slower, higher pitch
-    'E': {'speed': 1.1, 'pitch': -4},     # Faster, lower pitch
+    'A': {'speed': 1.0, 'pitch': 0, 'eq_tilt': 0.0},      # Default voice
+    'B': {'speed': 0.95, 'pitch': 2, 'eq_tilt': 1.0},     # Slightly slower, higher pitch
+    'C': {'speed': 1.05, 'pitch': -2, 'eq_tilt': -1.0},   # Slightly faster, lower pitch
+    'D': {'speed': 0.9, 'pitch': 4, 'eq_tilt': 2.0},      # Slower, higher pitch
+    'E': {'speed': 1.1, 'pitch': -4, 'eq_tilt': -2.0},    # Faster, lower pitch
 }
 
 def get_voice_profile(speaker: str) -> Dict[str, float]:
@@ -35,13 +56,14 @@ def get_voice_profile(speaker: str) -> Dict[str, float]:
         speaker (str): Speaker identifier
         
     Returns:
-        Dict[str, float]: Voice profile with pitch and speed settings
+        Dict[str, float]: Voice profile with speed, pitch and EQ settings
     """
     if speaker not in VOICE_PROFILES:
         # Create a new random profile for unknown speakers
         VOICE_PROFILES[speaker] = {
             'speed': random.uniform(0.9, 1.1),
-            'pitch': random.uniform(-4, 4)
+            'pitch': random.uniform(-4, 4),
+            'eq_tilt': random.uniform(-2, 2)
         }
     return VOICE_PROFILES[speaker]
 
@@ -56,6 +78,8 @@ def generate_tts_audio(transcription: Dict[str, Any], output_path: str = 'data/o
     Returns:
         str: Path to the generated audio file
     """
+    from pydub import AudioSegment
+    
     try:
         # Initialize TTS model if not already initialized
         init_tts_model()
@@ -107,7 +131,8 @@ def generate_tts_audio(transcription: Dict[str, Any], output_path: str = 'data/o
     except Exception as e:
         raise Exception(f"TTS generation error: {str(e)}")
 
-def generate_tts(text: str, output_dir: str, start_time: float, speaker: Optional[str] = None) -> str:
+def generate_tts(text: str, output_dir: str, start_time: float, speaker: Optional[str] = None,
+                 model_name: Optional[str] = None) -> str:
     """
     Generate German TTS audio for a text segment using Coqui TTS with Thorsten voice.
     
@@ -116,6 +141,7 @@ def generate_tts(text: str, output_dir: str, start_time: float, speaker: Optiona
         output_dir (str): Directory to save the TTS audio files
         start_time (float): Start time of the segment in milliseconds
         speaker (Optional[str]): Speaker identifier for voice profile
+        model_name (Optional[str]): TTS model to use (default: config.TTS_MODEL_NAME)
         
     Returns:
         str: Path to the generated TTS audio file
@@ -123,9 +149,6 @@ def generate_tts(text: str, output_dir: str, start_time: float, speaker: Optiona
     logger = logging.getLogger('yt_germanizer')
     
     try:
-        # Initialize TTS model if not already initialized
-        init_tts_model()
-        
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
         
@@ -138,17 +161,32 @@ def generate_tts(text: str, output_dir: str, start_time: float, speaker: Optiona
         voice_profile = get_voice_profile(speaker) if speaker else VOICE_PROFILES['A']
         
         # Generate TTS audio
-        logger.info(f"Generating TTS for speaker {speaker}: {text[:50]}...")
-        
-        # Generate speech with Coqui TTS
-        tts_model.tts_to_file(
-            text=text,
-            file_path=output_path,
-            speed=voice_profile['speed']
-        )
+        segment = f"{int(start_time)}ms{speaker_suffix}"
+        set_log_context(segment=segment)
+        profiler.set_segment(segment)
+        _segment_log.log(logger, 'generate_tts', f"Generating TTS for speaker {speaker}: {text[:50]}...")
+        
+        start = time.perf_counter()
+        with metrics.STAGE_SECONDS.time(stage='tts_segment'):
+            # Generate speech with Coqui TTS, keeping the model pinned while in use
+            with model_manager.use(model_name or config.TTS_MODEL_NAME) as tts_model:
+                wav = tts_model.tts(
+                    text=text,
+                    speed=voice_profile['speed']
+                )
+                sample_rate = tts_model.synthesizer.output_sample_rate
+            
+            # Apply the profile's pitch and EQ in-process before writing the file
+            samples = apply_voice_profile(np.asarray(wav, dtype=np.float32), sample_rate, voice_profile)
+            write_wav(output_path, samples, sample_rate)
+        if len(samples):
+            metrics.TTS_REAL_TIME_FACTOR.observe((time.perf_counter() - start) / (len(samples) / sample_rate))
         
         return output_path
         
     except Exception as e:
         logger.error(f"Error generating TTS: {str(e)}")
         raise Exception(f"TTS generation error: {str(e)}")
+    finally:
+        set_log_context(segment=None)
+        profiler.set_segment(None)
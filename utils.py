@@ -1,41 +1,219 @@
 import os
+import copy
+import json
+import atexit
+import time
+import queue
+import shutil
 import logging
 import textwrap
-from typing import Optional, List, Dict
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import TYPE_CHECKING, Optional, List, Dict
 from pathlib import Path
 
-def setup_logging(log_file: Optional[str] = None) -> logging.Logger:
+if TYPE_CHECKING:
+    from src.segments import SegmentTable
+
+# Log records are queued by the emitting thread and written by a listener thread
+_log_lock = threading.Lock()
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_handlers: List[logging.Handler] = []
+_log_outputs: Dict[str, logging.Handler] = {}
+_log_listener: Optional[QueueListener] = None
+
+# Job and segment IDs of the current thread, attached to its log records
+_log_context = threading.local()
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line, including job and segment IDs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for field in ('job_id', 'segment'):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+class _LogQueueHandler(QueueHandler):
+    """Queues records with the traceback formatted into exc_text instead of merged into the message."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class folds the traceback into msg and drops exc_info, which
+        # would leave formatters on the listener side without an exception field
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXCEPTION_FORMATTER.formatException(record.exc_info)
+            # The traceback would keep the failing frames alive until the record is written
+            record.exc_info = None
+        return record
+
+class _LogContextFilter(logging.Filter):
+    """Stamps records with the emitting thread's log context before they are queued."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.job_id = getattr(_log_context, 'job_id', None)
+        record.segment = getattr(_log_context, 'segment', None)
+        return True
+
+def set_log_context(**fields):
+    """
+    Set fields (job_id, segment) attached to log records emitted by the calling thread.
+    
+    Args:
+        **fields: Field values; None clears a field
+    """
+    for name, value in fields.items():
+        setattr(_log_context, name, value)
+
+def _make_formatter(json_format: bool) -> logging.Formatter:
+    if json_format:
+        return JsonFormatter()
+    return logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+def _restart_listener():
+    """Restart the queue listener so it writes to the current handler list (call with _log_lock held)."""
+    global _log_listener
+    if _log_listener is not None:
+        # Stopping drains the records queued so far
+        _log_listener.stop()
+    _log_listener = QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+    _log_listener.start()
+
+def add_log_handler(handler: logging.Handler) -> logging.Handler:
+    """
+    Write records of the 'yt_germanizer' logger to a handler on the background log thread.
+    
+    Args:
+        handler (logging.Handler): Handler to add; records carry job_id and segment attributes
+    
+    Returns:
+        logging.Handler: The handler
+    """
+    logger = logging.getLogger('yt_germanizer')
+    with _log_lock:
+        if not any(isinstance(existing, QueueHandler) for existing in logger.handlers):
+            queue_handler = _LogQueueHandler(_log_queue)
+            queue_handler.addFilter(_LogContextFilter())
+            logger.addHandler(queue_handler)
+            atexit.register(stop_logging)
+        if handler not in _log_handlers:
+            _log_handlers.append(handler)
+            _restart_listener()
+    return handler
+
+def stop_logging():
+    """Flush queued log records and stop the background log thread."""
+    global _log_listener
+    with _log_lock:
+        if _log_listener is not None:
+            _log_listener.stop()
+            _log_listener = None
+
+def setup_logging(log_file: Optional[str] = None, json_format: Optional[bool] = None) -> logging.Logger:
     """
     Set up logging configuration.
     
+    Safe to call repeatedly: the console handler is added once and each log
+    file once. Records are handed to a queue and written by a background
+    thread, so slow disks never block pipeline workers.
+    
     Args:
-        log_file (str, optional): Path to log file. If None, logs to console only.
+        log_file (str, optional): Path to a rotating log file. If None, logs to console only.
+        json_format (bool, optional): Write JSON lines instead of text (default: config.LOG_JSON)
     
     Returns:
         logging.Logger: Configured logger instance
     """
+    from src import config
+    
     logger = logging.getLogger('yt_germanizer')
     logger.setLevel(logging.INFO)
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    formatter = _make_formatter(config.LOG_JSON if json_format is None else json_format)
     
     # Add console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    if 'console' not in _log_outputs:
+        console_handler = logging.StreamHandler()
+        _log_outputs['console'] = console_handler
+        add_log_handler(console_handler)
+    _log_outputs['console'].setFormatter(formatter)
     
     # Add file handler if log_file is provided
     if log_file:
-        os.makedirs(os.path.dirname(log_file), exist_ok=True)
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+        path = os.path.abspath(str(log_file))
+        if path not in _log_outputs:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            file_handler = RotatingFileHandler(path, maxBytes=config.LOG_MAX_BYTES,
+                                               backupCount=config.LOG_BACKUP_COUNT, encoding='utf-8')
+            _log_outputs[path] = file_handler
+            add_log_handler(file_handler)
+        _log_outputs[path].setFormatter(formatter)
     
     return logger
 
+class LogRateLimiter:
+    """
+    Lets through at most one message per key per interval and counts the rest.
+    
+    Used for per-segment messages, which would otherwise write one line per
+    segment on the synthesis hot path.
+    """
+    
+    def __init__(self, interval: float):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            interval (float): Minimum seconds between messages with the same key
+        """
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+    
+    def log(self, logger: logging.Logger, key: str, message: str, level: int = logging.INFO):
+        """
+        Log a message unless one with the same key was logged within the interval.
+        
+        Suppressed messages are still logged at DEBUG level.
+        
+        Args:
+            logger (logging.Logger): Logger to write to
+            key (str): Rate limit key (e.g. the message kind)
+            message (str): Message to log
+            level (int): Log level when the message is let through
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last.get(key, float('-inf')) < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                suppressed = None
+            else:
+                self._last[key] = now
+                suppressed = self._suppressed.pop(key, 0)
+        if suppressed is None:
+            logger.debug(message)
+        elif suppressed:
+            logger.log(level, f"{message} ({suppressed} similar messages suppressed)")
+        else:
+            logger.log(level, message)
+
 def clean_filename(filename: str) -> str:
     """
     Clean a filename by removing invalid characters.
@@ -66,6 +244,25 @@ def ensure_dir(directory: str) -> str:
     path.mkdir(parents=True, exist_ok=True)
     return str(path)
 
+def link_or_copy(source: str, target: str) -> str:
+    """
+    Hard-link a file if possible (same filesystem), otherwise copy it.
+    
+    Args:
+        source (str): Existing file
+        target (str): New path (replaced if it exists)
+    
+    Returns:
+        str: Target path
+    """
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+    return str(target)
+
 def get_video_id(url: str) -> str:
     """
     Extract video ID from YouTube URL.
@@ -147,46 +344,53 @@ def chunk_text(text: str, max_length: int = 4500) -> List[str]:
     
     return chunks
 
-def translate_segments(segments: List[Dict]) -> List[Dict]:
+def translate_segments(segments: List[Dict], cancel_token=None) -> 'SegmentTable':
     """
     Translate transcription segments from English to German.
     
+    Each distinct text is translated once; the result shares the timing and
+    speaker columns of the input table.
+    
     Args:
-        segments (list): List of transcription segments with 'text', 'start', and 'end' keys
+        segments (SegmentTable or list): Transcription segments with 'text', 'start', and 'end' keys
+        cancel_token (CancellationToken, optional): Token checked between translation requests
         
     Returns:
-        list: List of translated segments with the same structure
+        SegmentTable: Translated segments with the same timing and speakers
     """
     from deep_translator import GoogleTranslator
+    from src.cancellation import check_cancelled
+    from src.segments import SegmentTable
+    from src import metrics
     logger = logging.getLogger('yt_germanizer')
     
+    segments = SegmentTable.coerce(segments)
     translator = GoogleTranslator(source='auto', target='de')
-    translated_segments = []
+    translated_texts = list(segments.texts.values)
     
-    for segment in segments:
+    for code in sorted(set(segments.text_codes.tolist())):
+        check_cancelled(cancel_token)
         try:
             # Split text into smaller chunks if needed
-            text = segment['text']
+            text = segments.texts.values[code]
             if len(text) > 4500:  # Leave some margin for safety
                 chunks = chunk_text(text)
                 translated_chunks = []
                 for chunk in chunks:
-                    translated_chunk = translator.translate(chunk)
+                    check_cancelled(cancel_token)
+                    with metrics.external_call('google_translate'):
+                        translated_chunk = translator.translate(chunk)
                     translated_chunks.append(translated_chunk)
                 translated_text = ' '.join(translated_chunks)
             else:
-                translated_text = translator.translate(text)
+                with metrics.external_call('google_translate'):
+                    translated_text = translator.translate(text)
             
-            translated_segments.append({
-                'text': translated_text,
-                'start': segment['start'],
-                'end': segment['end'],
-                'speaker': segment.get('speaker', 'A')  # Preserve speaker information
-            })
+            translated_texts[code] = translated_text
             
         except Exception as e:
+            check_cancelled(cancel_token)
             logger.error(f"Error translating segment: {str(e)}")
-            # If translation fails, use original text
-            translated_segments.append(segment)
+            # If translation fails, keep the original text
     
-    return translated_segments
+    return segments.with_text([translated_texts[code] for code in segments.text_codes.tolist()])
@@ -0,0 +1,235 @@
+import os
+import wave
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.cancellation import CancellationToken, run_process
+from src.segments import SegmentTable
+from src import config
+
+# Analysis parameters: 20 ms frames of 16 kHz mono audio (also the trimmed ASR input format)
+SAMPLE_RATE = 16000
+FRAME = 320
+FRAME_MS = FRAME * 1000 // SAMPLE_RATE
+FFT_SIZE = 512
+
+# Frequency range that carries most speech energy
+SPEECH_BAND_HZ = (250, 4000)
+# Fade at each join in the trimmed audio, and silence inserted between kept spans
+JOIN_FADE_MS = 10
+JOIN_SILENCE_MS = 300
+
+class OffsetMap:
+    """
+    Maps times in the trimmed ASR input back to the original audio.
+
+    Kept span i covers original_starts[i] to original_starts[i] + lengths[i]
+    and begins at trimmed_starts[i] in the trimmed audio. All values are in
+    milliseconds.
+    """
+
+    def __init__(self, original_starts: np.ndarray, trimmed_starts: np.ndarray, lengths: np.ndarray):
+        self.original_starts = original_starts
+        self.trimmed_starts = trimmed_starts
+        self.lengths = lengths
+
+    @classmethod
+    def from_spans(cls, spans: List[Tuple[int, int]], gap_ms: int = JOIN_SILENCE_MS) -> 'OffsetMap':
+        """
+        Build the map for spans concatenated with gap_ms of silence between them.
+
+        Args:
+            spans (List[Tuple[int, int]]): Kept (start, end) times in the original audio in milliseconds
+            gap_ms (int): Silence between spans in the trimmed audio
+
+        Returns:
+            OffsetMap: The map
+        """
+        original_starts = np.array([start for start, _ in spans], dtype=np.int64)
+        lengths = np.array([end - start for start, end in spans], dtype=np.int64)
+        trimmed_starts = np.zeros(len(spans), dtype=np.int64)
+        if len(spans) > 1:
+            np.cumsum(lengths[:-1] + gap_ms, out=trimmed_starts[1:])
+        return cls(original_starts, trimmed_starts, lengths)
+
+    @property
+    def trimmed_ms(self) -> int:
+        """Length of the trimmed audio."""
+        return int(self.trimmed_starts[-1] + self.lengths[-1]) if len(self.lengths) else 0
+
+    def to_original(self, times_ms: np.ndarray, ends: bool = False) -> np.ndarray:
+        """
+        Map trimmed-audio times to the original timeline.
+
+        Args:
+            times_ms (np.ndarray): Times in the trimmed audio
+            ends (bool): Whether the times are end times (a time on a join then
+                belongs to the span before it)
+
+        Returns:
+            np.ndarray: Times in the original audio (inserted silence maps to the end of the span before it)
+        """
+        times_ms = np.asarray(times_ms, dtype=np.int64)
+        side = 'left' if ends else 'right'
+        span = np.clip(np.searchsorted(self.trimmed_starts, times_ms, side=side) - 1, 0, len(self.lengths) - 1)
+        offset = np.clip(times_ms - self.trimmed_starts[span], 0, self.lengths[span])
+        return self.original_starts[span] + offset
+
+    def remap(self, segments: SegmentTable) -> SegmentTable:
+        """
+        Move transcribed segments from the trimmed audio to the original timeline.
+
+        Args:
+            segments (SegmentTable): Segments with times in the trimmed audio
+
+        Returns:
+            SegmentTable: The segments with times in the original audio
+        """
+        return segments.retimed(self.to_original(segments.start), self.to_original(segments.end, ends=True))
+
+def frame_features(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the level and speech-band share of consecutive frames.
+
+    Args:
+        samples (np.ndarray): Mono 16 kHz audio (a multiple of FRAME samples)
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (level in dBFS, share of energy in SPEECH_BAND_HZ) per frame
+    """
+    frames = samples.reshape(-1, FRAME)
+    level_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    power = np.abs(np.fft.rfft(frames * np.hanning(FRAME).astype(np.float32), n=FFT_SIZE, axis=1)) ** 2
+    low, high = (int(hz * FFT_SIZE / SAMPLE_RATE) for hz in SPEECH_BAND_HZ)
+    band_share = power[:, low:high].sum(axis=1) / (power.sum(axis=1) + 1e-10)
+    return level_db, band_share
+
+def speech_spans(level_db: np.ndarray, band_share: np.ndarray,
+                 min_gap_ms: int = config.VAD_MIN_GAP_MS, pad_ms: int = config.VAD_PAD_MS) -> List[Tuple[int, int]]:
+    """
+    Decide which parts of the audio to keep for transcription.
+
+    A frame counts as speech if it is well above the noise floor and most of
+    its energy lies in the speech band. Speech is padded on both sides, and
+    only non-speech stretches longer than min_gap_ms are dropped, so the
+    detector errs on the side of keeping audio.
+
+    Args:
+        level_db (np.ndarray): Frame levels from frame_features()
+        band_share (np.ndarray): Frame speech-band shares from frame_features()
+        min_gap_ms (int): Shortest non-speech stretch that is removed
+        pad_ms (int): Audio kept before and after detected speech
+
+    Returns:
+        List[Tuple[int, int]]: Kept (start, end) times in milliseconds
+    """
+    if len(level_db) == 0:
+        return []
+    # Noise floor from the quietest frames; capped so mostly-speech audio still has a sensible threshold
+    threshold = min(np.percentile(level_db, 10) + config.VAD_ENERGY_DB,
+                    np.percentile(level_db, 90) - config.VAD_ENERGY_DB)
+    threshold = max(threshold, config.VAD_SILENCE_DBFS)
+    speech = (level_db > threshold) & (band_share >= config.VAD_SPEECH_BAND_SHARE)
+
+    # Pad speech on both sides
+    pad = pad_ms // FRAME_MS
+    if pad > 0 and speech.any():
+        speech = np.convolve(speech.astype(np.int32), np.ones(2 * pad + 1, dtype=np.int32), mode='same') > 0
+
+    # Keep everything except non-speech runs of at least min_gap_ms
+    edges = np.flatnonzero(np.diff(np.concatenate([[True], speech, [True]]).astype(np.int8)))
+    gaps = [(start, end) for start, end in zip(edges[::2], edges[1::2]) if (end - start) * FRAME_MS >= min_gap_ms]
+    spans, position = [], 0
+    for start, end in gaps:
+        if start > position:
+            spans.append((position * FRAME_MS, start * FRAME_MS))
+        position = end
+    if position < len(speech):
+        spans.append((position * FRAME_MS, len(speech) * FRAME_MS))
+    return spans
+
+def _write_spans(full_path: str, output_path: str, spans: List[Tuple[int, int]]):
+    """Concatenate spans of a 16-bit mono WAV, with short fades and silence at the joins."""
+    fade = SAMPLE_RATE * JOIN_FADE_MS // 1000
+    ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+    silence = np.zeros(SAMPLE_RATE * JOIN_SILENCE_MS // 1000, dtype='<i2').tobytes()
+    with wave.open(full_path, 'rb') as source, wave.open(output_path, 'wb') as target:
+        target.setnchannels(1)
+        target.setsampwidth(2)
+        target.setframerate(SAMPLE_RATE)
+        for index, (start_ms, end_ms) in enumerate(spans):
+            if index > 0:
+                target.writeframes(silence)
+            source.setpos(start_ms * SAMPLE_RATE // 1000)
+            data = np.frombuffer(source.readframes((end_ms - start_ms) * SAMPLE_RATE // 1000), dtype='<i2')
+            data = data.astype(np.float32)
+            if len(data) > 2 * fade:
+                data[:fade] *= ramp
+                data[-fade:] *= ramp[::-1]
+            target.writeframes(data.astype('<i2').tobytes())
+
+def trim_non_speech(audio_path: str, work_dir: str,
+                    cancel_token: Optional[CancellationToken] = None) -> Tuple[str, Optional[OffsetMap]]:
+    """
+    Remove long non-speech stretches (intros, music beds, dead air) from the ASR input.
+
+    The audio is decoded as a stream. The kept spans are concatenated and
+    encoded as Opus, which is much smaller to upload than the source audio.
+
+    Args:
+        audio_path (str): Source audio
+        work_dir (str): Directory for the trimmed file
+        cancel_token (Optional[CancellationToken]): Token that stops decoding and encoding
+
+    Returns:
+        Tuple[str, Optional[OffsetMap]]: (ASR input, map back to the source timeline); the source
+            itself and None if too little would be removed
+    """
+    from src.audio_mix import decode_audio_stream
+
+    logger = logging.getLogger('yt_germanizer')
+    name = os.path.splitext(os.path.basename(audio_path))[0]
+    full_path = os.path.join(work_dir, f"{name}_vad_full.wav")
+    trimmed_wav = os.path.join(work_dir, f"{name}_vad.wav")
+    try:
+        # One pass: frame features plus a 16 kHz copy to cut the kept spans from
+        levels, shares = [], []
+        carry = np.zeros(0, dtype=np.float32)
+        with wave.open(full_path, 'wb') as full:
+            full.setnchannels(1)
+            full.setsampwidth(2)
+            full.setframerate(SAMPLE_RATE)
+            for chunk in decode_audio_stream(audio_path, SAMPLE_RATE, 1, SAMPLE_RATE * 60, cancel_token):
+                full.writeframes((np.clip(chunk[:, 0], -1.0, 1.0) * 32767).astype('<i2').tobytes())
+                data = np.concatenate([carry, chunk[:, 0]])
+                usable = len(data) - len(data) % FRAME
+                if usable:
+                    level_db, band_share = frame_features(data[:usable])
+                    levels.append(level_db)
+                    shares.append(band_share)
+                carry = data[usable:]
+        if not levels:
+            return audio_path, None
+
+        spans = speech_spans(np.concatenate(levels), np.concatenate(shares))
+        total_ms = sum(len(level_db) for level_db in levels) * FRAME_MS
+        offsets = OffsetMap.from_spans(spans)
+        if not spans or offsets.trimmed_ms > total_ms * (1 - config.VAD_MIN_SAVING):
+            logger.info("Voice activity trimming skipped: little non-speech audio found")
+            return audio_path, None
+
+        _write_spans(full_path, trimmed_wav, spans)
+        output_path = os.path.join(work_dir, f"{name}_vad.ogg")
+        process = run_process(['ffmpeg', '-y', '-i', trimmed_wav, '-c:a', 'libopus', '-b:a', config.VAD_BITRATE,
+                               '-application', 'voip', output_path], cancel_token)
+        if process.returncode != 0:
+            raise Exception(f"FFmpeg error: {process.stderr}")
+        logger.info(f"Voice activity trimming: {offsets.trimmed_ms / 1000:.0f} s of {total_ms / 1000:.0f} s "
+                    f"kept for transcription ({len(spans)} spans)")
+        return output_path, offsets
+    finally:
+        for path in (full_path, trimmed_wav):
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,19 +1,221 @@
-from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, concatenate_audioclips
-from pydub import AudioSegment
 import os
+import shutil
 import logging
-import subprocess
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional, Tuple
 import yt_dlp
+from src.cancellation import CancellationToken, JobCancelled, check_cancelled, run_process
+from src.media_probe import get_duration
+from src.audio_mix import mix_soundtrack
+from src.utils import clean_filename
+from src.audio_processing import acquisition_profile, download_options, partial_download_lock
+from src import metrics
+from src import config
 
-def sync_audio_with_video(video_url: str, tts_segments: List[Dict], output_dir: str) -> str:
+def build_mux_command(video_path: str, audio_path: str, output_path: str,
+                      subtitle_tracks: Optional[List[Dict]] = None,
+                      keep_original_audio: bool = False,
+                      original_audio_stream: str = '0:a:0?',
+                      original_audio_path: Optional[str] = None) -> List[str]:
+    """
+    Build the single FFmpeg command that muxes the dub, optional original audio
+    and soft subtitle tracks into the output without re-encoding the video.
+    
+    Args:
+        video_path (str): Path to the source video (its video stream is copied)
+        audio_path (str): Path to the dubbed German audio
+        output_path (str): Path of the output MP4
+        subtitle_tracks (Optional[List[Dict]]): Subtitle files with 'path', 'language'
+            (ISO 639-2, e.g. 'ger') and 'title' keys, muxed as mov_text
+        keep_original_audio (bool): Add the source audio as a second, non-default track
+        original_audio_stream (str): FFmpeg stream specifier of the original audio
+            (e.g. '0:a:1?' when video_path is a previous output)
+        original_audio_path (Optional[str]): Separate file with the original audio, for a
+            video-only source (overrides original_audio_stream)
+        
+    Returns:
+        List[str]: FFmpeg command
+    """
+    subtitle_tracks = subtitle_tracks or []
+    
+    cmd = ['ffmpeg', '-y', '-i', video_path, '-i', audio_path]
+    for track in subtitle_tracks:
+        cmd += ['-i', track['path']]
+    if keep_original_audio and original_audio_path:
+        cmd += ['-i', original_audio_path]
+        original_audio_stream = f'{len(subtitle_tracks) + 2}:a:0'
+    
+    # Stream selection: video, dub, optional original audio, subtitles
+    cmd += ['-map', '0:v:0', '-map', '1:a:0']
+    if keep_original_audio:
+        cmd += ['-map', original_audio_stream]
+    for i in range(len(subtitle_tracks)):
+        cmd += ['-map', f'{i + 2}:s:0']
+    
+    # Codecs: copy video and original audio, encode the dub, convert subtitles to mov_text
+    cmd += ['-c:v', 'copy', '-c:a:0', 'aac', '-strict', 'experimental']
+    if keep_original_audio:
+        cmd += ['-c:a:1', 'copy']
+    if subtitle_tracks:
+        cmd += ['-c:s', 'mov_text']
+    
+    # Track metadata so players label and select tracks correctly
+    cmd += ['-metadata:s:a:0', 'language=ger', '-metadata:s:a:0', 'title=Deutsch', '-disposition:a:0', 'default']
+    if keep_original_audio:
+        cmd += ['-metadata:s:a:1', 'title=Original', '-disposition:a:1', '0']
+    for i, track in enumerate(subtitle_tracks):
+        cmd += [f'-metadata:s:s:{i}', f"language={track.get('language', 'und')}"]
+        if track.get('title'):
+            cmd += [f'-metadata:s:s:{i}', f"title={track['title']}"]
+    
+    cmd.append(output_path)
+    return cmd
+
+def download_video(video_url: str, output_dir: str,
+                   cancel_token: Optional[CancellationToken] = None,
+                   with_audio: bool = True) -> Tuple[str, str]:
+    """
+    Get the source video: download it from YouTube, or use a local file in place.
+    
+    Args:
+        video_url (str): URL of the YouTube video, or path to a local video file
+        output_dir (str): Directory for the downloaded video
+        cancel_token (Optional[CancellationToken]): Token that aborts the download
+        with_audio (bool): Whether the original audio is needed from the video; if not,
+            profiles with 'video_only' fetch the video stream alone
+    
+    Returns:
+        Tuple[str, str]: (video path, video ID)
+    """
+    if os.path.isfile(video_url):
+        # Uploaded or local video: use it in place and never delete it
+        return video_url, clean_filename(os.path.splitext(os.path.basename(video_url))[0])
+    
+    logger = logging.getLogger('yt_germanizer')
+    profile = acquisition_profile()
+    video_only = profile['video_only'] and not with_audio
+    logger.info("Downloading video stream..." if video_only else "Downloading video...")
+    ydl_opts = download_options(output_dir, cancel_token)
+    ydl_opts.update({
+        # A progressive MP4 carries its own audio; video-only formats are usually smaller and DASH-fragmented
+        'format': profile['video_format'] if video_only else 'best[ext=mp4]',
+        'quiet': True,
+        'no_warnings': True,
+    })
+    
+    with partial_download_lock(video_url, ydl_opts['format'], cancel_token), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with metrics.external_call('youtube'):
+            info = ydl.extract_info(video_url, download=True)
+        video_id = info['id']
+        video_path = ydl.prepare_filename(info)
+    metrics.add_file_bytes('video_download', video_path)
+    return video_path, video_id
+
+class VideoPrefetch:
+    """
+    Downloads the source video in a background thread while the rest of the job runs.
+    
+    The download has its own cancellation token, so a job that fails elsewhere
+    can stop it without cancelling the job. Use it as a context manager (or call
+    close()) so the download is stopped when the job ends.
+    """
+    
+    def __init__(self, video_url: str, output_dir: str,
+                 cancel_token: Optional[CancellationToken] = None, with_audio: bool = True):
+        """
+        Start the download.
+        
+        Args:
+            video_url (str): URL of the YouTube video, or path to a local video file
+            output_dir (str): Directory for the downloaded video
+            cancel_token (Optional[CancellationToken]): The job's token; result() raises
+                JobCancelled once it is cancelled
+            with_audio (bool): Whether the original audio is needed from the video
+                (see download_video())
+        """
+        self.cancel_token = cancel_token
+        self._token = CancellationToken()
+        self._video: Optional[Tuple[str, str]] = None
+        self._error: Optional[Exception] = None
+        self._thread = threading.Thread(target=self._run, args=(video_url, output_dir, with_audio),
+                                        name='video-prefetch', daemon=True)
+        self._thread.start()
+    
+    def _run(self, video_url: str, output_dir: str, with_audio: bool):
+        try:
+            with metrics.STAGE_SECONDS.time(stage='video_download'):
+                self._video = download_video(video_url, output_dir, cancel_token=self._token,
+                                             with_audio=with_audio)
+        except Exception as e:
+            self._error = e
+    
+    def __enter__(self) -> 'VideoPrefetch':
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+    
+    @property
+    def done(self) -> bool:
+        """Whether the download has finished or failed."""
+        return not self._thread.is_alive()
+    
+    def result(self) -> Tuple[str, str]:
+        """
+        Wait for the download.
+        
+        Returns:
+            Tuple[str, str]: (video path, video ID), as from download_video()
+        
+        Raises:
+            JobCancelled: If the job is cancelled while waiting
+        """
+        while self._thread.is_alive():
+            self._thread.join(timeout=0.5)
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                self.close()
+        check_cancelled(self.cancel_token)
+        if self._error is not None:
+            raise Exception(f"Video download error: {str(self._error)}")
+        return self._video
+    
+    def close(self):
+        """Stop the download if it is still running and give the thread a moment to exit."""
+        self._token.cancel()
+        # The thread is a daemon and checks its token at least every half second; never block the job on it
+        self._thread.join(timeout=1.0)
+
+def sync_audio_with_video(video_url: str, tts_segments: List[Dict], output_dir: str,
+                          cancel_token: Optional[CancellationToken] = None,
+                          subtitle_tracks: Optional[List[Dict]] = None,
+                          keep_original_audio: bool = False,
+                          mix_mode: str = config.MIX_MODE,
+                          work_dir: Optional[str] = None,
+                          render_dir: Optional[str] = None,
+                          video: Optional[Tuple[str, str]] = None,
+                          original_audio: Optional[str] = None) -> str:
     """
     Synchronize TTS audio segments with the original video.
     
     Args:
-        video_url (str): URL of the YouTube video
+        video_url (str): URL of the YouTube video, or path to a local video file
         tts_segments (List[Dict]): List of TTS segments with timing information
         output_dir (str): Directory to save the output video
+        cancel_token (Optional[CancellationToken]): Token that aborts the download, mix and FFmpeg run
+        subtitle_tracks (Optional[List[Dict]]): Subtitle files to mux as soft tracks
+            (see build_mux_command)
+        keep_original_audio (bool): Keep the original audio as a second audio track
+        mix_mode (str): 'duck' to keep the original music and effects under the dub,
+            'replace' for the dub alone
+        work_dir (Optional[str]): Directory for the downloaded video and mixed soundtrack
+            (default: output_dir)
+        render_dir (Optional[str]): Keep the mixed soundtrack (and in 'duck' mode the original
+            audio) here for incremental re-renders (see rerender.py)
+        video (Optional[Tuple[str, str]]): (video path, video ID) from download_video(),
+            if the video was already fetched (the caller then owns the file)
+        original_audio (Optional[str]): Downloaded source audio to use as the original audio,
+            so only the video stream has to be fetched (see download_video())
         
     Returns:
         str: Path to the synchronized video file
@@ -23,67 +225,72 @@ def sync_audio_with_video(video_url: str, tts_segments: List[Dict], output_dir:
     try:
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
+        work_dir = work_dir or output_dir
+        os.makedirs(work_dir, exist_ok=True)
         
-        # Download video using yt-dlp
-        logger.info("Downloading video...")
-        ydl_opts = {
-            'format': 'best[ext=mp4]',
-            'outtmpl': os.path.join(output_dir, '%(id)s.%(ext)s'),
-            'quiet': True,
-            'no_warnings': True,
-        }
+        is_local = os.path.isfile(video_url)
+        video_path, video_id = video or download_video(video_url, work_dir, cancel_token=cancel_token,
+                                                       with_audio=original_audio is None)
+        source_audio = original_audio or video_path
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=True)
-            video_path = os.path.join(output_dir, f"{info['id']}.mp4")
-        
-        # Create a composite audio track
+        # Create a composite audio track, keeping the ducked original audio in 'duck' mode
         logger.info("Creating composite audio track...")
-        final_audio = AudioSegment.silent(duration=int(VideoFileClip(video_path).duration * 1000))
-        
-        # Add each TTS segment at the correct time
-        for segment in tts_segments:
-            # Load TTS audio
-            tts_audio = AudioSegment.from_mp3(segment['audio_path'])
-            
-            # Add to final audio at the correct position
-            position_ms = int(segment['start'])
-            final_audio = final_audio.overlay(tts_audio, position=position_ms)
-        
-        # Export the final audio
-        temp_audio_path = os.path.join(output_dir, "temp_final_audio.mp3")
-        final_audio.export(temp_audio_path, format="mp3")
+        video_duration = get_duration(video_path, cancel_token=cancel_token)
+        temp_audio_path = os.path.join(work_dir, "temp_final_audio.wav")
+        with metrics.STAGE_SECONDS.time(stage='mix'):
+            mix_soundtrack(
+                tts_segments,
+                temp_audio_path,
+                video_duration,
+                background_path=source_audio if mix_mode == 'duck' else None,
+                cancel_token=cancel_token
+            )
         
         # Create the final video with synchronized audio using FFmpeg
         logger.info("Creating final video...")
-        output_path = os.path.join(output_dir, f"{info['id']}_german.mp4")
+        output_path = os.path.join(output_dir, f"{video_id}_german.mp4")
         
-        # FFmpeg command to combine video and audio
-        cmd = [
-            'ffmpeg', '-y',
-            '-i', video_path,
-            '-i', temp_audio_path,
-            '-c:v', 'copy',
-            '-c:a', 'aac',
-            '-strict', 'experimental',
-            '-map', '0:v:0',
-            '-map', '1:a:0',
-            output_path
-        ]
+        # FFmpeg command to combine video, audio and subtitles in one pass
+        cmd = build_mux_command(
+            video_path,
+            temp_audio_path,
+            output_path,
+            subtitle_tracks=subtitle_tracks,
+            keep_original_audio=keep_original_audio,
+            original_audio_path=original_audio
+        )
         
-        # Run FFmpeg command
-        process = subprocess.run(cmd, capture_output=True, text=True)
+        # Run FFmpeg command (killed immediately if the job is cancelled)
+        with metrics.STAGE_SECONDS.time(stage='mux'):
+            process = run_process(cmd, cancel_token)
         if process.returncode != 0:
             raise Exception(f"FFmpeg error: {process.stderr}")
+        metrics.add_file_bytes('output', output_path)
+        
+        # Keep what an incremental re-render needs before the downloaded video is removed
+        if render_dir:
+            os.makedirs(render_dir, exist_ok=True)
+            shutil.move(temp_audio_path, os.path.join(render_dir, 'soundtrack.wav'))
+            if mix_mode == 'duck':
+                process = run_process(
+                    ['ffmpeg', '-y', '-i', source_audio, '-vn', '-map', '0:a:0', '-c:a', 'copy',
+                     os.path.join(render_dir, 'background.mka')],
+                    cancel_token
+                )
+                if process.returncode != 0:
+                    raise Exception(f"FFmpeg error: {process.stderr}")
         
         # Clean up temporary files
         if os.path.exists(temp_audio_path):
             os.remove(temp_audio_path)
-        if os.path.exists(video_path):
+        if video is None and not is_local and os.path.exists(video_path):
             os.remove(video_path)
         
         return output_path
         
+    except JobCancelled:
+        raise
     except Exception as e:
+        check_cancelled(cancel_token)
         logger.error(f"Error synchronizing video: {str(e)}")
         raise Exception(f"Video synchronization error: {str(e)}")
@@ -0,0 +1,224 @@
+import wave
+import numpy as np
+from typing import Dict, List
+
+# Frame size and overlap for the phase-vocoder time stretch used by the pitch shifter
+PITCH_FRAME_LENGTH = 1024
+PITCH_OVERLAP = 4
+
+# Spectral tilt pivot and limits for the EQ stage
+EQ_PIVOT_HZ = 1000.0
+EQ_MIN_HZ = 50.0
+EQ_MAX_GAIN_DB = 12.0
+
+def _hann(length: int) -> np.ndarray:
+    """Periodic Hann window used for analysis and synthesis frames."""
+    return (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(length) / length)).astype(np.float32)
+
+def _resample_linear(samples: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Read samples at fractional positions along the last axis using linear interpolation.
+
+    Args:
+        samples (np.ndarray): Audio of shape (..., n)
+        positions (np.ndarray): Fractional read positions in [0, n - 1]
+
+    Returns:
+        np.ndarray: Interpolated audio of shape (..., len(positions))
+    """
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, samples.shape[-1] - 1)
+    frac = (positions - lower).astype(np.float32)
+    return samples[..., lower] * (1.0 - frac) + samples[..., upper] * frac
+
+def _overlap_add(frames: np.ndarray, window: np.ndarray) -> np.ndarray:
+    """
+    Overlap-add frames spaced by a quarter of their length, normalized by the window energy.
+
+    Args:
+        frames (np.ndarray): Frames of shape (..., n_frames, frame_length)
+        window (np.ndarray): Synthesis window of length frame_length
+
+    Returns:
+        np.ndarray: Audio of shape (..., (n_frames + PITCH_OVERLAP - 1) * hop)
+    """
+    n_frames, frame_length = frames.shape[-2:]
+    hop = frame_length // PITCH_OVERLAP
+    n_blocks = n_frames + PITCH_OVERLAP - 1
+
+    # Each output block is the sum of PITCH_OVERLAP frame chunks
+    chunks = frames.reshape(frames.shape[:-1] + (PITCH_OVERLAP, hop))
+    window_chunks = (window ** 2).reshape(PITCH_OVERLAP, hop)
+    output = np.zeros(frames.shape[:-2] + (n_blocks, hop), dtype=np.float32)
+    norm = np.zeros((n_blocks, hop), dtype=np.float32)
+    for k in range(PITCH_OVERLAP):
+        output[..., k:k + n_frames, :] += chunks[..., :, k, :]
+        norm[k:k + n_frames, :] += window_chunks[k]
+
+    output = output.reshape(frames.shape[:-2] + (-1,))
+    return output / np.maximum(norm.reshape(-1), 1e-3)
+
+def time_stretch(samples: np.ndarray, ratio: float, frame_length: int = PITCH_FRAME_LENGTH) -> np.ndarray:
+    """
+    Stretch audio by a ratio without changing pitch using a phase vocoder.
+
+    Framing, FFTs and phase accumulation (a cumulative sum over frames) are
+    all whole-array operations, so there is no per-sample or per-frame loop.
+
+    Args:
+        samples (np.ndarray): Audio of shape (..., n)
+        ratio (float): Output length divided by input length
+        frame_length (int): Analysis frame length in samples
+
+    Returns:
+        np.ndarray: Stretched audio of shape (..., round(n * ratio))
+    """
+    n = samples.shape[-1]
+    hop = frame_length // PITCH_OVERLAP
+    target_length = int(round(n * ratio))
+
+    # Short-time Fourier transform, padded so every frame reads a full window
+    pad = [(0, 0)] * (samples.ndim - 1) + [(0, frame_length + hop)]
+    padded = np.pad(samples, pad)
+    n_frames = n // hop + 2
+    window = _hann(frame_length)
+    starts = np.arange(n_frames) * hop
+    spectrum = np.fft.rfft(padded[..., starts[:, None] + np.arange(frame_length)] * window, axis=-1)
+
+    # Fractional input frame for every output frame
+    steps = np.arange(0, n_frames - 1, 1.0 / ratio)
+    index = steps.astype(np.int64)
+    alpha = (steps - index)[:, None].astype(np.float32)
+    current = spectrum[..., index, :]
+    following = spectrum[..., index + 1, :]
+    magnitude = (1.0 - alpha) * np.abs(current) + alpha * np.abs(following)
+
+    # Accumulate the measured phase advance of each bin across output frames
+    expected = 2 * np.pi * hop * np.arange(spectrum.shape[-1]) / frame_length
+    deviation = np.angle(following) - np.angle(current) - expected
+    deviation -= 2 * np.pi * np.round(deviation / (2 * np.pi))
+    increments = expected + deviation
+    phase = np.angle(spectrum[..., :1, :]) + np.cumsum(increments, axis=-2) - increments
+
+    frames = np.fft.irfft(magnitude * np.exp(1j * phase), n=frame_length, axis=-1).astype(np.float32)
+    output = _overlap_add(frames * window, window)
+    if output.shape[-1] < target_length:
+        pad = [(0, 0)] * (output.ndim - 1) + [(0, target_length - output.shape[-1])]
+        output = np.pad(output, pad)
+    return output[..., :target_length]
+
+def pitch_shift(samples: np.ndarray, semitones: float, frame_length: int = PITCH_FRAME_LENGTH) -> np.ndarray:
+    """
+    Shift the pitch of audio by a number of semitones while keeping its duration.
+
+    Args:
+        samples (np.ndarray): Audio of shape (..., n)
+        semitones (float): Pitch shift in semitones (positive is higher)
+        frame_length (int): Analysis frame length in samples
+
+    Returns:
+        np.ndarray: Pitch-shifted audio with the same shape as the input
+    """
+    if semitones == 0 or samples.shape[-1] < 2:
+        return samples
+
+    ratio = 2.0 ** (semitones / 12.0)
+    stretched = time_stretch(samples, ratio, frame_length)
+
+    # Play the stretched audio back faster (or slower) to restore the duration
+    n = samples.shape[-1]
+    positions = np.minimum(np.arange(n) * ratio, stretched.shape[-1] - 1)
+    return _resample_linear(stretched, positions)
+
+def apply_eq_tilt(samples: np.ndarray, sample_rate: int, tilt_db: float) -> np.ndarray:
+    """
+    Apply a spectral tilt around EQ_PIVOT_HZ to brighten or darken a voice.
+
+    Args:
+        samples (np.ndarray): Audio of shape (..., n)
+        sample_rate (int): Sample rate in Hz
+        tilt_db (float): Gain change in dB per octave above the pivot
+
+    Returns:
+        np.ndarray: Equalized audio with the same shape as the input
+    """
+    if tilt_db == 0 or samples.shape[-1] < 2:
+        return samples
+
+    n = samples.shape[-1]
+    freqs = np.fft.rfftfreq(n, d=1.0 / sample_rate)
+    gain_db = tilt_db * np.log2(np.maximum(freqs, EQ_MIN_HZ) / EQ_PIVOT_HZ)
+    gain = 10.0 ** (np.clip(gain_db, -EQ_MAX_GAIN_DB, EQ_MAX_GAIN_DB) / 20.0)
+    spectrum = np.fft.rfft(samples, axis=-1) * gain
+    return np.fft.irfft(spectrum, n=n, axis=-1).astype(np.float32)
+
+def apply_voice_profile(samples: np.ndarray, sample_rate: int, profile: Dict[str, float]) -> np.ndarray:
+    """
+    Apply the pitch and EQ settings of a voice profile to synthesized audio.
+
+    Args:
+        samples (np.ndarray): Float audio in [-1, 1] of shape (n,) or (batch, n)
+        sample_rate (int): Sample rate in Hz
+        profile (Dict[str, float]): Voice profile with optional 'pitch' and 'eq_tilt' keys
+
+    Returns:
+        np.ndarray: Processed audio clipped to [-1, 1]
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    pitch = profile.get('pitch', 0)
+    tilt = profile.get('eq_tilt', 0)
+    if not pitch and not tilt:
+        return samples
+
+    processed = pitch_shift(samples, pitch)
+    processed = apply_eq_tilt(processed, sample_rate, tilt)
+    return np.clip(processed, -1.0, 1.0)
+
+def apply_voice_profile_batch(segments: List[np.ndarray], sample_rate: int, profile: Dict[str, float]) -> List[np.ndarray]:
+    """
+    Apply one voice profile to several segments in a single padded array pass.
+
+    Args:
+        segments (List[np.ndarray]): 1-D float audio arrays
+        sample_rate (int): Sample rate in Hz
+        profile (Dict[str, float]): Voice profile with optional 'pitch' and 'eq_tilt' keys
+
+    Returns:
+        List[np.ndarray]: Processed segments with their original lengths
+    """
+    if not segments:
+        return []
+    if not profile.get('pitch', 0) and not profile.get('eq_tilt', 0):
+        return [np.asarray(segment, dtype=np.float32) for segment in segments]
+
+    lengths = [len(segment) for segment in segments]
+    batch = np.zeros((len(segments), max(lengths)), dtype=np.float32)
+    for i, segment in enumerate(segments):
+        batch[i, :lengths[i]] = segment
+
+    # The tilt is a whole-signal FFT, so it runs on each trimmed segment: over the
+    # padded length it would smear the silence into the segment and change the result
+    shifted = pitch_shift(batch, profile.get('pitch', 0))
+    tilt = profile.get('eq_tilt', 0)
+    return [np.clip(apply_eq_tilt(shifted[i, :length], sample_rate, tilt), -1.0, 1.0)
+            for i, length in enumerate(lengths)]
+
+def write_wav(path: str, samples: np.ndarray, sample_rate: int) -> str:
+    """
+    Write float audio in [-1, 1] to a 16-bit mono WAV file.
+
+    Args:
+        path (str): Output file path
+        samples (np.ndarray): 1-D float audio
+        sample_rate (int): Sample rate in Hz
+
+    Returns:
+        str: Path to the written file
+    """
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm.tobytes())
+    return path
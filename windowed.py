@@ -0,0 +1,428 @@
+import os
+import math
+import time
+import queue
+import shutil
+import wave
+import logging
+import threading
+from functools import partial
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.cancellation import CancellationToken, JobCancelled, check_cancelled, run_process
+from src.segments import SegmentTable
+from src.utils import clean_filename, get_video_id, translate_segments
+from src.workspace import JobWorkspace
+from src import metrics
+from src import config
+
+# Transcription input: mono 16 kHz is all the ASR needs and keeps uploads small
+ASR_SAMPLE_RATE = 16000
+# Frame length for finding a quiet point to cut a window at
+CUT_FRAME_SECONDS = 0.05
+
+class AudioWindow:
+    """
+    A slice of the source audio, decoded at the mix sample rate (stereo float32).
+    """
+
+    def __init__(self, index: int, start: float, samples: np.ndarray, sample_rate: int):
+        self.index = index
+        self.start = start
+        self.samples = samples
+        self.sample_rate = sample_rate
+        self.read_at = time.monotonic()
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+
+def quiet_cut(samples: np.ndarray, sample_rate: int, earliest: int, latest: int) -> int:
+    """
+    Find the quietest point between two frame positions, so windows rarely split a word.
+
+    Args:
+        samples (np.ndarray): Audio of shape (frames, channels)
+        sample_rate (int): Sample rate in Hz
+        earliest (int): First allowed cut position (frames)
+        latest (int): Last allowed cut position (frames)
+
+    Returns:
+        int: Cut position in frames
+    """
+    frame = max(int(sample_rate * CUT_FRAME_SECONDS), 1)
+    count = (latest - earliest) // frame
+    if count < 1:
+        return latest
+    region = samples[earliest:earliest + count * frame].mean(axis=1).reshape(count, frame)
+    energy = np.mean(region ** 2, axis=1)
+    return earliest + int(np.argmin(energy)) * frame + frame // 2
+
+def resolve_source(source: str, follow: bool = False) -> Tuple[str, List[str], bool]:
+    """
+    Get an FFmpeg input for a source without downloading it.
+
+    Args:
+        source (str): Local media file (possibly still being written), or a YouTube URL (VOD or live)
+        follow (bool): Keep reading a local file as it grows until it stops growing
+
+    Returns:
+        Tuple[str, List[str], bool]: (FFmpeg input, extra input options, whether it is a live stream)
+    """
+    if os.path.exists(source):
+        if not follow:
+            return source, [], False
+        # The file protocol waits for appended data; rw_timeout ends the stream once writing stops
+        timeout_us = str(int(config.WINDOW_FOLLOW_TIMEOUT * 1000000))
+        return f"file:{os.path.abspath(source)}", ['-follow', '1', '-rw_timeout', timeout_us], False
+
+    import yt_dlp
+    with yt_dlp.YoutubeDL({'format': 'bestaudio/best', 'quiet': True, 'no_warnings': True}) as ydl:
+        with metrics.external_call('youtube'):
+            info = ydl.extract_info(source, download=False)
+    input_args = []
+    headers = info.get('http_headers') or {}
+    if headers:
+        input_args += ['-headers', ''.join(f"{key}: {value}\r\n" for key, value in headers.items())]
+    return info['url'], input_args, bool(info.get('is_live'))
+
+def read_windows(path: str, input_args: List[str], window_seconds: float = config.WINDOW_SECONDS,
+                 sample_rate: int = config.MIX_SAMPLE_RATE,
+                 cancel_token: Optional[CancellationToken] = None) -> Iterator[AudioWindow]:
+    """
+    Decode a source as it arrives and cut it into windows at quiet points.
+
+    Only the current window is held in memory, however long the source is.
+
+    Args:
+        path (str): FFmpeg input (see resolve_source())
+        input_args (List[str]): Extra FFmpeg input options
+        window_seconds (float): Target window length
+        sample_rate (int): Decode sample rate
+        cancel_token (Optional[CancellationToken]): Token that kills FFmpeg on cancel
+
+    Yields:
+        AudioWindow: Consecutive windows; the last one may be shorter
+    """
+    from src.audio_mix import decode_audio_stream
+
+    window_frames = int(window_seconds * sample_rate)
+    search_frames = int(min(config.WINDOW_CUT_SEARCH_SECONDS, window_seconds / 2) * sample_rate)
+    parts, buffered, position, index = [], 0, 0, 0
+    for chunk in decode_audio_stream(path, sample_rate, 2, sample_rate, cancel_token, input_args=input_args):
+        parts.append(chunk)
+        buffered += len(chunk)
+        while buffered >= window_frames:
+            data = np.concatenate(parts)
+            cut = quiet_cut(data, sample_rate, window_frames - search_frames, window_frames)
+            # Cut on a 10 ms grid so window starts are exact in segment (millisecond) time
+            cut -= cut % max(sample_rate // 100, 1)
+            yield AudioWindow(index, position / sample_rate, data[:cut], sample_rate)
+            parts, buffered = [data[cut:]], len(data) - cut
+            position += cut
+            index += 1
+    if buffered:
+        yield AudioWindow(index, position / sample_rate, np.concatenate(parts), sample_rate)
+
+def _write_pcm(path: str, samples: np.ndarray, sample_rate: int):
+    """Write float audio of shape (frames, channels) as 16-bit WAV."""
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(samples.shape[1])
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype('<i2').tobytes())
+
+class WindowedDubber:
+    """
+    Dubs a source window by window: transcribe, translate, synthesize and mix
+    each window, then append it to an HLS playlist of the German audio.
+
+    Speech that runs past a window's end is carried into the next window's
+    mix. The playlist is published once delay_seconds of dubbed audio are
+    buffered, so playback does not stall when a window takes longer than usual.
+    """
+
+    def __init__(self, api_key: str, output_dir: str, workspace: JobWorkspace,
+                 delay_seconds: float = config.WINDOW_DELAY_SECONDS, mix_mode: str = config.MIX_MODE,
+                 cancel_token: Optional[CancellationToken] = None,
+                 progress_callback: Optional[Callable[[str, float, str], None]] = None,
+                 transcriber: Optional[Callable[..., SegmentTable]] = None,
+                 translator: Optional[Callable[..., SegmentTable]] = None):
+        """
+        Initialize the dubber.
+
+        Args:
+            api_key (str): AssemblyAI API key
+            output_dir (str): Directory for the playlist, fragments and full soundtrack
+            workspace (JobWorkspace): Workspace for per-window files
+            delay_seconds (float): Dubbed audio buffered before the playlist is published
+            mix_mode (str): 'duck' keeps the original audio under the dub, 'replace' drops it
+            cancel_token (Optional[CancellationToken]): Token checked in every stage
+            progress_callback (Optional[Callable[[str, float, str], None]]): Called with
+                (stage, fraction, message) within each window
+            transcriber (Optional[Callable[..., SegmentTable]]): Called as transcriber(api_key, audio_path,
+                cancel_token=...) instead of the AssemblyAI backend; must allow windows without speech
+            translator (Optional[Callable[..., SegmentTable]]): Called as translator(segments,
+                cancel_token=...) instead of Google Translate
+        """
+        self.api_key = api_key
+        self.output_dir = Path(output_dir)
+        self.workspace = workspace
+        self.delay_seconds = delay_seconds
+        self.mix_mode = mix_mode
+        self.cancel_token = cancel_token
+        self.progress_callback = progress_callback
+        self.transcriber = transcriber
+        self.translator = translator or translate_segments
+        self.playlist_path = str(self.output_dir / 'index.m3u8')
+        self.soundtrack_path = str(Path(workspace.input_dir) / 'soundtrack.wav')
+        self.durations: List[float] = []
+        self.latencies: List[float] = []
+        self.target_duration = int(math.ceil(config.WINDOW_SECONDS)) + 1
+        self._carried: List[Dict] = []
+        self._published = False
+        self._soundtrack = None  # SoundtrackWriter, opened with the first window
+
+    def _report(self, stage: str, fraction: float, message: str):
+        check_cancelled(self.cancel_token)
+        if self.progress_callback:
+            self.progress_callback(stage, fraction, message)
+
+    def process(self, window: AudioWindow) -> str:
+        """
+        Dub one window and append it to the playlist.
+
+        Args:
+            window (AudioWindow): Next window of the source
+
+        Returns:
+            str: Path of the window's fragment
+        """
+        from src.pipeline import synthesize_segments
+        from src.audio_mix import mix_window, resample, segment_duration_ms
+
+        logger = logging.getLogger('yt_germanizer')
+        work_dir = Path(self.workspace.input_dir)
+        offset_ms = int(round(window.start * 1000))
+
+        # ASR input: mono 16 kHz; background for the mix: the window itself
+        asr_path = str(work_dir / 'window_asr.wav')
+        mono = resample(window.samples.mean(axis=1), window.sample_rate, ASR_SAMPLE_RATE)
+        _write_pcm(asr_path, mono[:, None], ASR_SAMPLE_RATE)
+        background_path = None
+        if self.mix_mode == 'duck':
+            background_path = str(work_dir / 'window_background.wav')
+            _write_pcm(background_path, window.samples, window.sample_rate)
+
+        transcribe = self.transcriber
+        if transcribe is None:
+            from src.transcription import transcribe_audio
+            # A window may hold no speech at all
+            transcribe = partial(transcribe_audio, allow_empty=True)
+
+        self._report('transcribe', 0.0, f"Transcribing window {window.index}...")
+        with metrics.STAGE_SECONDS.time(stage='transcribe'):
+            transcription = transcribe(self.api_key, asr_path, cancel_token=self.cancel_token).shifted(offset_ms)
+        self._report('translate', 0.0, f"Translating {len(transcription)} segments...")
+        with metrics.STAGE_SECONDS.time(stage='translate'):
+            translated = self.translator(transcription, cancel_token=self.cancel_token)
+        tts_segments = synthesize_segments(translated, self._report, str(self.workspace.tts_dir),
+                                           cancel_token=self.cancel_token)
+
+        # Mix this window with speech carried over from earlier windows, on the window's own timeline
+        self._report('sync', 0.0, f"Mixing window {window.index}...")
+        segments = self._carried + [dict(segment) for segment in tts_segments]
+        mix_path = str(work_dir / 'window_mix.wav')
+        with metrics.STAGE_SECONDS.time(stage='mix'):
+            mix_window(SegmentTable.from_dicts(segments).shifted(-offset_ms), mix_path, 0.0, window.duration,
+                       background_path=background_path, cancel_token=self.cancel_token)
+        fragment_path = self._write_fragment(window, mix_path)
+        self._append_soundtrack(mix_path)
+
+        # Keep only speech (and its ducking release) that reaches into the next window
+        window_end_ms = (window.start + window.duration) * 1000.0
+        carried = []
+        for segment in segments:
+            if segment['start'] + segment_duration_ms(segment) + config.DUCK_RELEASE_MS > window_end_ms:
+                carried.append(segment)
+            elif os.path.exists(segment['audio_path']):
+                os.remove(segment['audio_path'])
+        self._carried = carried
+
+        latency = time.monotonic() - window.read_at
+        self.latencies.append(latency)
+        logger.info(f"Window {window.index} ({window.start:.1f}-{window.start + window.duration:.1f} s, "
+                    f"{len(tts_segments)} segments) dubbed {latency:.1f} s after it was read")
+        return fragment_path
+
+    def _write_fragment(self, window: AudioWindow, mix_path: str) -> str:
+        from src.progressive import fragment_name, write_playlist
+
+        fragment_path = str(self.output_dir / fragment_name(window.index))
+        cmd = ['ffmpeg', '-y', '-i', mix_path, '-c:a', 'aac', '-b:a', config.AUDIO_BITRATE,
+               '-output_ts_offset', f"{window.start:.6f}", '-f', 'mpegts', f"{fragment_path}.tmp"]
+        process = run_process(cmd, self.cancel_token)
+        if process.returncode != 0:
+            raise Exception(f"FFmpeg error: {process.stderr}")
+        os.replace(f"{fragment_path}.tmp", fragment_path)
+        self.durations.append(window.duration)
+        self.target_duration = max(self.target_duration, int(math.ceil(window.duration)))
+        if self._published or sum(self.durations) >= self.delay_seconds:
+            write_playlist(self.playlist_path, self.durations, self.target_duration, ended=False)
+            self._published = True
+        return fragment_path
+
+    def _append_soundtrack(self, mix_path: str):
+        from src.audio_mix import SoundtrackWriter
+
+        with wave.open(mix_path, 'rb') as mix:
+            if self._soundtrack is None:
+                # A live stream can run for many hours, past what a plain WAV header can describe
+                self._soundtrack = SoundtrackWriter(self.soundtrack_path, mix.getnchannels(), mix.getframerate())
+            self._soundtrack.writeframes(mix.readframes(mix.getnframes()))
+
+    def finish(self) -> Optional[str]:
+        """
+        End the playlist and close the full soundtrack.
+
+        Returns:
+            Optional[str]: Path of the full soundtrack WAV (None if no audio was read)
+        """
+        from src.progressive import write_playlist
+
+        write_playlist(self.playlist_path, self.durations, self.target_duration, ended=True)
+        self.close()
+        return self.soundtrack_path if os.path.exists(self.soundtrack_path) else None
+
+    def close(self):
+        """Close the full soundtrack, also after a failed window."""
+        if self._soundtrack is not None:
+            self._soundtrack.close()
+            self._soundtrack = None
+
+def _produce(windows: Iterator[AudioWindow], buffer: queue.Queue, stop: threading.Event):
+    """Read windows in the background; the bounded queue keeps memory constant."""
+    try:
+        for window in windows:
+            while not stop.is_set():
+                try:
+                    buffer.put(window, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if stop.is_set():
+                return
+        buffer.put(None)
+    except BaseException as e:
+        buffer.put(e)
+
+def run_windowed(source: str, api_key: str, follow: bool = False,
+                 window_seconds: float = config.WINDOW_SECONDS,
+                 delay_seconds: float = config.WINDOW_DELAY_SECONDS,
+                 mix_mode: str = config.MIX_MODE,
+                 cancel_token: Optional[CancellationToken] = None,
+                 progress_callback: Optional[Callable[[str, float, str], None]] = None,
+                 transcriber: Optional[Callable[..., SegmentTable]] = None,
+                 translator: Optional[Callable[..., SegmentTable]] = None) -> str:
+    """
+    Dub a live stream, a growing local file or a long video in rolling windows.
+
+    The next window is read while the current one is processed, and at most
+    WINDOW_QUEUE_SIZE windows wait in memory, so memory use does not grow with
+    the length of the source. Latency per window is its length plus the time
+    to transcribe, translate, synthesize and mix it.
+
+    Args:
+        source (str): YouTube URL (VOD or live) or local media file
+        api_key (str): AssemblyAI API key
+        follow (bool): Keep reading a local file that is still being written
+        window_seconds (float): Target window length
+        delay_seconds (float): Dubbed audio buffered before the HLS playlist is published
+        mix_mode (str): 'duck' or 'replace'
+        cancel_token (Optional[CancellationToken]): Token checked in every stage
+        progress_callback (Optional[Callable[[str, float, str], None]]): Progress within each window
+        transcriber (Optional[Callable[..., SegmentTable]]): Replaces the AssemblyAI backend (see WindowedDubber)
+        translator (Optional[Callable[..., SegmentTable]]): Replaces Google Translate (see WindowedDubber)
+
+    Returns:
+        str: The dubbed video (local sources and VODs) or German audio (live streams and audio-only files)
+    """
+    from src.video_sync import build_mux_command, download_video
+    from src.media_probe import probe_media
+
+    logger = logging.getLogger('yt_germanizer')
+    cancel_token = cancel_token or CancellationToken()
+    is_local = os.path.exists(source)
+    name = clean_filename(Path(source).stem) if is_local else get_video_id(source)
+    video_output_dir = config.OUTPUT_DIR / name
+    stream_dir = video_output_dir / 'windowed'
+    # Fragments of an earlier run would otherwise be listed alongside this run's
+    shutil.rmtree(stream_dir, ignore_errors=True)
+    stream_dir.mkdir(parents=True, exist_ok=True)
+    config.ensure_directories()
+
+    path, input_args, is_live = resolve_source(source, follow)
+    logger.info(f"Windowed dubbing of {'live stream ' if is_live else ''}{source} "
+                f"({window_seconds:.0f} s windows, {delay_seconds:.0f} s delay buffer)")
+
+    # The reader has its own token so a failed window also stops FFmpeg, without cancelling the job
+    stop, reader_token = threading.Event(), CancellationToken()
+    buffer: queue.Queue = queue.Queue(maxsize=config.WINDOW_QUEUE_SIZE)
+    reader = threading.Thread(
+        target=_produce,
+        args=(read_windows(path, input_args, window_seconds, cancel_token=reader_token), buffer, stop),
+        name='window-reader', daemon=True
+    )
+    with JobWorkspace(name, protect=[video_output_dir], keep=config.KEEP_WORKSPACES) as workspace:
+        dubber = WindowedDubber(api_key, str(stream_dir), workspace, delay_seconds=delay_seconds,
+                                mix_mode=mix_mode, cancel_token=cancel_token,
+                                progress_callback=progress_callback, transcriber=transcriber,
+                                translator=translator)
+        reader.start()
+        try:
+            while True:
+                try:
+                    item = buffer.get(timeout=0.5)
+                except queue.Empty:
+                    check_cancelled(cancel_token)
+                    continue
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                dubber.process(item)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            check_cancelled(cancel_token)
+            logger.error(f"Error in windowed dubbing: {str(e)}")
+            raise Exception(f"Windowed dubbing error: {str(e)}")
+        finally:
+            dubber.close()
+            stop.set()
+            reader_token.cancel()
+            reader.join(timeout=1.0)
+        soundtrack_path = dubber.finish()
+        if soundtrack_path is None:
+            raise Exception("Windowed dubbing error: the source had no audio")
+        if dubber.latencies:
+            logger.info(f"Window latency: median {np.median(dubber.latencies):.1f} s, "
+                        f"max {max(dubber.latencies):.1f} s")
+
+        # Full-length result: mux with the video where there is one, else keep the audio
+        if is_live or (is_local and not probe_media(source, cancel_token=cancel_token)['has_video']):
+            output_path = str(video_output_dir / f"{name}_german.m4a")
+            cmd = ['ffmpeg', '-y', '-i', soundtrack_path, '-c:a', 'aac', '-b:a', config.AUDIO_BITRATE, output_path]
+        else:
+            # The soundtrack already holds the ducked original, so only the video stream is needed
+            video_path, _ = download_video(source, str(workspace.input_dir), cancel_token=cancel_token,
+                                           with_audio=False)
+            output_path = str(video_output_dir / f"{name}_german.mp4")
+            cmd = build_mux_command(video_path, soundtrack_path, output_path)
+        process = run_process(cmd, cancel_token)
+        if process.returncode != 0:
+            raise Exception(f"Windowed dubbing error: FFmpeg error: {process.stderr}")
+    return output_path
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Worker node for distributed execution.
+
+Leases jobs and TTS batches from the shared queue at WORK_QUEUE_PATH and
+runs them. Start one per machine (or per GPU); TTS throughput grows with
+the number of workers. Usage:
+
+    WORK_QUEUE_PATH=/mnt/shared/queue.db SHARED_DIR=/mnt/shared python worker.py [--tts-only] [--status]
+"""
+import sys
+import signal
+import argparse
+import threading
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Load .env before config so its settings can be overridden from the environment
+load_dotenv(Path(__file__).parent / '.env')
+
+from src.distributed import JOB, TTS_BATCH, get_work_queue, run_worker
+from src.utils import setup_logging
+from src import config
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python worker.py', description="Run a distributed pipeline worker")
+    parser.add_argument('--tts-only', action='store_true', help="Only run TTS batches, not whole jobs")
+    parser.add_argument('--worker-id', help="Worker name (default: host name and PID)")
+    parser.add_argument('--metrics-port', type=int, help="Expose Prometheus metrics on this port")
+    parser.add_argument('--status', action='store_true', help="Print the number of tasks per state and exit")
+    args = parser.parse_args(argv)
+
+    if not config.WORK_QUEUE_PATH:
+        print("Error: Set WORK_QUEUE_PATH to the shared queue database")
+        return 1
+
+    queue = get_work_queue()
+    if args.status:
+        for status, count in sorted(queue.counts().items()):
+            print(f"{status:<10} {count}")
+        return 0
+
+    config.ensure_directories()
+    setup_logging(str(config.LOG_FILE))
+    if args.metrics_port is not None:
+        from src.metrics import start_metrics_server
+        start_metrics_server('0.0.0.0', args.metrics_port)
+
+    # Finish the current task on Ctrl+C / SIGTERM, then exit
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    kinds = [TTS_BATCH] if args.tts_only else [JOB, TTS_BATCH]
+    try:
+        run_worker(queue, kinds, worker_id=args.worker_id, stop_event=stop_event)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
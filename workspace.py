@@ -0,0 +1,332 @@
+import os
+import uuid
+import shutil
+import logging
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from src import config
+
+# Workspaces of jobs running in this process; never evicted or removed as stale
+_active: Set[Path] = set()
+# Inputs and outputs in use by running jobs, counted per job (jobs on the same video share them); skipped by eviction
+_protected: Counter = Counter()
+_lock = threading.Lock()
+
+# Subdirectory of a video's output folder where running jobs write their outputs
+STAGING_DIR_NAME = 'jobs'
+
+# Jobs for the same video publish (and re-render) one at a time, so its files always come from one run
+_output_locks: Dict[str, threading.Lock] = {}
+_output_locks_guard = threading.Lock()
+
+def _pid_alive(pid: int) -> bool:
+    """Check whether a process with the given PID is running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+def _path_size(path: Path) -> int:
+    """Get the size of a file or directory tree in bytes."""
+    try:
+        if path.is_file() or path.is_symlink():
+            return path.lstat().st_size
+        return sum(
+            os.lstat(os.path.join(directory, name)).st_size
+            for directory, _, files in os.walk(path)
+            for name in files
+        )
+    except OSError:
+        return 0
+
+def _last_used(path: Path) -> float:
+    """Get the latest access or modification time of a file or directory tree."""
+    latest = 0.0
+    try:
+        stat = path.stat()
+        latest = max(stat.st_atime, stat.st_mtime)
+        if path.is_dir():
+            for directory, _, files in os.walk(path):
+                for name in files:
+                    stat = os.stat(os.path.join(directory, name))
+                    latest = max(latest, stat.st_atime, stat.st_mtime)
+    except OSError:
+        pass
+    return latest
+
+def _remove(path: Path):
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+def scratch_root() -> Path:
+    """
+    Get the root for small, hot intermediate files.
+
+    Uses SCRATCH_DIR (e.g. /dev/shm) when it is set and has at least
+    SCRATCH_MIN_FREE_MB free, otherwise the on-disk workspace root.
+
+    Returns:
+        Path: Scratch root directory
+    """
+    if config.SCRATCH_DIR:
+        root = Path(config.SCRATCH_DIR)
+        try:
+            root.mkdir(parents=True, exist_ok=True)
+            if shutil.disk_usage(root).free >= config.SCRATCH_MIN_FREE_MB * 1024 * 1024:
+                return root
+            logging.getLogger('yt_germanizer').warning(
+                f"Scratch directory {root} is low on space, using {config.WORKSPACE_DIR}"
+            )
+        except OSError as e:
+            logging.getLogger('yt_germanizer').warning(f"Scratch directory {root} unavailable: {str(e)}")
+    return config.WORKSPACE_DIR
+
+class JobWorkspace:
+    """
+    Private working directories for one pipeline run.
+
+    Downloads and the mixed soundtrack go to an on-disk directory, the many
+    small TTS clips to a scratch directory that may live on tmpfs. Both are removed when the
+    context exits, whether the job succeeded, failed or was cancelled.
+    """
+
+    def __init__(self, name: str, protect: Optional[List[Path]] = None, keep: bool = False):
+        """
+        Initialize the workspace (directories are created on enter).
+
+        Args:
+            name (str): Human-readable part of the directory names (e.g. the video ID)
+            protect (Optional[List[Path]]): Outputs to exclude from eviction while the job runs
+            keep (bool): Keep the directories after the job for debugging
+        """
+        self.name = f"{os.getpid()}_{name}_{uuid.uuid4().hex[:8]}"
+        self.root = config.WORKSPACE_DIR / self.name
+        self.scratch = scratch_root() / self.name
+        self.protect = [Path(path).resolve() for path in (protect or [])]
+        self.keep = keep
+        self.extra: List[Path] = []
+
+    @property
+    def input_dir(self) -> Path:
+        """Directory for downloaded source media and the mixed soundtrack."""
+        return self.root / 'input'
+
+    @property
+    def tts_dir(self) -> Path:
+        """Directory for synthesized segment audio."""
+        return self.scratch / 'tts'
+
+    def add_directory(self, path: Path) -> Path:
+        """
+        Create a directory elsewhere (e.g. on a shared filesystem) that is removed with the workspace.
+
+        Args:
+            path (Path): Directory to create
+
+        Returns:
+            Path: The directory
+        """
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        self.extra.append(path)
+        return path
+
+    def staging_dir(self, output_dir: Path) -> Path:
+        """
+        Create a job-private directory for outputs that publish_outputs() later moves into output_dir.
+
+        It lives inside output_dir, so publishing is a rename on the same filesystem,
+        and concurrent jobs for the same video never write to each other's files.
+
+        Args:
+            output_dir (Path): Shared output directory of the video
+
+        Returns:
+            Path: The staging directory
+        """
+        path = self.add_directory(Path(output_dir) / STAGING_DIR_NAME / self.name)
+        with _lock:
+            _active.add(path)
+        return path
+
+    def protect_path(self, path: Path):
+        """
+        Exclude an existing file or directory from eviction until the workspace is cleaned up.
+
+        Args:
+            path (Path): Path to protect
+        """
+        path = Path(path).resolve()
+        self.protect.append(path)
+        with _lock:
+            _protected[path] += 1
+
+    def __enter__(self) -> 'JobWorkspace':
+        with _lock:
+            _active.update([self.root, self.scratch])
+            _protected.update(self.protect)
+        for directory in [self.input_dir, self.tts_dir]:
+            directory.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+        return False
+
+    def cleanup(self):
+        """Remove the workspace directories and release protected outputs."""
+        if not self.keep:
+            for directory in {self.root, self.scratch, *self.extra}:
+                _remove(directory)
+        with _lock:
+            _active.difference_update([self.root, self.scratch, *self.extra])
+            # Another job on the same video may still hold the same outputs
+            _protected.subtract(self.protect)
+            for path in self.protect:
+                if _protected[path] <= 0:
+                    _protected.pop(path, None)
+
+def output_lock(output_dir: Path) -> threading.Lock:
+    """
+    Get the lock that serializes changes to one video's shared output directory.
+
+    Args:
+        output_dir (Path): Shared output directory of the video
+
+    Returns:
+        threading.Lock: Lock for this directory
+    """
+    with _output_locks_guard:
+        return _output_locks.setdefault(str(Path(output_dir).resolve()), threading.Lock())
+
+def publish_outputs(staging_dir: Path, output_dir: Path) -> List[Path]:
+    """
+    Move a job's finished outputs from its staging directory into the shared output directory.
+
+    Files are replaced with os.replace(), so readers see either the old or
+    the new file. A directory (e.g. render/) replaces the previous one as a whole.
+    Hold output_lock(output_dir) so concurrent jobs don't interleave their files.
+
+    Args:
+        staging_dir (Path): Directory from JobWorkspace.staging_dir()
+        output_dir (Path): Shared output directory of the video
+
+    Returns:
+        List[Path]: Published paths
+    """
+    staging_dir, output_dir = Path(staging_dir), Path(output_dir)
+    published = []
+    for entry in sorted(staging_dir.iterdir()):
+        target = output_dir / entry.name
+        if entry.is_dir() and target.is_dir() and not target.is_symlink():
+            # Directories cannot be replaced atomically; swap the old one out first
+            retired = output_dir / STAGING_DIR_NAME / f".retired_{entry.name}_{uuid.uuid4().hex[:8]}"
+            os.rename(target, retired)
+            os.rename(entry, target)
+            _remove(retired)
+        else:
+            os.replace(entry, target)
+        published.append(target)
+    return published
+
+def cleanup_stale_workspaces() -> int:
+    """
+    Remove workspaces left behind by processes that are no longer running.
+
+    Returns:
+        int: Number of directories removed
+    """
+    removed = 0
+    roots = {config.WORKSPACE_DIR}
+    if config.SCRATCH_DIR:
+        roots.add(Path(config.SCRATCH_DIR))
+    if config.OUTPUT_DIR.is_dir():
+        roots.update(config.OUTPUT_DIR.glob(f"*/{STAGING_DIR_NAME}"))
+
+    for root in roots:
+        if not root.is_dir():
+            continue
+        for entry in root.iterdir():
+            with _lock:
+                if entry in _active:
+                    continue
+            # Only touch directories that follow the workspace naming scheme
+            pid = entry.name.split('_', 1)[0]
+            if not entry.is_dir() or not pid.isdigit():
+                continue
+            if int(pid) != os.getpid() and _pid_alive(int(pid)):
+                continue
+            _remove(entry)
+            removed += 1
+    return removed
+
+def enforce_disk_budget(budget_mb: int = config.DISK_BUDGET_MB,
+                        directories: Optional[List[Path]] = None) -> List[Path]:
+    """
+    Evict the least recently used inputs and outputs until the data directories fit the budget.
+
+    Each top-level entry of the managed directories (a downloaded file or a
+    per-video output folder) is one eviction unit. Entries used by running
+    jobs are never evicted.
+
+    Args:
+        budget_mb (int): Disk budget in megabytes (0 = unlimited)
+        directories (Optional[List[Path]]): Managed directories
+            (default: input, output, TTS and temp directories)
+
+    Returns:
+        List[Path]: Evicted paths, oldest first
+    """
+    logger = logging.getLogger('yt_germanizer')
+    if budget_mb <= 0:
+        return []
+
+    if directories is None:
+        directories = [config.INPUT_DIR, config.OUTPUT_DIR, config.TTS_DIR, config.TEMP_DIR]
+
+    entries: List[Tuple[float, int, Path]] = []
+    total = 0
+    with _lock:
+        protected = set(_protected)
+        active = [path.resolve() for path in _active]
+
+    for directory in directories:
+        if not directory.is_dir():
+            continue
+        for entry in directory.iterdir():
+            size = _path_size(entry)
+            total += size
+            resolved = entry.resolve()
+            # Job workspaces and the .part files of downloads in progress are never evicted as a whole
+            if resolved in protected or entry in (config.WORKSPACE_DIR, config.PARTIAL_DOWNLOAD_DIR):
+                continue
+            # Nor is anything that holds a running job's workspace or staging directory
+            if any(path == resolved or resolved in path.parents for path in active):
+                continue
+            entries.append((_last_used(entry), size, entry))
+
+    budget = budget_mb * 1024 * 1024
+    evicted = []
+    for _, size, entry in sorted(entries, key=lambda item: item[0]):
+        if total <= budget:
+            break
+        _remove(entry)
+        total -= size
+        evicted.append(entry)
+        logger.info(f"Evicted {entry} ({size / (1024 * 1024):.1f} MB) to stay within disk budget")
+
+    if total > budget:
+        logger.warning(f"Data directories use {total / (1024 * 1024):.0f} MB, above the "
+                       f"{budget_mb} MB budget, but the rest is in use")
+    return evicted